@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+import datetime
+import random
+from decimal import Decimal
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from app.models import (Company, OS, Support, Browser, BrowserDownload,
+                        Population, ResolutionByYear, RESOLUTION_CHOICES)
+
+
+BATCH_SIZE = 5000
+
+COMPANIES = ['Microsoft', 'Apple', 'Google', 'Canonical', 'Red Hat', 'Mozilla']
+OS_NAMES = ['Windows', 'OS X', 'Android', 'Ubuntu', 'Fedora', 'iOS', 'FreeBSD', 'Chrome OS']
+SUPPORT_NAMES = ['HTML5', 'CSS3', 'WebGL', 'WebSockets', 'SVG', 'CSS Grid', 'WebRTC', 'IndexedDB']
+BROWSER_NAMES = ['Firefox', 'Chrome', 'Safari', 'Opera', 'Internet Explorer', 'Konqueror', 'Epiphany', 'Midori']
+
+
+def make_datetime(value):
+    if getattr(settings, 'USE_TZ', False):
+        from django.utils import timezone
+        return timezone.make_aware(value, timezone.get_default_timezone())
+    return value
+
+
+def bulk_insert(model, objects):
+    """
+    Save objects with ``bulk_create`` in batches when available (django>=1.4)
+    """
+    if hasattr(model.objects, 'bulk_create'):
+        for start in range(0, len(objects), BATCH_SIZE):
+            model.objects.bulk_create(objects[start:start + BATCH_SIZE])
+    else:
+        for obj in objects:
+            obj.save()
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic data for the example reports.'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--rows', dest='rows', type='int', default=10000,
+                    help='Number of BrowserDownload rows to generate. Default: 10000'),
+        make_option('--browsers', dest='browsers', type='int', default=None,
+                    help='Number of browsers. Default: rows / 1000 (min 8)'),
+        make_option('--oses', dest='oses', type='int', default=None,
+                    help='Number of operating systems. Default: rows / 5000 (min 8)'),
+        make_option('--supports', dest='supports', type='int', default=None,
+                    help='Number of supports. Default: 8'),
+        make_option('--populations', dest='populations', type='int', default=None,
+                    help='Number of Population rows. Default: rows / 10'),
+        make_option('--resolutions', dest='resolutions', type='int', default=None,
+                    help='Number of ResolutionByYear rows. Default: rows / 10'),
+        make_option('--users', dest='users', type='int', default=None,
+                    help='Number of distinct download usernames. Default: rows / 20'),
+        make_option('--days', dest='days', type='int', default=730,
+                    help='Spread download dates over this many days. Default: 730'),
+        make_option('--m2m', dest='m2m', type='int', default=3,
+                    help='Maximum run_on / supports relations per browser. Default: 3'),
+        make_option('--seed', dest='seed', type='int', default=0,
+                    help='Random seed, so the same options generate the same data. Default: 0'),
+        make_option('--flush', action='store_true', dest='flush', default=False,
+                    help='Delete the existing example data before generating.'),
+    )
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        if rows < 0:
+            raise CommandError('--rows must be a positive number.')
+        rnd = random.Random(options['seed'])
+        verbosity = int(options.get('verbosity', 1))
+
+        def counter(name, default, minimum=1):
+            value = options.get(name)
+            if value is None:
+                value = default
+            return max(int(value), minimum)
+
+        n_browsers = counter('browsers', rows / 1000, len(BROWSER_NAMES))
+        n_oses = counter('oses', rows / 5000, len(OS_NAMES))
+        n_supports = counter('supports', len(SUPPORT_NAMES))
+        n_populations = counter('populations', rows / 10, 0)
+        n_resolutions = counter('resolutions', rows / 10, 0)
+        n_users = counter('users', rows / 20)
+
+        def numbered(names, index):
+            name = names[index % len(names)]
+            if index >= len(names):
+                name = '%s %s' % (name, index / len(names))
+            return name[:25]
+
+        commit_on_success = getattr(transaction, 'atomic', transaction.commit_on_success)
+        with commit_on_success():
+            if options['flush']:
+                for model in (BrowserDownload, Browser, OS, Support, Company, Population, ResolutionByYear):
+                    model.objects.all().delete()
+
+            bulk_insert(Company, [Company(name=name) for name in COMPANIES])
+            companies = list(Company.objects.all())
+            bulk_insert(OS, [OS(name=numbered(OS_NAMES, i), company=rnd.choice(companies + [None]))
+                             for i in range(n_oses)])
+            oses = list(OS.objects.all())
+            bulk_insert(Support, [Support(name=numbered(SUPPORT_NAMES, i)) for i in range(n_supports)])
+            supports = list(Support.objects.all())
+            existing_browsers = list(Browser.objects.values_list('pk', flat=True))
+            bulk_insert(Browser, [Browser(name=numbered(BROWSER_NAMES, i), is_active=rnd.random() > 0.2)
+                                  for i in range(n_browsers)])
+            browsers = list(Browser.objects.all())
+
+            run_on = []
+            supported = []
+            max_m2m = options['m2m']
+            for browser in browsers:
+                if browser.pk in existing_browsers:
+                    continue
+                for os in rnd.sample(oses, min(len(oses), rnd.randint(0, max_m2m))):
+                    run_on.append(Browser.run_on.through(browser_id=browser.pk, os_id=os.pk))
+                for support in rnd.sample(supports, min(len(supports), rnd.randint(0, max_m2m))):
+                    supported.append(Browser.supports.through(browser_id=browser.pk, support_id=support.pk))
+            bulk_insert(Browser.run_on.through, run_on)
+            bulk_insert(Browser.supports.through, supported)
+
+            today = datetime.date.today()
+            browser_ids = [b.pk for b in browsers]
+            os_ids = [o.pk for o in oses] + [None]
+            usernames = ['user%s' % i for i in range(n_users)]
+            downloads = []
+            for i in xrange(rows):
+                downloads.append(BrowserDownload(
+                    download_date=today - datetime.timedelta(days=rnd.randint(0, options['days'])),
+                    browser_id=rnd.choice(browser_ids),
+                    os_id=rnd.choice(os_ids),
+                    username=rnd.choice(usernames),
+                    download_price=Decimal('%.2f' % (rnd.random() * 100)),
+                ))
+                if len(downloads) >= BATCH_SIZE:
+                    bulk_insert(BrowserDownload, downloads)
+                    downloads = []
+            bulk_insert(BrowserDownload, downloads)
+
+            bulk_insert(Population, [Population(age=rnd.randint(0, 100),
+                                                men=rnd.randint(0, 1000000),
+                                                women=rnd.randint(0, 1000000)) for i in range(n_populations)])
+
+            resolutions = [key for key, label in RESOLUTION_CHOICES]
+            bulk_insert(ResolutionByYear, [ResolutionByYear(
+                date=make_datetime(datetime.datetime(today.year - rnd.randint(0, 10), rnd.randint(1, 12),
+                                                     rnd.randint(1, 28), 6)),
+                resolution=rnd.choice(resolutions),
+                percentage=rnd.randint(0, 100)) for i in range(n_resolutions)])
+
+        if verbosity > 0:
+            self.stdout.write('Generated %s downloads, %s browsers, %s oses, %s supports, '
+                              '%s populations and %s resolutions.\n' % (
+                                  rows, n_browsers, n_oses, n_supports, n_populations, n_resolutions))
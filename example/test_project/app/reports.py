@@ -130,6 +130,7 @@ class BrowserDownloadReport(ReportAdmin):
         'download_price': sum_column,
     }
     chart_types = ('pie', 'column', 'line')
+    group_top_by = 'download_price'
 
 
 reports.register('browser-download-report', BrowserDownloadReport)
@@ -142,6 +143,7 @@ class BrowserReport(ReportAdmin):
         'name',
     ]
     inlines = [BrowserDownloadReport]
+    inlines_on_demand = True
     list_order_by = ('name',)
     type = 'report'
 
@@ -1,6 +1,38 @@
 # -*- coding: utf-8 -*-
+import datetime
+import logging
+import re
+import tempfile
 import unittest
-from django.test.client import Client
+try:
+    import json
+except ImportError:
+    from django.utils import simplejson as json
+from StringIO import StringIO
+from decimal import Decimal
+from urllib import urlencode
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import override_settings
+from django.test.client import Client, RequestFactory
+from django.utils import translation
+from django.utils.encoding import force_unicode
+
+from app.models import Browser, BrowserDownload, OS, Support
+from model_report.cache import get_data_version, get_report_cache
+from model_report.highcharts import HighchartRender
+from model_report.models import RollupTotal
+from model_report.highcharts.downsample import downsample
+from model_report.highcharts.base import DictObject, JavaScript, to_javascript
+from model_report.highcharts.options import get_highchart_template
+from model_report.report import reports, autodiscover
+from model_report.pagination import encode_page_key, decode_page_key
+from model_report.partitions import watch_partitions, unwatch_partitions
+from model_report.rollup import Rollup
+from model_report.signals import report_executed
+from model_report.management.commands.benchmark_charts import make_report_rows
+from model_report.management.commands.benchmark_reports import get_report_cases, run_case
+from model_report.management.commands.replay_report import read_entries
 
 BASIC_GET_FOR_REPORT = {
     'resolution-by-year-report': '/resolution-by-year-report/?groupby=None&resolution=',
@@ -51,3 +83,732 @@ class ExampleCaseExcel(unittest.TestCase):
             self.assertEqual(response.status_code, 200)
             self.assertTrue(response.has_header('content-type'))
             self.assertEqual(response['content-type'], 'application/ms-excel')
+
+
+# Maximum number of queries of any view or export of each report. They must
+# not depend on the amount of data, only on the report definition.
+QUERY_BUDGETS = {
+    'resolution-by-year-report': 1,
+    'os-report': 2,
+    'population-report': 2,
+    'browser-download-report': 4,
+    'browser-report': 1,  # the inline reports are loaded on demand, but in the pdf export
+    'browser-list-report': 3,
+}
+
+# Maximum rows fetched from the database for every row shown. Reports with
+# many to many fields fetch one row per combination of related values (the
+# fixture relates up to 7 OS and 8 supports to a browser).
+FETCHED_ROWS_RATIO = {
+    'browser-list-report': 7 * 8,
+}
+
+# Seconds, generous: only meant to catch algorithmic regressions
+TIME_BUDGET = 10.0
+
+
+def has_pisa():
+    try:
+        import ho.pisa
+    except ImportError:
+        return False
+    return True
+
+
+class ExampleCasePerformance(TestCase):
+
+    def get_query_budget(self, slug, case):
+        budget = QUERY_BUDGETS[slug]
+        if slug == 'browser-report' and case == 'export:pdf':
+            budget += Browser.objects.count()
+        return budget
+
+    def get_cases(self):
+        for report_class in reports.get_reports():
+            for case, params in get_report_cases(report_class):
+                if case == 'export:pdf' and not has_pisa():
+                    continue
+                yield report_class.slug, case, params
+
+    def measure_queries(self):
+        queries = {}
+        for slug, case, params in self.get_cases():
+            result = run_case(slug, params)
+            self.assertEqual(result['status'], 200)
+            self.assertTrue(result['seconds'] < TIME_BUDGET,
+                            '"%s" %s took %.2fs' % (slug, case, result['seconds']))
+            queries[(slug, case)] = result['queries']
+        return queries
+
+    def test_query_budget(self):
+        call_command('generate_report_data', rows=200, verbosity=0)
+        small = self.measure_queries()
+        for (slug, case), count in small.items():
+            budget = self.get_query_budget(slug, case)
+            self.assertTrue(count <= budget, '"%s" %s ran %s queries, budget is %s' % (slug, case, count, budget))
+
+        call_command('generate_report_data', rows=1000, verbosity=0)
+        large = self.measure_queries()
+        for key, count in large.items():
+            slug, case = key
+            if slug == 'browser-report' and case == 'export:pdf':
+                continue
+            self.assertEqual(count, small[key], '"%s" %s queries grew with the data: %s -> %s' % (
+                slug, case, small[key], count))
+
+    def test_fetched_rows(self):
+        call_command('generate_report_data', rows=1000, verbosity=0)
+        for slug, case, params in self.get_cases():
+            if case.startswith('export:') or case.endswith(':onlytotals'):
+                continue
+            response = self.client.get('/%s/' % slug, params)
+            self.assertEqual(response.status_code, 200)
+            report = response.context['report']
+            shown = 0
+            for grouper, rows in response.context['report_rows']:
+                shown += len([row for row in rows if row.is_value()])
+            ratio = FETCHED_ROWS_RATIO.get(slug, 1)
+            self.assertTrue(report.fetched_rows <= shown * ratio, '"%s" %s fetched %s rows to show %s' % (
+                slug, case, report.fetched_rows, shown))
+
+
+class ExampleCaseMetrics(TestCase):
+
+    def test_report_executed(self):
+        executions = []
+
+        def receiver(sender, report, request, metrics, **kwargs):
+            executions.append(metrics)
+
+        report_executed.connect(receiver)
+        try:
+            response = self.client.get(BASIC_GET_FOR_REPORT['browser-list-report'])
+        finally:
+            report_executed.disconnect(receiver)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(executions), 1)
+        stages = executions[0].stages
+        self.assertEqual(stages.keys(), ['fetch', 'dotvalues', 'm2m', 'rows', 'render'])
+        for stage in stages.values():
+            self.assertTrue(stage['seconds'] >= 0)
+
+    @override_settings(MODEL_REPORT_SLOW_THRESHOLD=0)
+    def test_slow_report_log(self):
+        messages = []
+        handler = logging.Handler()
+        handler.emit = lambda record: messages.append(record.getMessage())
+        logger = logging.getLogger('model_report.slow')
+        logger.addHandler(handler)
+        try:
+            response = self.client.get('/population-report/', {'groupby': 'age', 'age': ''})
+        finally:
+            logger.removeHandler(handler)
+        self.assertEqual(response.status_code, 200)
+        entries = read_entries(messages)
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]['report'], 'population-report')
+        self.assertEqual(entries[0]['params'], {'groupby': 'age'})
+        self.assertEqual(entries[0]['rows']['fetched'], 101)
+        self.assertTrue('fetch' in entries[0]['stages'])
+        self.assertEqual(len(entries[0]['sql']), 1)
+
+    def test_replay_streaming_report(self):
+        self.client.get('/browser-download-report/')
+        report_class = reports.get_report('browser-download-report')
+        report_class.stream_rows = True
+        logfile = tempfile.NamedTemporaryFile(suffix='.log')
+        logfile.write('WARNING %s\n' % json.dumps({'report': 'browser-download-report',
+                                                   'params': {'groupby': 'os__name'}}))
+        logfile.flush()
+        output = StringIO()
+        try:
+            call_command('replay_report', logfile.name, stdout=output)
+        finally:
+            report_class.stream_rows = False
+            logfile.close()
+        # the stages of the streamed rows ran
+        self.assertTrue(re.search(r'^render +- +\d', output.getvalue(), re.M))
+
+
+class ExampleCaseExplain(TransactionTestCase):
+    # sqlite commits before running EXPLAIN
+
+    def test_explain_reports(self):
+        call_command('generate_report_data', rows=200, verbosity=0)
+        output = StringIO()
+        call_command('explain_reports', reports='browser-download-report', min_rows=0, stdout=output)
+        output = output.getvalue()
+        self.assertTrue('browser-download-report [filter:download_date]' in output)
+        self.assertTrue('CREATE INDEX' in output and '"download_date"' in output)
+
+
+class ExampleCaseCharts(unittest.TestCase):
+
+    def test_to_javascript(self):
+        self.assertEqual(to_javascript({'data': [1, 2.5, None, True, 'null', u'<b>']}),
+                         '{"data":[1,2.5,null,true,null,"\\u003cb\\u003e"]}')
+        self.assertEqual(to_javascript([JavaScript('Highcharts.theme'), JavaScript('function() { return 1; }')]),
+                         '[Highcharts.theme,function() { return 1; }]')
+        # only JavaScript values are raw, a string looking like a function is data
+        self.assertEqual(to_javascript(['function(){}+alert(1)+""']), '["function(){}+alert(1)+\\"\\""]')
+        obj = DictObject(a='unset', b=DictObject(c='unset'))
+        self.assertEqual(to_javascript(obj), '{}')
+        obj.update(a=None)
+        self.assertEqual(to_javascript(obj), '{"a":null}')
+
+    def test_chart_options(self):
+        report_rows = make_report_rows(4, groups=2)
+        report_rows[0] = (u"O'Reilly </script>", report_rows[0][1])
+        config = {'chart_mode': 'column', 'serie_field': 0, 'serie_op': 'sum', 'title': 'Test',
+                  'has_report_totals': False, 'has_group_totals': False}
+        options = HighchartRender(config).get_chart(report_rows).options
+        self.assertTrue('"O\'Reilly \\u003c/script\\u003e"' in options)
+        self.assertTrue('"formatter":function() {' in options)
+
+    def test_chart_function_group(self):
+        report_rows = make_report_rows(4, groups=2)
+        report_rows[0] = (u'function(){}+alert(1)+""', report_rows[0][1])
+        for mode in ('pie', 'column', 'line'):
+            config = {'chart_mode': mode, 'serie_field': 0, 'serie_op': 'sum', 'title': 'Test',
+                      'has_report_totals': False, 'has_group_totals': False}
+            options = HighchartRender(config).get_chart(report_rows).options
+            self.assertTrue('"function(){}+alert(1)+\\"\\""' in options)
+            self.assertFalse(re.search(r'[:,\[]function\(\)\{\}', options))
+
+    def test_chart_template(self):
+        config = {'chart_mode': 'line', 'serie_field': 0, 'serie_op': 'sum', 'title': 'Test',
+                  'has_report_totals': False, 'has_group_totals': False}
+        chart = HighchartRender(config).get_chart(make_report_rows(4, groups=2))
+        self.assertEqual(chart.model.chart.type, 'line')
+        self.assertEqual(len(chart.model.series._dicts), 2)
+        template = get_highchart_template()
+        self.assertEqual(template.chart.type, 'null')
+        self.assertEqual(template.series._dicts, [])
+        self.assertTrue('"plotLines":[]' in chart.options)
+
+    def test_downsample(self):
+        values = [float(i % 10) for i in range(1000)]
+        values[500] = 100.0
+        for method in ('lttb', 'minmax'):
+            points = downsample(values, 50, method)
+            self.assertTrue(len(points) <= 50)
+            self.assertEqual(points, sorted(points))
+            self.assertTrue((500, 100.0) in points)
+        points = downsample(values, 50, 'lttb')
+        self.assertEqual([points[0], points[-1]], [(0, 0.0), (999, 9.0)])
+        self.assertEqual(downsample(values[:10], 50), list(enumerate(values[:10])))
+
+        config = {'chart_mode': 'line', 'serie_field': 0, 'serie_op': 'sum', 'title': 'Test',
+                  'has_report_totals': False, 'has_group_totals': False, 'max_points': 100}
+        chart = HighchartRender(config).get_chart(make_report_rows(1000, groups=2))
+        for serie in chart.model.series._dicts:
+            self.assertEqual(len(serie.data), 100)
+            self.assertEqual(serie.data[0][0], 1)
+
+    def test_benchmark_charts(self):
+        output = StringIO()
+        call_command('benchmark_charts', points=100, repeat=1, stdout=output)
+        modes = [line.split()[0] for line in output.getvalue().splitlines()[-3:]]
+        self.assertEqual(modes, ['line', 'column', 'pie'])
+
+
+class ExampleCaseChartData(TestCase):
+    fixtures = ['app', ]
+
+    def test_chart_data(self):
+        report_class = reports.get_report('browser-download-report')
+        groupby_data = {'groupby': 'browser__name'}
+        for serie_op in ('sum', 'len', 'avg', 'min', 'max'):
+            config = {'chart_mode': 'pie', 'serie_field': 5, 'serie_op': serie_op}
+            report = report_class()
+            db_data = report.get_chart_data(groupby_data, {}, dict(config))
+            chart = report.get_chart(dict(config), None)
+            rows_data = chart.aggregate(chart.get_serie_data(report.get_rows(groupby_data, {})))
+            self.assertEqual([(g, round(v, 2)) for g, v in db_data], [(g, round(v, 2)) for g, v in rows_data])
+
+    def test_group_top(self):
+        params = {'groupby': 'os__name', 'group_top': 2, 'chart_mode': 'pie', 'serie_field': 5, 'serie_op': 'sum'}
+        response = Client().get('/browser-download-report/', params)
+        report_rows = response.context['report_rows']
+        groups = [force_unicode(g) for g, rows in report_rows]
+        self.assertEqual(groups[2:], [u'Other', u'Totals'])
+        shown = sum([len([r for r in rows if r.is_value()]) for g, rows in report_rows])
+        other_text = [v.value for v in report_rows[2][1][0] if v.value != ' '][0]
+        self.assertTrue(other_text.endswith('%s rows' % (BrowserDownload.objects.count() - shown)))
+        serie = response.context['chart'].model.series._dicts[0].data
+        self.assertEqual([g for g, v in serie], groups[:3])
+
+        params['group_top'] = 0
+        response = Client().get('/browser-download-report/', params)
+        self.assertFalse(u'Other' in [force_unicode(g) for g, rows in response.context['report_rows']])
+
+    def test_chart_view(self):
+        response = Client().get('/browser-download-report/chart/', {
+            'groupby': 'browser__name', 'chart_mode': 'column', 'serie_field': 5, 'serie_op': 'sum'})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        options = data['options']
+        self.assertEqual(options['chart']['type'], 'column')
+        self.assertTrue(options['tooltip']['formatter'].startswith('function()'))
+        # only the formatters are revived by the page, not the data
+        self.assertEqual(data['functions'], [['tooltip', 'formatter']])
+        response = Client().get('/browser-download-report/chart/', {'groupby': 'browser__name'})
+        self.assertEqual(json.loads(response.content)['options'], None)
+
+
+class ExampleCaseFilterChoices(TestCase):
+    fixtures = ['app', ]
+
+    def test_filter_widget(self):
+        browser = Browser.objects.order_by('name')[0]
+        response = Client().get('/browser-download-report/', {'browser__name': browser.pk})
+        select = response.context['form_filter']['browser__name']
+        options = unicode(select).count('<option')
+        self.assertEqual(options, 2)  # empty and selected choices only
+        self.assertTrue('value="%s" selected="selected"' % browser.pk in unicode(select))
+
+    def test_filter_choices_view(self):
+        url = '/browser-download-report/filter/os__name/'
+        with self.settings(MODEL_REPORT_FILTER_CHOICES_PAGE_SIZE=2):
+            data = json.loads(Client().get(url).content)
+            self.assertEqual(len(data['results']), 2)
+            self.assertTrue(data['more'])
+            prefix = data['results'][0]['text'][:2]
+            data = json.loads(Client().get(url, {'q': prefix.lower()}).content)
+            self.assertTrue(data['results'])
+            self.assertTrue(all([r['text'].startswith(prefix) for r in data['results']]))
+        self.assertEqual(Client().get('/browser-download-report/filter/download_price/').status_code, 404)
+
+    def test_filter_form_cache(self):
+        report_class = reports.get_report('browser-download-report')
+        request = RequestFactory().get('/')
+        form = report_class().get_form_filter(request)
+        self.assertTrue(report_class().get_form_filter(request).__class__ is form.__class__)
+        with translation.override('es'):
+            # the labels of another language
+            self.assertFalse(report_class().get_form_filter(request).__class__ is form.__class__)
+
+        report_class.filter_choices_search = False
+        try:
+            report_class().get_form_filter(request)  # fills the choices cache
+            with self.assertNumQueries(0):
+                choices = list(report_class().get_form_filter(request).fields['browser__name'].choices)
+            Browser.objects.create(name='Zeta')
+            form = report_class().get_form_filter(request)
+            self.assertEqual(len(form.fields['browser__name'].choices), len(choices) + 1)
+        finally:
+            report_class.filter_choices_search = True
+            get_report_cache().clear()
+
+    def test_data_versions(self):
+        self.client.get('/browser-download-report/')
+        version = get_data_version(Browser)
+        Browser.objects.create(name='Zeta')
+        self.assertNotEqual(get_data_version(Browser), version)
+        # only the models of the reports have a data version maintained
+        version = get_data_version(RollupTotal)
+        RollupTotal.objects.create(rollup='test', key='test', values='[]', measure='', total=1)
+        self.assertEqual(get_data_version(RollupTotal), version)
+
+    def test_filter_counts(self):
+        report_class = reports.get_report('browser-download-report')
+        download = BrowserDownload.objects.exclude(os=None)[0]
+        request = RequestFactory().get('/', {'os__name': download.os.pk})
+        report_class.filter_counts = True
+        try:
+            report = report_class()
+            form = report.get_form_filter(request)
+            counts = report.get_filter_counts(form)
+            self.assertEqual(counts['browser__name'].get(download.browser.pk),
+                             BrowserDownload.objects.filter(os=download.os, browser=download.browser).count())
+            # the os counts ignore the os filter
+            self.assertEqual(counts['os__name'].get(download.os.pk),
+                             BrowserDownload.objects.filter(os=download.os).count())
+            label = form.fields['browser__name'].label_from_instance(download.browser)
+            self.assertEqual(label, u'%s (%s)' % (download.browser, counts['browser__name'][download.browser.pk]))
+
+            # the searched choices count only the rows of their page
+            url = '/browser-download-report/filter/browser__name/'
+            with self.settings(MODEL_REPORT_FILTER_CHOICES_PAGE_SIZE=2):
+                with self.assertNumQueries(3):  # the os filter value, the choices and their counts
+                    data = json.loads(self.client.get(url, {'os__name': download.os.pk}).content)
+            self.assertEqual(len(data['results']), 2)
+            for result in data['results']:
+                self.assertEqual(result['text'], u'%s (%s)' % (Browser.objects.get(pk=result['id']),
+                                                               counts['browser__name'].get(result['id'], 0)))
+        finally:
+            report_class.filter_counts = False
+
+
+class ExampleCaseQueryset(TestCase):
+    fixtures = ['app', ]
+
+    def setUp(self):
+        if not reports.get_reports():
+            autodiscover()
+
+    def test_distinct(self):
+        self.assertFalse(reports.get_report('population-report')().get_queryset({}).query.distinct)
+        self.assertTrue(reports.get_report('browser-list-report')().get_queryset({}).query.distinct)
+
+        # downloads of browsers running on any of two systems are counted once
+        names = ['Windows', 'Ubuntu']
+        qs = reports.get_report('browser-download-report')().get_queryset({'browser__run_on__name__in': names})
+        self.assertFalse(qs.query.distinct)
+        self.assertEqual(qs.count(), BrowserDownload.objects.filter(browser__run_on__name__in=names).distinct().count())
+
+    def test_related_filter(self):
+        supports = Support.objects.exclude(name__icontains='css')
+        report = reports.get_report('browser-list-report')()
+        qs = report.get_queryset({'supports__name': supports})
+        self.assertTrue('EXISTS' in unicode(qs.query))
+        self.assertEqual(sorted(qs.values_list('pk', flat=True)),
+                         sorted(Browser.objects.filter(supports__in=supports).distinct().values_list('pk', flat=True)))
+
+
+class ExampleCasePagination(TestCase):
+    fixtures = ['app', ]
+
+    def get_pages(self, params):
+        pages = []
+        url = '/browser-download-report/?%s' % urlencode(params)
+        while url:
+            context = self.client.get(url).context
+            pages.append(context['report_rows'])
+            url = context['report_page'].get('next_url')
+            if url:
+                url = '/browser-download-report/%s' % url
+        return pages
+
+    def test_keyset_pages(self):
+        params = {'groupby': 'os__name'}
+        full = self.client.get('/browser-download-report/', params).context['report_rows']
+        report_class = reports.get_report('browser-download-report')
+        report_class.list_per_page = 7
+        try:
+            with self.assertNumQueries(2):  # totals and rows of the page
+                self.client.get('/browser-download-report/', params)
+            pages = self.get_pages(params)
+            with self.assertNumQueries(len(pages)):  # one query per page, the totals are cached
+                self.get_pages(params)
+        finally:
+            report_class.list_per_page = None
+
+        def value_rows(report_rows):
+            return [[unicode(v) for v in row] for g, rows in report_rows for row in rows if row.is_value()]
+        self.assertTrue(len(pages) > 1)
+        self.assertEqual(value_rows(full), sum([value_rows(page) for page in pages], []))
+        for page in pages:
+            # the report totals of every row on every page
+            self.assertEqual([unicode(v) for v in page[-1][1][1]], [unicode(v) for v in full[-1][1][1]])
+        self.assertTrue(force_unicode(pages[1][0][0]).endswith('(continued)'))
+
+    def test_page_totals_related_change(self):
+        params = {'groupby': 'browser__name'}
+
+        def group_totals(report_rows):
+            return dict([(force_unicode(g), [[unicode(v) for v in row] for row in rows if row.is_total])
+                         for g, rows in report_rows])
+        self.client.get('/browser-download-report/', params)
+        report_class = reports.get_report('browser-download-report')
+        report_class.list_per_page = 1000  # one page, through the cached page totals
+        try:
+            self.client.get('/browser-download-report/', params)
+            # the totals cached by group name follow the renamed group
+            browser = Browser.objects.exclude(browserdownload=None).order_by('name')[0]
+            browser.name = u'%s renamed' % browser.name
+            browser.save()
+            page = self.client.get('/browser-download-report/', params).context['report_rows']
+        finally:
+            report_class.list_per_page = None
+        full = group_totals(self.client.get('/browser-download-report/', params).context['report_rows'])
+        self.assertTrue(full[browser.name])
+        self.assertEqual(group_totals(page), full)
+
+    def test_page_key_values(self):
+        values = [datetime.datetime(2013, 5, 1, 10, 20, 30, 123456), datetime.date(2013, 5, 1),
+                  datetime.time(10, 20, 30, 5), Decimal('10.50'), u'name', 3, None]
+        self.assertEqual(decode_page_key(encode_page_key(values, True)), (values, True))
+        self.assertEqual(decode_page_key(encode_page_key([{'datetime': 'not a date'}])), (None, False))
+
+
+class ExampleCaseGroupsOnDemand(TestCase):
+    fixtures = ['app', ]
+
+    def test_group_rows_on_demand(self):
+        params = {'groupby': 'os__name'}
+        full = self.client.get('/browser-download-report/', params).context['report_rows']
+        report_class = reports.get_report('browser-download-report')
+        report_class.group_rows_on_demand = True
+        try:
+            with self.assertNumQueries(1):  # the totals of every group
+                response = self.client.get('/browser-download-report/', params)
+            headers = response.context['report_rows']
+            for (grouper, rows), (full_grouper, full_rows) in zip(headers, full):
+                self.assertEqual(grouper, full_grouper)
+                self.assertEqual([[unicode(v) for v in row] for row in rows],
+                                 [[unicode(v) for v in row] for row in full_rows if not row.is_value()])
+                if not getattr(rows, 'load_url', None):
+                    continue  # the report totals
+                response = self.client.get(rows.load_url.replace('/report', '', 1))
+                self.assertEqual([[unicode(v) for v in row] for row in response.context['rows']],
+                                 [[unicode(v) for v in row] for row in full_rows if row.is_value()])
+        finally:
+            report_class.group_rows_on_demand = False
+
+
+class ExampleCaseInlinesOnDemand(TestCase):
+    fixtures = ['app', ]
+
+    def test_inlines_on_demand(self):
+        self.client.get('/browser-report/?__all__=1')
+        report_class = reports.get_report('browser-report')
+        report_class.inlines_on_demand = False
+        try:
+            full = self.client.get('/browser-report/?__all__=1').content
+        finally:
+            report_class.inlines_on_demand = True
+        with self.assertNumQueries(1):
+            response = self.client.get('/browser-report/?__all__=1')
+        urls = re.findall(r'data-url="([^"]+/inline/[^"]+)"', response.content)
+        self.assertEqual(len(urls), Browser.objects.count())
+        for url in urls:
+            response = self.client.get(url.replace('&amp;', '&').replace('/report', '', 1))
+            self.assertEqual(response.status_code, 200)
+            content = response.content.strip()
+            if content:
+                self.assertTrue(content in full)
+
+
+class ExampleCaseStreaming(TestCase):
+    fixtures = ['app', ]
+
+    def get_table_body(self, content):
+        content = content[content.index('<tbody>'):content.rindex('</tbody>')]
+        # no group anchors while streaming
+        content = re.sub(r'<a [^>]*href="#data_container">[^<]*</a>', '', content)
+        return re.sub(r'\s+', ' ', content)
+
+    def test_stream_rows(self):
+        params = {'groupby': 'os__name'}
+        full = self.client.get('/browser-download-report/', params).content
+        report_class = reports.get_report('browser-download-report')
+        report_class.stream_rows = True
+        try:
+            response = self.client.get('/browser-download-report/', params)
+            self.assertTrue(response.streaming)
+            content = iter(response.streaming_content)
+            with self.assertNumQueries(0):  # the page up to the table rows is sent before the rows are fetched
+                head = content.next()
+            self.assertTrue('<tbody>' in head)
+            self.assertEqual(self.get_table_body(head + ''.join(content)), self.get_table_body(full))
+        finally:
+            report_class.stream_rows = False
+
+
+class ExampleCaseFastTable(TestCase):
+    fixtures = ['app', ]
+
+    def test_fast_table(self):
+        for url in ('/browser-download-report/?groupby=os__name', '/browser-report/?__all__=1'):
+            self.client.get(url)
+            report_class = reports.get_report(url.split('/')[1])
+            content = self.client.get(url).content
+            report_class.fast_table = True
+            try:
+                self.assertEqual(self.client.get(url).content, content)
+            finally:
+                report_class.fast_table = False
+
+    def test_benchmark_tables(self):
+        stdout = StringIO()
+        call_command('benchmark_tables', rows='100', repeat=1, stdout=stdout)
+        self.assertTrue(stdout.getvalue().splitlines()[-1].endswith('yes'))
+
+
+class ExampleCaseGroupCache(TestCase):
+    fixtures = ['app', ]
+
+    def test_cache_groups(self):
+        url = '/browser-download-report/?groupby=browser__name'
+        content = self.client.get(url).content
+        report_class = reports.get_report('browser-download-report')
+        report_class.cache_groups = True
+        try:
+            self.client.get(url)
+            response = self.client.get(url)
+            self.assertEqual(response.content, content)
+            groups = [rows for grouper, rows in response.context['report_rows'] if getattr(rows, 'cache_key', None)]
+            self.assertTrue(len(groups) > 1)
+            self.assertEqual([rows for rows in groups if rows.html is None], [])
+
+            download = BrowserDownload.objects.exclude(browser=None)[0]
+            download.download_price += 1
+            download.save()
+            response = self.client.get(url)
+            rendered = [grouper for grouper, rows in response.context['report_rows']
+                        if getattr(rows, 'cache_key', None) and rows.html is None]
+            self.assertEqual(rendered, [download.browser.name])
+        finally:
+            report_class.cache_groups = False
+            get_report_cache().clear()
+
+
+class ExampleCaseRollups(TestCase):
+    fixtures = ['app', ]
+
+    def get_totals(self, params):
+        report_rows = self.client.get('/browser-download-report/', params).context['report_rows']
+        return [(grouper, [[unicode(v) for v in row] for row in rows]) for grouper, rows in report_rows]
+
+    def test_rollup_totals(self):
+        browser = Browser.objects.exclude(browserdownload=None)[0]
+        cases = [
+            {'groupby': 'os__name', 'onlytotals': 'on'},
+            {'groupby': 'browser__name', 'onlytotals': 'on', 'browser__name': browser.pk},
+        ]
+        queries = [1, 3]  # the groups of the rollup, the filter form and the pks of the filter
+        expected = [self.get_totals(params) for params in cases]
+        report_class = reports.get_report('browser-download-report')
+        rollup = Rollup(('browser', 'browser__name', 'os__name'), sums=('download_price',))
+        report_class.rollups = (rollup,)
+        rollup.register(BrowserDownload)
+        try:
+            call_command('rebuild_rollups', reports='browser-download-report', verbosity=0)
+            for params, totals, num in zip(cases, expected, queries):
+                with self.assertNumQueries(num):
+                    self.assertEqual(self.get_totals(params), totals)
+
+            # saved and deleted rows update the rollup
+            download = BrowserDownload.objects.filter(browser=browser)[0]
+            download.download_price += 1
+            download.os = None
+            download.save()
+            BrowserDownload.objects.exclude(browser=browser)[0].delete()
+            # and so do the renamed related objects
+            browser.name = u'RENAMED'
+            browser.save()
+            os = OS.objects.exclude(browserdownload=None)[0]
+            os.name = u'%s renamed' % os.name
+            os.save()
+            # the rows deleted with a related object are counted out once
+            OS.objects.exclude(browserdownload=None).exclude(pk=os.pk)[0].delete()
+            totals = [self.get_totals(params) for params in cases]
+            self.assertTrue(u'RENAMED' in [force_unicode(grouper) for grouper, rows in totals[1]])
+            report_class.rollups = ()
+            self.assertEqual(totals, [self.get_totals(params) for params in cases])
+            self.assertNotEqual(totals, expected)
+        finally:
+            report_class.rollups = ()
+            rollup.unregister()
+
+
+class ExampleCasePartitionTotals(TestCase):
+    fixtures = ['app', ]
+
+    def get_totals(self, params):
+        report_rows = self.client.get('/browser-download-report/', params).context['report_rows']
+        return [(grouper, [[unicode(v) for v in row] for row in rows]) for grouper, rows in report_rows]
+
+    def test_partition_totals(self):
+        closed = {'groupby': 'os__name', 'onlytotals': 'on',
+                  'download_date_0': '2011-09-01', 'download_date_1': '2012-03-31'}
+        partial = dict(closed, download_date_0='2011-08-20', download_date_1='2012-04-10')
+        expected = [self.get_totals(params) for params in (closed, partial)]
+        report_class = reports.get_report('browser-download-report')
+        report_class.totals_partition_field = 'download_date'
+        report_class.totals_partition = 'month'
+        watch_partitions(BrowserDownload, 'download_date', 'month')
+        try:
+            with self.assertNumQueries(1):  # the totals of every partition
+                self.assertEqual(self.get_totals(closed), expected[0])
+            with self.assertNumQueries(0):  # the cached partitions
+                self.assertEqual(self.get_totals(closed), expected[0])
+            with self.assertNumQueries(1):  # the partitions on the edges of the range
+                self.assertEqual(self.get_totals(partial), expected[1])
+
+            download = BrowserDownload.objects.filter(download_date__year=2011, download_date__month=10)[0]
+            download.download_price += 1
+            download.save()
+            with self.assertNumQueries(1):  # the changed partition
+                totals = self.get_totals(closed)
+            self.assertNotEqual(totals, expected[0])
+
+            # a renamed group changes every partition
+            os = download.os or OS.objects.exclude(browserdownload=None)[0]
+            os.name = u'%s renamed' % os.name
+            os.save()
+            totals = self.get_totals(closed)
+            self.assertTrue(os.name in [force_unicode(grouper) for grouper, rows in totals])
+            report_class.totals_partition_field = None
+            self.assertEqual(totals, self.get_totals(closed))
+        finally:
+            report_class.totals_partition_field = None
+            report_class.totals_partition = 'day'
+            unwatch_partitions(BrowserDownload, 'download_date', 'month')
+            get_report_cache().clear()
+
+
+class ExampleCaseSampling(TestCase):
+    fixtures = ['app', ]
+
+    def setUp(self):
+        if not reports.get_reports():
+            autodiscover()
+
+    def test_sampled_totals(self):
+        params = {'groupby': 'os__name', 'sample': '1'}
+        report_class = reports.get_report('browser-download-report')
+        report_class.sample_percent = 50
+        try:
+            response = self.client.get('/browser-download-report/', params)
+            report_rows = response.context['report_rows']
+            sample = [pk for pk in BrowserDownload.objects.values_list('pk', flat=True) if pk % 2 == 0]
+            self.assertEqual(sum([len([r for r in rows if r.is_value()]) for g, rows in report_rows]), len(sample))
+            count = report_rows[-1][1][1][0]
+            self.assertEqual(count.value, len(sample) * 2)
+            self.assertTrue(count.error > 0)
+            self.assertTrue(u'±' in count.text())
+            self.assertTrue(response.context['report_sample']['active'])
+
+            # one click back to the exact totals
+            url = response.context['report_sample']['url']
+            self.assertFalse('sample' in url)
+            response = self.client.get('/browser-download-report/%s' % url)
+            self.assertFalse(response.context['report_sample']['active'])
+            self.assertEqual(response.context['report_rows'][-1][1][1][0].value, BrowserDownload.objects.count())
+            self.assertEqual(response.context['report_rows'][-1][1][1][0].error, None)
+        finally:
+            report_class.sample_percent = None
+
+
+class ExampleCaseColumns(TestCase):
+    fixtures = ['app', ]
+
+    def setUp(self):
+        if not reports.get_reports():
+            autodiscover()
+
+    def test_chosen_columns(self):
+        params = {'groupby': 'os__name', 'columns': ['browser__name', 'download_price']}
+        full = self.client.get('/browser-download-report/', {'groupby': 'os__name'}).context
+        report_class = reports.get_report('browser-download-report')
+        report_class.choose_columns = True
+        try:
+            response = self.client.get('/browser-download-report/', params)
+            self.assertTrue('columns' in response.context['form_config'].fields)
+            self.assertEqual(response.context['report'].get_query_field_names(),
+                             ['browser__name', 'os__name', 'download_price'])
+            self.assertEqual(len(response.context['column_labels']), 3)
+            report_rows = response.context['report_rows']
+            self.assertEqual([len(row) for g, rows in report_rows for row in rows if row.is_value()],
+                             [3] * BrowserDownload.objects.count())
+            # the totals of the chosen columns don't change
+            self.assertEqual([[unicode(row[-1]) for row in rows if row.is_total] for g, rows in report_rows],
+                             [[unicode(row[-1]) for row in rows if row.is_total] for g, rows in full['report_rows']])
+
+            # every column without a choice
+            response = self.client.get('/browser-download-report/', {'groupby': 'os__name'})
+            self.assertEqual(len(response.context['column_labels']), len(full['column_labels']))
+        finally:
+            report_class.choose_columns = False
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import get_cache
+from django.db.models.signals import post_save, post_delete
+from django.utils.encoding import force_unicode, smart_str
+
+
+def get_report_cache():
+    """
+    Return the cache backend named by the ``MODEL_REPORT_CACHE`` setting.
+    """
+    return get_cache(getattr(settings, 'MODEL_REPORT_CACHE', 'default'))
+
+
+def get_version_key(model):
+    return 'model_report:version:%s.%s' % (model._meta.app_label, model._meta.object_name.lower())
+
+
+def new_version():
+    # a time based version can't repeat a previous version when the key is evicted
+    return int(time.time() * 1000000)
+
+
+def get_data_version(model):
+    """
+    Return the data version of ``model``, it changes every time an instance
+    of ``model`` is saved or deleted.
+    """
+    return get_data_versions([model])[0]
+
+
+def get_data_versions(models):
+    """
+    Return the list of the data versions of ``models``, read at once.
+    """
+    cache = get_report_cache()
+    keys = [get_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            version = new_version()
+            if not cache.add(key, version, 60 * 60 * 24 * 30):
+                version = cache.get(key, version)
+            versions[key] = version
+    return [versions[key] for key in keys]
+
+
+def bump_data_version(model):
+    """
+    Change the data version of ``model``, invalidating what was cached for it.
+    """
+    cache = get_report_cache()
+    key = get_version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, new_version(), 60 * 60 * 24 * 30)
+
+
+def get_partition_version_key(model, field, period, start):
+    return 'model_report:version:%s.%s:%s:%s:%s' % (
+        model._meta.app_label, model._meta.object_name.lower(), field, period, start.isoformat())
+
+
+def get_partition_versions(model, field, period, starts):
+    """
+    Return ``{start: version}`` of the partitions of ``model`` by the date
+    ``field`` starting at each date of ``starts``, the version of a partition
+    changes every time one of its instances is saved or deleted.
+    """
+    cache = get_report_cache()
+    keys = dict([(get_partition_version_key(model, field, period, start), start) for start in starts])
+    versions = cache.get_many(keys.keys())
+    for key in keys:
+        if key not in versions:
+            version = new_version()
+            if not cache.add(key, version, 60 * 60 * 24 * 30):
+                version = cache.get(key, version)
+            versions[key] = version
+    return dict([(start, versions[key]) for key, start in keys.items()])
+
+
+def bump_partition_version(model, field, period, start):
+    """
+    Change the version of the partition of ``model`` starting at ``start``.
+    """
+    cache = get_report_cache()
+    key = get_partition_version_key(model, field, period, start)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, new_version(), 60 * 60 * 24 * 30)
+
+
+def data_changed(sender, **kwargs):
+    bump_data_version(sender)
+
+
+def watch_data(model):
+    """
+    Change the data version of ``model`` every time one of its instances is
+    saved or deleted, called for the models of the registered reports.
+    """
+    uid = 'model_report_data_changed_%s.%s' % (model._meta.app_label, model._meta.object_name)
+    post_save.connect(data_changed, sender=model, dispatch_uid='%s_save' % uid)
+    post_delete.connect(data_changed, sender=model, dispatch_uid='%s_delete' % uid)
+
+
+def unwatch_data(model):
+    """
+    Stop maintaining the data version of ``model``.
+    """
+    uid = 'model_report_data_changed_%s.%s' % (model._meta.app_label, model._meta.object_name)
+    post_save.disconnect(sender=model, dispatch_uid='%s_save' % uid)
+    post_delete.disconnect(sender=model, dispatch_uid='%s_delete' % uid)
+
+
+def get_cached_choices(field):
+    """
+    Return the choices of a model choice form field cached until the data
+    version of its model changes, or ``None`` when its queryset joins other
+    tables or has more than ``MODEL_REPORT_CACHED_CHOICES_MAX`` rows.
+    """
+    max_rows = getattr(settings, 'MODEL_REPORT_CACHED_CHOICES_MAX', 200)
+    qs = field.queryset
+    if not max_rows or len(qs.query.tables) > 1:
+        return None
+    sql = '%s %s' % (force_unicode(qs.query), force_unicode(field.empty_label))
+    key = 'model_report:choices:%s:%s' % (get_data_version(qs.model), hashlib.md5(smart_str(sql)).hexdigest())
+    cache = get_report_cache()
+    choices = cache.get(key)
+    if choices is None:
+        objects = list(qs[:max_rows + 1])
+        if len(objects) > max_rows:
+            choices = False
+        else:
+            choices = [(field.prepare_value(obj), force_unicode(field.label_from_instance(obj))) for obj in objects]
+            if field.empty_label is not None:
+                choices.insert(0, (u'', force_unicode(field.empty_label)))
+        cache.set(key, choices, getattr(settings, 'MODEL_REPORT_CACHED_CHOICES_TIMEOUT', 60 * 60))
+    return choices or None
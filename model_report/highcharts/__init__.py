@@ -1,8 +1,10 @@
 # -*- coding: utf-8 -*-
 from django.utils.encoding import force_unicode
 from django.utils.translation import ugettext_lazy as _
-from model_report.highcharts.base import true, false, null, DictObject
-from model_report.highcharts.options import get_highchart_data
+from model_report.highcharts.base import true, false, null, OverlayObject, JavaScript, to_javascript, to_json, \
+    get_javascript_paths
+from model_report.highcharts.options import get_highchart_template
+from model_report.highcharts.downsample import downsample
 
 
 def is_numeric(value):
@@ -12,47 +14,29 @@ def is_numeric(value):
         return False
     return True
 
-from BeautifulSoup import BeautifulStoneSoup
-import cgi
-
-
-def HTMLEntitiesToUnicode(text):
+def get_grouper_label(grouper):
     """
-    Converts HTML entities to unicode.  For example '&amp;' becomes '&'.
+    Return the text of a group to show in the chart.
     """
-    text = unicode(BeautifulStoneSoup(text, convertEntities=BeautifulStoneSoup.ALL_ENTITIES))
-    return text
-
-
-def unicodeToHTMLEntities(text):
-    """
-    Converts unicode to HTML entities.  For example '&' becomes '&amp;'.
-    """
-    if text is None:
-        text = force_unicode(_('None'))
-    text = cgi.escape(text).encode('ascii', 'xmlcharrefreplace')
-    return text
+    if grouper is None:
+        return force_unicode(_('None'))
+    return force_unicode(grouper)
 
 
 class HighchartRender(object):
 
     def reset(self):
-        self.model = DictObject(**get_highchart_data())
+        self.model = OverlayObject(get_highchart_template())
 
     def __init__(self, config):
         self.reset()
         self.config = config
 
-    def set_pie_chart_options(self, report_rows):
-        funcs_op = {
-            'sum': sum,
-            'max': max,
-            'min': min,
-            'len': len,
-            'avg': lambda vlist: sum(vlist) / len(vlist)
-        }
-        serie_operation = funcs_op[self.config['serie_op']]
-
+    def get_serie_data(self, report_rows):
+        """
+        Return a list of ``(group, values)`` with the values of the serie field
+        in every group of ``report_rows``. Not numeric values count as 1.
+        """
         serie_data = []
         for grouper, rows in report_rows:
             add_group = True
@@ -67,25 +51,45 @@ class HighchartRender(object):
                     value = row[self.config['serie_field']].value
                     if not is_numeric(value):
                         value = 1  # TOOD: Map serie_field with posible serie_operator
-                    serie_values.append(value)
+                    serie_values.append(float(value))
+            if serie_values:
+                serie_data.append((get_grouper_label(grouper), serie_values))
+        return serie_data
+
+    def aggregate(self, serie_data):
+        """
+        Return a list of ``(group, value)`` applying the serie operator to the
+        values of every group.
+        """
+        funcs_op = {
+            'sum': sum,
+            'max': max,
+            'min': min,
+            'len': len,
+            'avg': lambda vlist: sum(vlist) / len(vlist)
+        }
+        serie_operation = funcs_op[self.config['serie_op']]
+        return [(grouper, serie_operation(values)) for grouper, values in serie_data]
 
-            value = serie_operation(serie_values)
-            grouper = unicodeToHTMLEntities(grouper)
-            serie_data.append([grouper, round(value, 2)])
+    def set_pie_chart_options(self, serie_data):
+        grouper = None
+        serie_values = []
+        for grouper, value in serie_data:
+            serie_values.append([grouper, round(value, 2)])
         data = self.model.serie_obj.create(**{
-            'name': grouper,
-            'data': serie_data,
+            'name': self.config.get('serie_name', grouper),
+            'data': serie_values,
             'type': 'pie',
         })
         self.model.series.add(data)
 
         self.model.chart.renderTo = 'container'
-        self.model.chart.plotBackgroundColor = null,
-        self.model.chart.plotBorderWidth = null,
+        self.model.chart.plotBackgroundColor = None
+        self.model.chart.plotBorderWidth = None
         self.model.chart.plotShadow = false
 
         self.model.title.text = self.config['title']
-        self.model.tooltip.formatter = "function() { return roundVal(this.percentage) + ' %'; }"
+        self.model.tooltip.formatter = JavaScript("function() { return roundVal(this.percentage) + ' %'; }")
 
         self.model.plotOptions.pie.allowPointSelect = true
         self.model.plotOptions.pie.cursor = 'pointer'
@@ -97,44 +101,20 @@ class HighchartRender(object):
         if self.config['serie_op'] == 'len':
             repr_char = ''
             repr_fun = ''
-        self.model.plotOptions.pie.dataLabels.formatter = "function() { return '<b>'+ this.point.name +'</b>: %s '+ %s(this.point.y); }" % (repr_char, repr_fun)
-
-    def set_bar_chart_options(self, report_rows):
-        funcs_op = {
-            'sum': sum,
-            'max': max,
-            'min': min,
-            'len': len,
-            'avg': lambda vlist: sum(vlist) / len(vlist)
-        }
-        serie_operation = funcs_op[self.config['serie_op']]
+        self.model.plotOptions.pie.dataLabels.formatter = JavaScript("function() { return '<b>'+ this.point.name +'</b>: %s '+ %s(this.point.y); }" % (repr_char, repr_fun))
 
-        serie_data = []
+    def set_bar_chart_options(self, serie_data):
+        grouper = None
+        serie_values = []
         xAxis_categories = []
         yAxis_min = 0
-        for grouper, rows in report_rows:
-            add_group = True
-            if self.config['has_report_totals']:
-                if len(rows) <= 2:
-                    add_group = False
-            if not add_group:
-                continue
-            serie_values = []
-            for r in rows:
-                if r.is_value():
-                    value = r[self.config['serie_field']].value
-                    if not is_numeric(value):
-                        value = 1  # TOOD: Map serie_field with posible serie_operator
-                    serie_values.append(value)
-
-            value = serie_operation(serie_values)
-            grouper = unicodeToHTMLEntities(grouper)
-            serie_data.append(round(value, 2))
+        for grouper, value in serie_data:
+            serie_values.append(round(value, 2))
             xAxis_categories.append(grouper)
             yAxis_min = yAxis_min if value > yAxis_min else value
         data = self.model.serie_obj.create(**{
-            'name': grouper,
-            'data': serie_data,
+            'name': self.config.get('serie_name', grouper),
+            'data': serie_values,
         })
         self.model.series.add(data)
 
@@ -144,46 +124,39 @@ class HighchartRender(object):
         self.model.xAxis.categories = xAxis_categories
         self.model.xAxis.min = yAxis_min
         self.model.yAxis.title.text = ' '
-        self.model.tooltip.formatter = "function() { return ''+ this.x +': '+ this.y; }"
+        self.model.tooltip.formatter = JavaScript("function() { return ''+ this.x +': '+ this.y; }")
         self.model.plotOptions.column.pointPadding = 0.2
         self.model.plotOptions.column.borderWidth = 0.0
         self.model.plotOptions.column.colorByPoint = true
         self.model.legend.enabled = false
 
-    def set_line_chart_options(self, report_rows):
-        xAxis_categories = []
+    def set_line_chart_options(self, serie_data):
         max_length = 0
-        for grouper, rows in report_rows:
-            add_group = True
-            if self.config['has_report_totals']:
-                if len(rows) <= 2:
-                    add_group = False
-            if not add_group:
-                continue
-            serie_values = []
-            for row in rows:
-                if row.is_value():
-                    value = row[self.config['serie_field']].value
-                    if not is_numeric(value):
-                        value = 1  # TOOD: Map serie_field with posible serie_operator
-                    serie_values.append(float(value))
-
-            grouper = unicodeToHTMLEntities(grouper)
-            xAxis_categories.append(grouper)
+        max_points = self.config.get('max_points')
+        downsampled = False
+        for grouper, serie_values in serie_data:
+            if len(serie_values) > max_length:
+                max_length = len(serie_values)
+            if max_points and len(serie_values) > max_points:
+                points = downsample(serie_values, max_points, self.config.get('downsample') or 'lttb')
+                serie_values = [[index + 1, value] for index, value in points]
+                downsampled = True
             data = self.model.serie_obj.create(**{
                 'name': grouper,
                 'data': serie_values,
             })
             self.model.series.add(data)
-            if len(serie_values) > max_length:
-                max_length = len(serie_values)
 
-        xAxis_categories = range(1, max_length + 1)
         self.model.chart.renderTo = 'container'
         self.model.chart.type = 'line'
 
         self.model.title.text = self.config['title']
-        self.model.xAxis.categories = xAxis_categories
+        if downsampled:
+            # downsampled series have [x, y] points, use a numeric axis
+            self.model.plotOptions.line.pointStart = 1
+            self.model.xAxis.allowDecimals = false
+        else:
+            self.model.xAxis.categories = range(1, max_length + 1)
 
         self.model.yAxis.title.text = 'USD'
 
@@ -191,7 +164,7 @@ class HighchartRender(object):
         self.model.plotOptions.line.enableMouseTracking = false
 
         self.model.tooltip.enabled = true
-        self.model.tooltip.formatter = "function() { return '<b>'+this.series.name+'</b> '+this.x+': '+this.y; }"
+        self.model.tooltip.formatter = JavaScript("function() { return '<b>'+this.series.name+'</b> '+this.x+': '+this.y; }")
 
     def is_valid(self):
         if self.config:
@@ -199,32 +172,47 @@ class HighchartRender(object):
                 return True
         return False
 
-    def get_chart(self, report_rows):
+    def get_chart(self, report_rows=None, serie_data=None):
+        """
+        Set the chart options from ``report_rows`` or from ``serie_data``: a
+        list of ``(group, value)`` for pie and column charts or a list of
+        ``(group, values)`` for line charts.
+        """
         self.reset()
-        if report_rows and self.is_valid():
+        if (report_rows or serie_data) and self.is_valid():
+            if serie_data is None:
+                serie_data = self.get_serie_data(report_rows)
+                if self.config['chart_mode'] != 'line':
+                    serie_data = self.aggregate(serie_data)
+            if self.config.get('scale') and self.config['chart_mode'] != 'line' and \
+                    self.config['serie_op'] in ('sum', 'len'):
+                # the series of a sample, estimated for every row
+                serie_data = [(grouper, value * self.config['scale']) for grouper, value in serie_data]
             if self.config['chart_mode'] == 'pie':
                 self.model.credits.enabled = false
-                self.set_pie_chart_options(report_rows)
+                self.set_pie_chart_options(serie_data)
             if self.config['chart_mode'] == 'column':
                 self.model.credits.enabled = false
-                self.set_bar_chart_options(report_rows)
+                self.set_bar_chart_options(serie_data)
             if self.config['chart_mode'] == 'line':
                 self.model.credits.enabled = false
-                self.set_line_chart_options(report_rows)
+                self.set_line_chart_options(serie_data)
         return self
 
     @property
     def options(self):
-        from django.utils import simplejson
-        json = unicode(self.model)
-        json = simplejson.dumps(json)[1:-1]
-        json = json.replace("'true'", 'true')
-        json = json.replace("'false'", 'false')
-        json = json.replace("'null'", 'null')
-        json = json.replace('\\"', '')
-        json = json.replace('},', '},\n\t')
-        json = json.replace('[{', '[\n\t{')
-        json = json.replace('}]', '}\n]')
-        json = json.replace("u'", "'")
-        json = HTMLEntitiesToUnicode(json)
-        return json
+        return to_javascript(self.model)
+
+    @property
+    def json_options(self):
+        """
+        Chart options as JSON, javascript functions are written as strings.
+        """
+        return to_json(self.model)
+
+    @property
+    def javascript_paths(self):
+        """
+        Paths of the javascript functions written as strings in ``json_options``.
+        """
+        return get_javascript_paths(self.model)
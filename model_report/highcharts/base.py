@@ -1,4 +1,13 @@
 # -*- coding: utf-8 -*-
+import re
+from decimal import Decimal
+
+try:
+    from json.encoder import encode_basestring_ascii
+except ImportError:
+    from django.utils.simplejson.encoder import encode_basestring_ascii
+
+from django.utils.functional import Promise
 from django.utils.translation import ugettext_lazy
 from django.utils.encoding import force_unicode
 
@@ -62,3 +71,215 @@ class DictObject:
         obj = DictObject(**self.__dict__)
         obj.update(**defaults)
         return obj
+
+
+class OverlayObject(object):
+    """
+    Sparse copy on write view of a :class:`DictObject` template. Changed
+    members are kept in the overlay, the template is never modified, so one
+    template can be shared by every chart.
+    """
+
+    def __init__(self, template, **overlay):
+        object.__setattr__(self, '_template', template)
+        object.__setattr__(self, '_overlay', overlay)
+
+    def __getattr__(self, name):
+        overlay = self._overlay
+        if name in overlay:
+            return overlay[name]
+        value = getattr(self._template, name)
+        if isinstance(value, DictObject):
+            value = overlay[name] = OverlayObject(value)
+        elif isinstance(value, CollectionObject):
+            collection = CollectionObject()
+            collection._dicts.extend(value._dicts)
+            value = overlay[name] = collection
+        return value
+
+    def __setattr__(self, name, value):
+        self._overlay[name] = value
+
+    def update(self, **kwargs):
+        self._overlay.update(kwargs)
+
+    def items(self):
+        """
+        Return the members of the template merged with the overlay.
+        """
+        overlay = self._overlay
+        items = [(k, overlay.get(k, v)) for k, v in self._template.__dict__.items()]
+        items.extend([(k, v) for k, v in overlay.items() if k not in self._template.__dict__])
+        return items
+
+    def create(self, **defaults):
+        obj = OverlayObject(self._template, **self._overlay)
+        obj.update(**defaults)
+        return obj
+
+    def to_dict_object(self):
+        """
+        Return a :class:`DictObject` with the members of the template merged with
+        the overlay.
+        """
+        obj = DictObject()
+        for k, v in self.items():
+            if isinstance(v, OverlayObject):
+                v = v.to_dict_object()
+            elif isinstance(v, CollectionObject):
+                collection = CollectionObject()
+                for item in v._dicts:
+                    collection.add(item.to_dict_object() if isinstance(item, OverlayObject) else item)
+                v = collection
+            obj.__dict__[k] = v
+        return obj
+
+
+class JavaScript(unicode):
+    """
+    Option value written as raw javascript instead of a quoted string.
+    """
+
+
+LITERALS = (true, false, null)
+SCRIPT_ESCAPES_RE = re.compile(r'[<>&]')
+SCRIPT_ESCAPES = {'<': '\\u003c', '>': '\\u003e', '&': '\\u0026'}
+
+
+def quote(value):
+    """
+    Return a javascript string literal safe to be written inside a <script> tag.
+    """
+    value = encode_basestring_ascii(value)
+    if SCRIPT_ESCAPES_RE.search(value):
+        value = SCRIPT_ESCAPES_RE.sub(lambda match: SCRIPT_ESCAPES[match.group(0)], value)
+    return value
+
+
+def to_javascript(value):
+    """
+    Return the javascript representation of an option value. The option tree
+    is walked once and every chunk is joined at the end.
+    """
+    chunks = []
+    if not write_javascript(value, chunks):
+        chunks.append('{}')
+    return u''.join(chunks)
+
+
+def to_json(value):
+    """
+    Return the JSON representation of an option value. Raw javascript, like
+    formatter functions, is written as strings.
+    """
+    chunks = []
+    if not write_javascript(value, chunks, raw=False):
+        chunks.append('{}')
+    return u''.join(chunks)
+
+
+def get_javascript_paths(value, path=()):
+    """
+    Return the paths, lists of member names and item indexes, of the
+    :class:`JavaScript` values of an option value, to revive the values
+    written as strings by :func:`to_json`, and only them.
+    """
+    if isinstance(value, JavaScript):
+        return [list(path)]
+    if isinstance(value, DictObject):
+        items = value.__dict__.items()
+    elif isinstance(value, OverlayObject):
+        items = value.items()
+    elif isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, (CollectionObject, list, tuple)):
+        items = enumerate(value._dicts if isinstance(value, CollectionObject) else value)
+    else:
+        return []
+    paths = []
+    for key, item in items:
+        paths.extend(get_javascript_paths(item, path + (key,)))
+    return paths
+
+
+def write_javascript(value, chunks, raw=True):
+    """
+    Append the javascript chunks of an option value to ``chunks``. Returns
+    ``False``, and appends nothing, when ``value`` is an object without members.
+
+    ``'true'``, ``'false'``, ``'null'``, and unless ``raw`` is ``False``,
+    :class:`JavaScript` values, are written as raw javascript. Any other
+    string is quoted.
+    """
+    kind = type(value)
+    # numbers first, they are most of the values of a big series
+    if kind is float:
+        # NaN and infinity are not valid JSON
+        chunks.append(repr(value) if value - value == 0 else null)
+        return True
+    if kind is int or kind is long:
+        chunks.append(str(value))
+        return True
+    if isinstance(value, Promise):
+        value = force_unicode(value)
+    if isinstance(value, DictObject):
+        return write_members(value.__dict__.items(), chunks, True, raw)
+    if isinstance(value, OverlayObject):
+        return write_members(value.items(), chunks, True, raw)
+    if isinstance(value, dict):
+        return write_members(value.items(), chunks, False, raw)
+    if isinstance(value, CollectionObject):
+        value = value._dicts
+    if isinstance(value, (list, tuple, xrange)):
+        chunks.append('[')
+        for i, item in enumerate(value):
+            if i:
+                chunks.append(',')
+            if not write_javascript(item, chunks, raw):
+                chunks.append('{}')
+        chunks.append(']')
+    elif isinstance(value, basestring):
+        if value in LITERALS or raw and isinstance(value, JavaScript):
+            chunks.append(value)
+        else:
+            chunks.append(quote(value))
+    elif isinstance(value, bool):
+        chunks.append(true if value else false)
+    elif value is None:
+        chunks.append(null)
+    elif isinstance(value, (int, long)):
+        chunks.append(str(long(value)))
+    elif isinstance(value, (float, Decimal)):
+        return write_javascript(float(value), chunks, raw)
+    else:
+        chunks.append(quote(force_unicode(value)))
+    return True
+
+
+def write_members(items, chunks, skip_null=False, raw=True):
+    """
+    Append the chunks of a javascript object. With ``skip_null`` the unset
+    (``null``) and empty string members are left out, and the
+    :class:`DictObject` and :class:`OverlayObject` members without members too. Set a member to ``None``
+    to write an explicit ``null``.
+    """
+    start = len(chunks)
+    chunks.append('{')
+    for key, value in items:
+        if skip_null and isinstance(value, basestring) and value in (null, ''):
+            continue
+        member = len(chunks)
+        if member > start + 1:
+            chunks.append(',')
+        chunks.append(quote(key))
+        chunks.append(':')
+        if not write_javascript(value, chunks, raw):
+            if skip_null and isinstance(value, (DictObject, OverlayObject)):
+                del chunks[member:]
+            else:
+                chunks.append('{}')
+    if len(chunks) == start + 1:
+        del chunks[start:]
+        return False
+    chunks.append('}')
+    return True
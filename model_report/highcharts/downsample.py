@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+
+def largest_triangle_three_buckets(values, threshold):
+    """
+    Downsample ``values`` to ``threshold`` points with the Largest Triangle
+    Three Buckets algorithm, which keeps the visual shape of the line. Returns
+    a list of ``(index, value)``. Runs in linear time.
+    """
+    length = len(values)
+    if threshold >= length or threshold < 3:
+        return list(enumerate(values))
+
+    sampled = [(0, values[0])]
+    every = float(length - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # average point of the next bucket
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, length)
+        avg_x = (avg_start + avg_end - 1) / 2.0
+        avg_y = sum(values[avg_start:avg_end]) / float(avg_end - avg_start)
+
+        # point of this bucket with the largest triangle with a and the average
+        ax, ay = a, values[a]
+        max_area = -1
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs((ax - avg_x) * (values[j] - ay) - (ax - j) * (avg_y - ay))
+            if area > max_area:
+                max_area = area
+                a = j
+        sampled.append((a, values[a]))
+
+    sampled.append((length - 1, values[-1]))
+    return sampled
+
+
+def min_max_buckets(values, threshold):
+    """
+    Downsample ``values`` to at most ``threshold`` points keeping the minimum
+    and the maximum of ``threshold / 2`` buckets. Returns a list of
+    ``(index, value)``. Runs in linear time.
+    """
+    length = len(values)
+    if threshold >= length or threshold < 2:
+        return list(enumerate(values))
+
+    sampled = []
+    every = float(length) / (threshold / 2)
+    for i in range(threshold / 2):
+        start = int(i * every)
+        end = min(int((i + 1) * every), length)
+        if start >= end:
+            continue
+        low = high = start
+        for j in range(start + 1, end):
+            if values[j] < values[low]:
+                low = j
+            elif values[j] > values[high]:
+                high = j
+        for index in sorted(set([low, high])):
+            sampled.append((index, values[index]))
+    return sampled
+
+
+DOWNSAMPLE_METHODS = {
+    'lttb': largest_triangle_three_buckets,
+    'minmax': min_max_buckets,
+}
+
+
+def downsample(values, threshold, method='lttb'):
+    """
+    Downsample ``values`` to ``threshold`` points with ``method``: ``'lttb'``
+    or ``'minmax'``.
+    """
+    try:
+        func = DOWNSAMPLE_METHODS[method]
+    except KeyError:
+        raise ValueError('Unknown downsample method "%s".' % method)
+    return func(values, threshold)
@@ -1,5 +1,20 @@
 # -*- coding: utf-8 -*-
-from model_report.highcharts.base import true, false, null, Solid, outside, undefined, _, CollectionObject, DictObject
+from model_report.highcharts.base import true, false, null, Solid, outside, undefined, _, CollectionObject, DictObject, JavaScript
+
+
+_highchart_template = None
+
+
+def get_highchart_template():
+    """
+    Function helper that returns the default highcharts options as a
+    :class:`DictObject` built once. It is shared, wrap it with an
+    :class:`model_report.highcharts.base.OverlayObject` to change options.
+    """
+    global _highchart_template
+    if _highchart_template is None:
+        _highchart_template = DictObject(**get_highchart_data())
+    return _highchart_template
 
 
 def get_highchart_data():
@@ -188,7 +203,7 @@ def get_highchart_data():
         'crosshairs': null,
         'enabled': true,
         'footerFormat': false,
-        'formatter': "function() { return '<b>'+ this.series.name + '</b><br/>' + this.x + ': ' + this.y +'C'; }",
+        'formatter': JavaScript("function() { return '<b>'+ this.series.name + '</b><br/>' + this.x + ': ' + this.y +'C'; }"),
         'pointFormat': null,
         'positioner': null,
         'shadow': true,
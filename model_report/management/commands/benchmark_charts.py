@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import random
+import time
+from optparse import make_option
+
+try:
+    import json
+except ImportError:
+    from django.utils import simplejson as json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from model_report.highcharts import HighchartRender
+from model_report.utils import ReportRow, ReportValue
+
+try:
+    from BeautifulSoup import BeautifulStoneSoup
+except ImportError:
+    BeautifulStoneSoup = None
+
+
+def legacy_options(model):
+    """
+    Serialize the chart options the way ``HighchartRender.options`` did before
+    :func:`model_report.highcharts.base.to_javascript`: ``repr`` of the option
+    tree, string replaces and HTML entities decoding with BeautifulSoup.
+    """
+    options = unicode(model)
+    options = json.dumps(options)[1:-1]
+    options = options.replace("'true'", 'true')
+    options = options.replace("'false'", 'false')
+    options = options.replace("'null'", 'null')
+    options = options.replace('\\"', '')
+    options = options.replace('},', '},\n\t')
+    options = options.replace('[{', '[\n\t{')
+    options = options.replace('}]', '}\n]')
+    options = options.replace("u'", "'")
+    if BeautifulStoneSoup is not None:
+        options = unicode(BeautifulStoneSoup(options, convertEntities=BeautifulStoneSoup.ALL_ENTITIES))
+    return options
+
+
+def make_report_rows(points, groups=1, seed=0):
+    """
+    Return ``report_rows`` with ``points`` values split in ``groups`` groups.
+    """
+    rnd = random.Random(seed)
+    per_group = max(points / max(groups, 1), 1)
+    report_rows = []
+    for index in range(groups):
+        rows = [ReportRow([ReportValue(round(rnd.random() * 1000, 2))]) for i in xrange(per_group)]
+        report_rows.append((u'Group %s' % index, rows))
+    return report_rows
+
+
+def best_time(func, repeat):
+    timings = []
+    for i in range(repeat):
+        start = time.time()
+        result = func()
+        timings.append(time.time() - start)
+    return min(timings), result
+
+
+class Command(BaseCommand):
+    help = 'Time the serialization of the chart options against the previous repr based serialization.'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--points', dest='points', type='int', default=10000,
+                    help='Number of points of the chart. Default: 10000'),
+        make_option('--groups', dest='groups', type='int', default=1,
+                    help='Number of groups (series of a line chart). Default: 1'),
+        make_option('--modes', dest='modes', default='line,column,pie',
+                    help='Comma separated chart modes. Default: line,column,pie'),
+        make_option('--repeat', dest='repeat', type='int', default=5,
+                    help='Serialize every chart this many times and keep the best timing. Default: 5'),
+    )
+
+    def handle(self, *args, **options):
+        modes = [m for m in options['modes'].split(',') if m]
+        if not modes or set(modes) - set(['line', 'column', 'pie']):
+            raise CommandError('Unknown chart mode in: %s' % options['modes'])
+        if BeautifulStoneSoup is None:
+            self.stdout.write('BeautifulSoup is not installed, the legacy timings skip entities decoding.\n')
+
+        self.stdout.write('%-8s %8s %12s %12s %8s %10s\n' % ('mode', 'points', 'legacy', 'direct', 'speedup',
+                                                              'bytes'))
+        for mode in modes:
+            # column and pie charts get one point per group
+            groups = options['groups'] if mode == 'line' else options['points']
+            report_rows = make_report_rows(options['points'], groups)
+            config = {
+                'chart_mode': mode,
+                'serie_field': 0,
+                'serie_op': 'sum',
+                'title': 'Benchmark',
+                'has_report_totals': False,
+                'has_group_totals': False,
+            }
+            chart = HighchartRender(config).get_chart(report_rows)
+            model = chart.model.to_dict_object()
+            legacy, legacy_output = best_time(lambda: legacy_options(model), options['repeat'])
+            direct, output = best_time(lambda: chart.options, options['repeat'])
+            self.stdout.write('%-8s %8s %11.4fs %11.4fs %7.1fx %10s\n' % (
+                mode, options['points'], legacy, direct, legacy / direct if direct else 0, len(output)))
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+import datetime
+import time
+from optparse import make_option
+
+try:
+    import json
+except ImportError:
+    from django.utils import simplejson as json
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test.client import RequestFactory
+
+from model_report.report import reports, autodiscover
+from model_report.views import report as report_view
+
+
+def get_report_cases(report_class):
+    """
+    Return a list of ``(case_name, GET params)`` to benchmark a report class:
+    the plain HTML view, every grouping, every chart mode and every export.
+    """
+    report = report_class()
+    base = {'__all__': '1'}
+    if report.get_groupby_fields():
+        base['groupby'] = 'None'
+
+    cases = [('html', dict(base))]
+    for mfield, field, caption in report.get_groupby_fields():
+        params = dict(base, groupby=field)
+        cases.append(('groupby:%s' % field, params))
+        cases.append(('groupby:%s:onlytotals' % field, dict(params, onlytotals='on')))
+
+    serie_fields = report.get_serie_fields()
+    groupby_fields = report.get_groupby_fields()
+    if report.type == 'chart' and serie_fields and groupby_fields:
+        index = serie_fields[-1][0]
+        groupby = groupby_fields[0][1]
+        for chart_mode in report.chart_types:
+            cases.append(('chart:%s' % chart_mode, dict(base, groupby=groupby, chart_mode=chart_mode,
+                                                        serie_field=index, serie_op='sum')))
+
+    for export in report.exports:
+        cases.append(('export:%s' % export, dict(base, export=export)))
+    return cases
+
+
+def run_case(slug, params, repeat=1):
+    """
+    Render the report view ``repeat`` times and return a dict with timings,
+    number of queries and response size.
+    """
+    factory = RequestFactory()
+    timings = []
+    queries = 0
+    size = 0
+    status = None
+    use_debug_cursor = connection.use_debug_cursor
+    connection.use_debug_cursor = True
+    try:
+        for i in range(repeat):
+            request = factory.get('/%s/' % slug, params)
+            reset_queries()
+            start = time.time()
+            response = report_view(request, slug)
+            content = response.content
+            timings.append(time.time() - start)
+            queries = len(connection.queries)
+            size = len(content)
+            status = response.status_code
+    finally:
+        connection.use_debug_cursor = use_debug_cursor
+        reset_queries()
+    return {
+        'seconds': min(timings),
+        'timings': timings,
+        'queries': queries,
+        'bytes': size,
+        'status': status,
+    }
+
+
+def result_key(result):
+    return '%s|%s|%s' % (result['size'], result['report'], result['case'])
+
+
+class Command(BaseCommand):
+    help = 'Time the HTML view, groupings, charts and exports of every registered report.'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--reports', dest='reports', default='',
+                    help='Comma separated report slugs to benchmark. Default: all registered reports'),
+        make_option('--sizes', dest='sizes', default='',
+                    help='Comma separated data sizes, e.g. 10000,100000,1000000. Requires --generator'),
+        make_option('--generator', dest='generator', default='',
+                    help='Management command called with --rows=<size> --flush before each size'),
+        make_option('--repeat', dest='repeat', type='int', default=3,
+                    help='Render every case this many times and keep the best timing. Default: 3'),
+        make_option('--output', dest='output', default='',
+                    help='Write the results as JSON into this file'),
+        make_option('--compare', dest='compare', default='',
+                    help='JSON results file of a previous run to compare against'),
+        make_option('--threshold', dest='threshold', type='float', default=1.25,
+                    help='Slowdown ratio reported as regression when using --compare. Default: 1.25'),
+    )
+
+    def handle(self, *args, **options):
+        if not reports.get_reports():
+            autodiscover()
+
+        slugs = [s for s in options['reports'].split(',') if s]
+        report_classes = [reports.get_report(s) for s in slugs] if slugs else reports.get_reports()
+        if None in report_classes:
+            raise CommandError('Unknown report slug in: %s' % options['reports'])
+
+        sizes = [int(s) for s in options['sizes'].split(',') if s]
+        if sizes and not options['generator']:
+            raise CommandError('--sizes requires --generator to populate the database.')
+
+        results = []
+        for size in sizes or [None]:
+            if size is not None:
+                self.stdout.write('Generating %s rows with "%s"...\n' % (size, options['generator']))
+                call_command(options['generator'], rows=size, flush=True, verbosity=0)
+            for report_class in report_classes:
+                for case, params in get_report_cases(report_class):
+                    result = {'size': size, 'report': report_class.slug, 'case': case}
+                    try:
+                        result.update(run_case(report_class.slug, params, options['repeat']))
+                    except Exception, e:
+                        result.update({'error': '%s: %s' % (e.__class__.__name__, e)})
+                    results.append(result)
+                    self.write_result(result)
+
+        data = {
+            'date': datetime.datetime.now().isoformat(),
+            'backend': settings.DATABASES['default']['ENGINE'],
+            'django': django.get_version(),
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(data, output, indent=2)
+
+        if options['compare']:
+            with open(options['compare']) as baseline_file:
+                baseline = json.load(baseline_file)
+            regressions = self.compare(baseline['results'], results, options['threshold'])
+            if regressions:
+                raise CommandError('%s cases are slower than the baseline.' % regressions)
+
+    def write_result(self, result):
+        if 'error' in result:
+            self.stdout.write('%(size)8s %(report)-30s %(case)-40s ERROR %(error)s\n' % result)
+        else:
+            self.stdout.write('%(size)8s %(report)-30s %(case)-40s %(seconds)9.4fs %(queries)6s queries '
+                              '%(bytes)10s bytes\n' % result)
+
+    def compare(self, baseline, results, threshold):
+        previous = dict((result_key(r), r) for r in baseline if 'seconds' in r)
+        regressions = 0
+        for result in results:
+            old = previous.get(result_key(result))
+            if not old or 'seconds' not in result:
+                continue
+            ratio = result['seconds'] / old['seconds'] if old['seconds'] else 1.0
+            flags = []
+            if ratio > threshold:
+                flags.append('SLOWER')
+            if result['queries'] > old['queries']:
+                flags.append('MORE QUERIES (%s -> %s)' % (old['queries'], result['queries']))
+            if flags:
+                regressions += 1
+                self.stdout.write('%8s %-30s %-40s x%.2f %s\n' % (result['size'], result['report'], result['case'],
+                                                                  ratio, ' '.join(flags)))
+        return regressions
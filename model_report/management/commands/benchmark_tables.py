@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+import random
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import render_to_string
+
+from model_report.utils import ReportRow, ReportValue, sum_column
+
+
+class TableReport(object):
+    """
+    The attributes of a report read by the table templates.
+    """
+    onlytotals = False
+    is_export = False
+    parent_report = None
+    fast_table = False
+
+
+def make_table_rows(rows, columns=6, groups=10, seed=0):
+    """
+    Return ``report_rows`` with ``rows`` value rows of ``columns`` values split
+    in ``groups`` groups, each one with a totals row.
+    """
+    rnd = random.Random(seed)
+    per_group = max(rows / max(groups, 1), 1)
+    report_rows = []
+    for index in range(groups):
+        group_rows = []
+        for i in xrange(per_group):
+            group_rows.append(ReportRow([ReportValue(round(rnd.random() * 1000, 2)) for c in range(columns)]))
+        totals_row = ReportRow([ReportValue(sum_column([row[c].value for row in group_rows]))
+                                for c in range(columns)])
+        totals_row.is_total = True
+        group_rows.append(totals_row)
+        report_rows.append((u'Group %s' % index, group_rows))
+    return report_rows
+
+
+def render_table(report_rows, columns, fast_table):
+    report = TableReport()
+    report.fast_table = fast_table
+    return render_to_string('model_report/includes/report_table.html', {
+        'report': report,
+        'column_labels': [u'Column %s' % c for c in range(columns)],
+        'report_rows': report_rows,
+    })
+
+
+def best_time(func, repeat):
+    timings = []
+    for i in range(repeat):
+        start = time.time()
+        result = func()
+        timings.append(time.time() - start)
+    return min(timings), result
+
+
+class Command(BaseCommand):
+    help = 'Time the rendering of the report table with the template and with the fast table renderer.'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--rows', dest='rows', default='10000,100000',
+                    help='Comma separated numbers of rows of the table. Default: 10000,100000'),
+        make_option('--columns', dest='columns', type='int', default=6,
+                    help='Number of columns of the table. Default: 6'),
+        make_option('--groups', dest='groups', type='int', default=10,
+                    help='Number of groups of the table. Default: 10'),
+        make_option('--repeat', dest='repeat', type='int', default=3,
+                    help='Render every table this many times and keep the best timing. Default: 3'),
+    )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(rows) for rows in options['rows'].split(',') if rows]
+        except ValueError:
+            raise CommandError('Invalid number of rows in: %s' % options['rows'])
+
+        self.stdout.write('%8s %12s %12s %8s %10s %10s\n' % ('rows', 'template', 'fast', 'speedup', 'bytes',
+                                                             'identical'))
+        for rows in sizes:
+            report_rows = make_table_rows(rows, options['columns'], options['groups'])
+            template, template_output = best_time(
+                lambda: render_table(report_rows, options['columns'], False), options['repeat'])
+            fast, fast_output = best_time(
+                lambda: render_table(report_rows, options['columns'], True), options['repeat'])
+            self.stdout.write('%8s %11.4fs %11.4fs %7.1fx %10s %10s\n' % (
+                rows, template, fast, template / fast if fast else 0, len(fast_output),
+                'yes' if fast_output == template_output else 'no'))
@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+import datetime
+import re
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import get_models, ManyToManyField
+from django.db.models.related import RelatedObject
+from django.test.client import RequestFactory
+
+from model_report.report import reports, autodiscover
+from model_report.widgets import RangeField
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    OrderedDict = dict
+
+
+def get_backend():
+    return settings.DATABASES['default']['ENGINE'].split('.')[-1]
+
+
+def resolve_lookup(model, lookup):
+    """
+    Return ``(model, field)`` of the column a lookup ends in, or ``None`` when
+    it ends in a reverse relation or a many to many field.
+    """
+    field = None
+    for part in lookup.split('__'):
+        if field is not None:
+            if isinstance(field, RelatedObject):
+                model = field.model
+            elif getattr(field, 'rel', None):
+                model = field.rel.to
+            else:
+                break  # date__year, date__month...
+        try:
+            field = model._meta.get_field_by_name(part)[0]
+        except Exception:
+            return None
+    if isinstance(field, (RelatedObject, ManyToManyField)):
+        return None
+    return model, field
+
+
+def get_filter_sample(report, name, field):
+    """
+    Return GET parameters with a representative value for a filter form field.
+    """
+    if isinstance(field, RangeField):
+        start = datetime.date.today() - datetime.timedelta(days=30)
+        return {'%s_0' % name: start.strftime('%Y-%m-%d')}
+    if hasattr(field, 'queryset'):
+        pks = list(field.queryset.values_list('pk', flat=True)[:1])
+        return {name: pks[0]} if pks else {}
+    if getattr(field, 'choices', None):
+        for value, label in field.choices:
+            if value not in ('', None):
+                return {name: value}
+        return {}
+    values = list(report.model.objects.exclude(**{name: None}).values_list(name, flat=True)[:1])
+    return {name: values[0]} if values else {}
+
+
+def get_explain_cases(report_class):
+    """
+    Return a list of ``(case_name, groupby_data, filter GET params)``: no filter,
+    every grouping, every filter alone and all the filters together.
+    """
+    report = report_class()
+    cases = [('all', None, {})]
+    for mfield, field, caption in report.get_groupby_fields():
+        cases.append(('groupby:%s' % field, {'groupby': field}, {}))
+
+    form = report.get_form_filter(RequestFactory().get('/'))
+    all_filters = {}
+    for name, field in form.fields.items():
+        if name == '__all__':
+            continue
+        params = get_filter_sample(report, name, field)
+        if params:
+            cases.append(('filter:%s' % name, None, params))
+            all_filters.update(params)
+    if len(all_filters) > 1:
+        cases.append(('filter:all', None, all_filters))
+    return cases
+
+
+def explain(qs, analyze=False):
+    """
+    Run EXPLAIN for a queryset and return the plan as a list of dicts.
+    """
+    sql, params = qs.query.get_compiler(using=qs.db).as_sql()
+    backend = get_backend()
+    if 'sqlite' in backend:
+        prefix = 'EXPLAIN QUERY PLAN '
+    elif 'postgres' in backend:
+        prefix = 'EXPLAIN ANALYZE ' if analyze else 'EXPLAIN '
+    elif 'mysql' in backend:
+        prefix = 'EXPLAIN '
+    else:
+        raise CommandError('EXPLAIN is not supported for "%s".' % backend)
+    cursor = connection.cursor()
+    cursor.execute(prefix + sql, params)
+    columns = [col[0].lower() for col in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def plan_lines(plan):
+    lines = []
+    for row in plan:
+        if 'query plan' in row:  # postgresql
+            lines.append(row['query plan'])
+        elif 'detail' in row:  # sqlite
+            lines.append(row['detail'])
+        else:  # mysql
+            lines.append(' '.join(['%s=%s' % (k, v) for k, v in sorted(row.items()) if v is not None]))
+    return lines
+
+
+def find_problems(plan):
+    """
+    Return a list of ``(kind, table)`` with the sequential scans and sorts of a
+    plan. ``table`` is ``None`` when the plan doesn't tell the sorted table.
+    """
+    problems = []
+    for row in plan:
+        if 'query plan' in row:
+            line = row['query plan']
+            match = re.search(r'Seq Scan on (\w+)', line)
+            if match:
+                problems.append(('scan', match.group(1)))
+            match = re.search(r'Sort Key: "?(\w+)"?\.', line)
+            if match:
+                problems.append(('sort', match.group(1)))
+        elif 'detail' in row:
+            line = row['detail']
+            match = re.search(r'^SCAN (?:TABLE )?(\w+)', line)
+            if match and 'INDEX' not in line:
+                problems.append(('scan', match.group(1)))
+            if 'USE TEMP B-TREE' in line:
+                problems.append(('sort', None))
+        else:
+            if row.get('type') == 'ALL':
+                problems.append(('scan', row.get('table')))
+            if 'filesort' in (row.get('extra') or ''):
+                problems.append(('sort', row.get('table')))
+    return problems
+
+
+def count_rows(model):
+    if 'postgres' in get_backend():
+        cursor = connection.cursor()
+        cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s', [model._meta.db_table])
+        row = cursor.fetchone()
+        if row and row[0] > 0:
+            return int(row[0])
+    return model.objects.count()
+
+
+def get_indexed_columns(table):
+    cursor = connection.cursor()
+    try:
+        return set(connection.introspection.get_indexes(cursor, table).keys())
+    except NotImplementedError:
+        return set()
+
+
+def index_ddl(table, columns):
+    qn = connection.ops.quote_name
+    name = ('%s_%s_idx' % (table, '_'.join(columns)))[:63]
+    return 'CREATE INDEX %s ON %s (%s);' % (qn(name), qn(table), ', '.join([qn(c) for c in columns]))
+
+
+class Command(BaseCommand):
+    help = ('EXPLAIN the queries of every registered report for representative groupings and filters, '
+            'flag sequential scans and sorts on large tables and suggest indexes.')
+
+    option_list = BaseCommand.option_list + (
+        make_option('--reports', dest='reports', default='',
+                    help='Comma separated report slugs to explain. Default: all registered reports'),
+        make_option('--min-rows', dest='min_rows', type='int', default=10000,
+                    help='Only flag tables with at least this many rows. Default: 10000'),
+        make_option('--analyze', action='store_true', dest='analyze', default=False,
+                    help='Use EXPLAIN ANALYZE (postgresql), the queries are executed'),
+    )
+
+    def handle(self, *args, **options):
+        if not reports.get_reports():
+            autodiscover()
+        slugs = [s for s in options['reports'].split(',') if s]
+        report_classes = [reports.get_report(s) for s in slugs] if slugs else reports.get_reports()
+        if None in report_classes:
+            raise CommandError('Unknown report slug in: %s' % options['reports'])
+
+        verbosity = int(options.get('verbosity', 1))
+        tables = dict((model._meta.db_table, model) for model in get_models())
+        table_rows = {}
+        suggestions = OrderedDict()
+
+        for report_class in report_classes:
+            for case, groupby_data, params in get_explain_cases(report_class):
+                report = report_class()
+                form = report.get_form_filter(RequestFactory().get('/', params))
+                qs, ffields = report.get_values_queryset(groupby_data, form.get_filter_kwargs())
+                plan = explain(qs, options['analyze'])
+
+                self.stdout.write('%s [%s]\n' % (report_class.slug, case))
+                if verbosity > 1:
+                    for line in plan_lines(plan):
+                        self.stdout.write('    %s\n' % line)
+
+                problems = []
+                for kind, table in find_problems(plan):
+                    table = table or report.model._meta.db_table
+                    if (kind, table) not in problems:
+                        problems.append((kind, table))
+
+                for kind, table in problems:
+                    if table not in tables:
+                        continue
+                    if table not in table_rows:
+                        table_rows[table] = count_rows(tables[table])
+                    if table_rows[table] < options['min_rows']:
+                        continue
+                    label = 'sequential scan' if kind == 'scan' else 'sort'
+                    self.stdout.write('    ! %s on %s (%s rows)\n' % (label, table, table_rows[table]))
+                    for ddl in self.get_suggestions(report, kind, table, groupby_data, params):
+                        used_by = suggestions.setdefault(ddl, [])
+                        if '%s [%s]' % (report_class.slug, case) not in used_by:
+                            used_by.append('%s [%s]' % (report_class.slug, case))
+
+        if suggestions:
+            self.stdout.write('\nSuggested indexes:\n')
+            for ddl, used_by in suggestions.items():
+                self.stdout.write('-- %s\n%s\n' % (', '.join(used_by), ddl))
+        else:
+            self.stdout.write('\nNo index suggestions.\n')
+
+    def get_suggestions(self, report, kind, table, groupby_data, params):
+        """
+        Return the CREATE INDEX statements for the not indexed report lookup
+        columns of ``table``.
+        """
+        indexed = get_indexed_columns(table)
+
+        def column(lookup):
+            resolved = resolve_lookup(report.model, lookup)
+            if resolved is None:
+                return None
+            model, field = resolved
+            if model._meta.db_table != table:
+                return None
+            if field.primary_key or field.unique or field.db_index or field.column in indexed:
+                return None
+            return field.column
+
+        ddls = []
+        if kind == 'sort':
+            lookups = list(report.list_order_by)
+            if groupby_data and groupby_data['groupby']:
+                lookups.insert(0, groupby_data['groupby'])
+            columns = []
+            for lookup in lookups:
+                resolved = resolve_lookup(report.model, lookup)
+                if resolved is None or resolved[0]._meta.db_table != table:
+                    break
+                if resolved[1].column not in columns:
+                    columns.append(resolved[1].column)
+            if columns and not (len(columns) == 1 and columns[0] in indexed):
+                ddls.append(index_ddl(table, columns))
+        else:
+            lookups = [re.sub(r'_[01]$', '', name) for name in params]
+            lookups += list(report.list_filter)
+            if groupby_data and groupby_data['groupby']:
+                lookups.append(groupby_data['groupby'])
+            for lookup in lookups:
+                name = column(lookup)
+                if name is not None:
+                    ddl = index_ddl(table, [name])
+                    if ddl not in ddls:
+                        ddls.append(ddl)
+        return ddls
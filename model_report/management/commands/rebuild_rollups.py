@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from model_report.report import reports, autodiscover
+
+
+class Command(BaseCommand):
+    help = 'Compute again the rollups of the registered reports from the rows of their models.'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--reports', dest='reports', default='',
+                    help='Comma separated slugs of the reports. Default: every registered report'),
+    )
+
+    def handle(self, *args, **options):
+        if not reports.get_reports():
+            autodiscover()
+        slugs = [s for s in options['reports'].split(',') if s]
+        report_classes = [reports.get_report(s) for s in slugs] if slugs else reports.get_reports()
+        if None in report_classes:
+            raise CommandError('Unknown report slug in: %s' % options['reports'])
+
+        verbosity = int(options.get('verbosity', 1))
+        done = set()
+        for report_class in report_classes:
+            for rollup in report_class.rollups:
+                if rollup.name in done:
+                    continue
+                done.add(rollup.name)
+                with transaction.commit_on_success():
+                    groups = rollup.rebuild()
+                if verbosity > 0:
+                    self.stdout.write('%s %s: %s groups\n' % (
+                        report_class.slug, ', '.join(rollup.group_by), groups))
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+import cProfile
+import pstats
+import sys
+from cStringIO import StringIO
+from optparse import make_option
+
+try:
+    import json
+except ImportError:
+    from django.utils import simplejson as json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test.client import RequestFactory
+
+from model_report.report import reports, autodiscover
+from model_report.signals import report_executed
+from model_report.views import report as report_view
+
+
+def read_entries(lines):
+    """
+    Return the slow report entries found in the lines of a log file. The
+    entries are JSON objects, anything before them in the line is ignored.
+    """
+    entries = []
+    for line in lines:
+        start = line.find('{')
+        if start < 0:
+            continue
+        try:
+            entry = json.loads(line[start:])
+        except ValueError:
+            continue
+        if isinstance(entry, dict) and 'report' in entry:
+            entries.append(entry)
+    return entries
+
+
+class Command(BaseCommand):
+    args = '<logfile>'
+    help = ('Replay an entry of the slow report log (model_report.slow logger) against the '
+            'current database and print its profile by stage.')
+
+    option_list = BaseCommand.option_list + (
+        make_option('--entry', dest='entry', type='int', default=-1,
+                    help='Index of the entry to replay, negative values count from the end. Default: -1'),
+        make_option('--repeat', dest='repeat', type='int', default=1,
+                    help='Replay the entry this many times. Default: 1'),
+        make_option('--sql', action='store_true', dest='sql', default=False,
+                    help='Print every executed query with its time'),
+        make_option('--cprofile', dest='cprofile', type='int', default=0,
+                    help='Profile the replay with cProfile and print this many functions'),
+    )
+
+    def handle(self, *args, **options):
+        if len(args) > 1:
+            raise CommandError('Usage: replay_report %s' % self.args)
+        if args and args[0] != '-':
+            with open(args[0]) as logfile:
+                entries = read_entries(logfile)
+        else:
+            entries = read_entries(sys.stdin)
+        if not entries:
+            raise CommandError('No slow report entries found.')
+        try:
+            entry = entries[options['entry']]
+        except IndexError:
+            raise CommandError('There are only %s entries.' % len(entries))
+
+        if not reports.get_reports():
+            autodiscover()
+        slug = entry['report']
+        if reports.get_report(slug) is None:
+            raise CommandError('Report "%s" is not registered.' % slug)
+
+        self.stdout.write('Report: %s\n' % slug)
+        self.stdout.write('Logged at: %s\n' % entry.get('date', ''))
+        self.stdout.write('Params: %s\n' % json.dumps(entry.get('params', {})))
+
+        for i in range(options['repeat']):
+            metrics, queries, profiler = self.replay(slug, entry.get('params', {}), options['cprofile'])
+            self.write_profile(entry, metrics, queries, options['sql'])
+            if profiler is not None:
+                output = StringIO()
+                stats = pstats.Stats(profiler, stream=output)
+                stats.sort_stats('cumulative').print_stats(options['cprofile'])
+                self.stdout.write(output.getvalue())
+
+    def replay(self, slug, params, cprofile=0):
+        executions = []
+
+        def receiver(sender, metrics, **kwargs):
+            executions.append(metrics)
+
+        def run():
+            response = report_view(request, slug)
+            if getattr(response, 'streaming', False):
+                # a streamed report runs while its content is read
+                for chunk in response.streaming_content:
+                    pass
+            return response
+
+        request = RequestFactory().get('/%s/' % slug, params)
+        profiler = cProfile.Profile() if cprofile else None
+        use_debug_cursor = connection.use_debug_cursor
+        connection.use_debug_cursor = True
+        report_executed.connect(receiver)
+        try:
+            reset_queries()
+            if profiler is not None:
+                profiler.runcall(run)
+            else:
+                run()
+            queries = list(connection.queries)
+        finally:
+            report_executed.disconnect(receiver)
+            connection.use_debug_cursor = use_debug_cursor
+            reset_queries()
+        return executions[-1], queries, profiler
+
+    def write_profile(self, entry, metrics, queries, show_sql=False):
+        logged_stages = entry.get('stages', {})
+        self.stdout.write('\n%-12s %12s %12s\n' % ('stage', 'logged', 'replay'))
+        for name, stage in metrics.stages.items():
+            logged = logged_stages.get(name, {}).get('seconds')
+            self.stdout.write('%-12s %12s %11.4fs\n' % (
+                name, '%.4fs' % logged if logged is not None else '-', stage['seconds']))
+        self.stdout.write('%-12s %12s %11.4fs\n' % ('total', '%.4fs' % entry['seconds'] if 'seconds' in entry
+                                                     else '-', metrics.seconds))
+
+        logged_rows = entry.get('rows', {})
+        self.stdout.write('\n%-12s %12s %12s\n' % ('rows', 'logged', 'replay'))
+        for name, count in sorted(metrics.rows.items()):
+            self.stdout.write('%-12s %12s %12s\n' % (name, logged_rows.get(name, '-'), count))
+
+        self.stdout.write('\n%s queries in %.4fs\n' % (len(queries), sum([float(q['time']) for q in queries])))
+        if show_sql:
+            for query in queries:
+                self.stdout.write('[%s] %s\n' % (query['time'], query['sql']))
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+import datetime
+import logging
+import random
+import time
+
+try:
+    import json
+except ImportError:
+    from django.utils import simplejson as json
+
+from django.conf import settings
+
+from model_report.signals import report_executed
+
+try:
+    import tracemalloc
+except ImportError:
+    # python < 3.4 needs the pytracemalloc backport
+    tracemalloc = None
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    OrderedDict = dict
+
+
+logger = logging.getLogger('model_report')
+slow_logger = logging.getLogger('model_report.slow')
+
+
+def format_size(size):
+    for unit in ('B', 'KiB', 'MiB'):
+        if abs(size) < 1024:
+            return '%.1f %s' % (size, unit)
+        size /= 1024.0
+    return '%.1f GiB' % size
+
+
+class ReportStage(object):
+    """
+    Context manager to measure one stage of a report execution.
+    """
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        if self.metrics.profile_memory:
+            # restart tracing so the traces and the peak only belong to this stage
+            tracemalloc.stop()
+            tracemalloc.start()
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        stage = self.metrics.stages.setdefault(self.name, {'seconds': 0.0})
+        stage['seconds'] += time.time() - self.start
+        if self.metrics.profile_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            stage['memory_peak'] = max(peak, stage.get('memory_peak', 0))
+            top = getattr(settings, 'MODEL_REPORT_MEMORY_PROFILE_TOP', 10)
+            stage['memory_top'] = [str(stat) for stat in snapshot.statistics('lineno')[:top]]
+        return False
+
+
+class ReportMetrics(object):
+    """
+    Collect the timings, and optionally the memory, of every stage of one
+    report execution: ``fetch``, ``dotvalues``, ``m2m``, ``rows``, ``export``
+    and ``render``, the row counts and the SQL of the report query.
+    """
+
+    def __init__(self, report, request=None):
+        self.report = report
+        self.request = request
+        self.stages = OrderedDict()
+        self.rows = {}
+        self.sql = []
+        self.start = time.time()
+        self.seconds = None
+        self.profile_memory = False
+        if self.should_profile_memory():
+            if tracemalloc is None:
+                logger.warning('MODEL_REPORT_MEMORY_PROFILE requires tracemalloc.')
+            elif tracemalloc.is_tracing():
+                logger.warning('Memory of report "%s" not profiled: tracemalloc is already tracing.',
+                               report.get_slug())
+            else:
+                self.profile_memory = True
+                tracemalloc.start()
+
+    def should_profile_memory(self):
+        if not getattr(settings, 'MODEL_REPORT_MEMORY_PROFILE', False):
+            return False
+        return random.random() < getattr(settings, 'MODEL_REPORT_MEMORY_PROFILE_RATE', 1.0)
+
+    def stage(self, name):
+        return ReportStage(self, name)
+
+    def finish(self):
+        """
+        Stop measuring, send the ``report_executed`` signal and log the results.
+        """
+        self.seconds = time.time() - self.start
+        if self.profile_memory:
+            tracemalloc.stop()
+            self.profile_memory = False
+        report_executed.send(sender=self.report.__class__, report=self.report, request=self.request, metrics=self)
+
+        slug = self.report.get_slug()
+        logger.debug('Report "%s" executed in %.3fs: %s', slug, self.seconds,
+                     ', '.join(['%s=%.3fs' % (name, stage['seconds']) for name, stage in self.stages.items()]))
+        for name, stage in self.stages.items():
+            if 'memory_peak' in stage:
+                logger.info('Report "%s" stage "%s" memory peak: %s\n%s', slug, name,
+                            format_size(stage['memory_peak']), '\n'.join(stage['memory_top']))
+
+        threshold = getattr(settings, 'MODEL_REPORT_SLOW_THRESHOLD', None)
+        if threshold is not None and self.seconds >= threshold:
+            slow_logger.warning(json.dumps(self.as_dict()))
+
+    def get_params(self):
+        """
+        Return the not empty GET parameters of the request sorted by name.
+        """
+        params = OrderedDict()
+        if self.request is None:
+            return params
+        for key in sorted(self.request.GET.keys()):
+            values = [v for v in self.request.GET.getlist(key) if v != '']
+            if len(values) == 1:
+                params[key] = values[0]
+            elif values:
+                params[key] = values
+        return params
+
+    def as_dict(self):
+        return {
+            'date': datetime.datetime.fromtimestamp(self.start).isoformat(),
+            'report': self.report.get_slug(),
+            'params': self.get_params(),
+            'seconds': self.seconds,
+            'stages': self.stages,
+            'rows': self.rows,
+            'sql': self.sql,
+        }
+
+
+class NullStage(object):
+    """
+    Context manager used as stage when a report runs without metrics.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
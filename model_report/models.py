@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from django.db import models
+
+
+class RollupTotal(models.Model):
+    """
+    One total of a group of a rollup, see :class:`model_report.rollup.Rollup`:
+    the number of rows of the group when ``measure`` is empty, the sum of the
+    ``measure`` field otherwise.
+    """
+    rollup = models.CharField(max_length=32, db_index=True)
+    key = models.CharField(max_length=32)
+    values = models.TextField()
+    measure = models.CharField(max_length=100, blank=True)
+    total = models.DecimalField(max_digits=30, decimal_places=10, default=0)
+
+    class Meta:
+        unique_together = (('rollup', 'key', 'measure'),)
+
+    def __unicode__(self):
+        return u'%s %s %s: %s' % (self.rollup, self.values, self.measure, self.total)
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+import base64
+
+try:
+    import json
+except ImportError:
+    from django.utils import simplejson as json
+
+import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils.dateparse import parse_date, parse_datetime, parse_time
+
+
+VALUE_PARSERS = {
+    'datetime': parse_datetime,
+    'date': parse_date,
+    'time': parse_time,
+    'decimal': Decimal,
+}
+
+
+def encode_value(value):
+    """
+    Return a JSON value of an order value, the dates, times and decimals are
+    tagged with their type and written exactly (with the microseconds).
+    """
+    if isinstance(value, datetime.datetime):
+        return {'datetime': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {'date': value.isoformat()}
+    if isinstance(value, datetime.time):
+        return {'time': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'decimal': str(value)}
+    return value
+
+
+def decode_value(value):
+    """
+    Return the order value of a JSON value written by :func:`encode_value`,
+    raises ``ValueError`` when it is not valid.
+    """
+    if not isinstance(value, dict):
+        return value
+    if len(value) != 1 or value.keys()[0] not in VALUE_PARSERS:
+        raise ValueError('Unknown page key value: %r' % value)
+    kind, text = value.items()[0]
+    try:
+        parsed = VALUE_PARSERS[kind](text)
+    except (TypeError, InvalidOperation):
+        parsed = None
+    if parsed is None:
+        raise ValueError('Invalid %s page key value: %r' % (kind, text))
+    return parsed
+
+
+def encode_page_key(values, continued=False):
+    """
+    Return the ``page_after`` token of a page starting after the row with the
+    order ``values``. ``continued`` tells the group of that row goes on in the
+    next page.
+    """
+    values = [encode_value(value) for value in values]
+    return base64.urlsafe_b64encode(json.dumps([continued, values], cls=DjangoJSONEncoder))
+
+
+def decode_page_key(token):
+    """
+    Return ``(values, continued)`` of a ``page_after`` token, ``(None, False)``
+    when it is not valid.
+    """
+    try:
+        continued, values = json.loads(base64.urlsafe_b64decode(str(token)))
+        if not isinstance(values, list):
+            return None, False
+        values = [decode_value(value) for value in values]
+    except (TypeError, ValueError):
+        return None, False
+    return values, bool(continued)
+
+
+def get_seek_filter(order_fields, values, nulls_last=False):
+    """
+    Return a ``Q`` matching the rows after ``values`` in the order of
+    ``order_fields`` (``'-field'`` descending), the last order field must be
+    unique. ``nulls_last`` tells the database sorts NULL after the other values
+    in ascending order (postgresql, oracle).
+    """
+    seek = None
+    equal = Q()
+    for field, value in zip(order_fields, values):
+        descending = field.startswith('-')
+        name = field.lstrip('-')
+        nulls_after = nulls_last != descending
+        if value is None:
+            after = None if nulls_after else Q(**{'%s__isnull' % name: False})
+        else:
+            after = Q(**{'%s__%s' % (name, 'lt' if descending else 'gt'): value})
+            if nulls_after:
+                after |= Q(**{'%s__isnull' % name: True})
+        if after is not None:
+            seek = (equal & after) if seek is None else seek | (equal & after)
+        if value is None:
+            equal &= Q(**{'%s__isnull' % name: True})
+        else:
+            equal &= Q(**{name: value})
+    return seek if seek is not None else Q(pk__in=[])
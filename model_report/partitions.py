@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+import datetime
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.signals import pre_save, post_save, post_delete
+
+from model_report.cache import bump_partition_version
+
+
+PERIODS = ('day', 'month')
+
+
+def get_today():
+    if getattr(settings, 'USE_TZ', False):
+        from django.utils import timezone
+        return timezone.localtime(timezone.now()).date()
+    return datetime.date.today()
+
+
+def get_partition(value, period):
+    """
+    Return ``(start, end)``, the first and the last date of the partition of
+    the date ``value``.
+    """
+    if isinstance(value, datetime.datetime):
+        value = value.date()
+    if period == 'day':
+        return value, value
+    start = value.replace(day=1)
+    end = (start + datetime.timedelta(days=32)).replace(day=1) - datetime.timedelta(days=1)
+    return start, end
+
+
+def get_partitions(start, end, period):
+    """
+    Return the ``(start, end)`` of the partitions from the one of the date
+    ``start`` to the one of the date ``end``.
+    """
+    partitions = []
+    partition = get_partition(start, period)
+    while partition[0] <= end:
+        partitions.append(partition)
+        partition = get_partition(partition[1] + datetime.timedelta(days=1), period)
+    return partitions
+
+
+def get_ranges_filter(field, ranges):
+    """
+    Return a ``Q`` matching the values of the date ``field`` in the
+    ``(start, end)`` of ``ranges``, ``end`` is ``None`` for an open range.
+    Adjacent ranges are matched as one.
+    """
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and merged[-1][1] is not None and merged[-1][1] + datetime.timedelta(days=1) == start:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    query = Q(pk__in=[])
+    for start, end in merged:
+        if end is None:
+            query |= Q(**{'%s__gte' % field: start})
+        else:
+            query |= Q(**{'%s__gte' % field: start, '%s__lte' % field: end})
+    return query
+
+
+class PartitionWatcher(object):
+    """
+    Change the version of the partitions of the instances of ``model`` by the
+    date ``field`` when they are saved or deleted, see
+    :func:`model_report.cache.get_partition_versions`.
+    """
+
+    def __init__(self, model, field, period):
+        self.model = model
+        self.field = field
+        self.period = period
+        self.uid = 'model_report_partitions_%s.%s_%s_%s' % (
+            model._meta.app_label, model._meta.object_name, field, period)
+        pre_save.connect(self.before_save, sender=model, weak=False, dispatch_uid='%s_pre_save' % self.uid)
+        post_save.connect(self.changed, sender=model, weak=False, dispatch_uid='%s_post_save' % self.uid)
+        post_delete.connect(self.changed, sender=model, weak=False, dispatch_uid='%s_post_delete' % self.uid)
+
+    def disconnect(self):
+        pre_save.disconnect(sender=self.model, dispatch_uid='%s_pre_save' % self.uid)
+        post_save.disconnect(sender=self.model, dispatch_uid='%s_post_save' % self.uid)
+        post_delete.disconnect(sender=self.model, dispatch_uid='%s_post_delete' % self.uid)
+
+    def before_save(self, sender, instance, **kwargs):
+        if instance.pk is not None:
+            # the partition the instance moves out of
+            instance._partition_dates = list(
+                self.model._default_manager.filter(pk=instance.pk).values_list(self.field, flat=True))
+
+    def changed(self, sender, instance, **kwargs):
+        dates = instance.__dict__.pop('_partition_dates', []) + [getattr(instance, self.field)]
+        starts = set([get_partition(value, self.period)[0] for value in dates if value is not None])
+        for start in starts:
+            bump_partition_version(self.model, self.field, self.period, start)
+
+
+_watchers = {}
+
+
+def watch_partitions(model, field, period):
+    """
+    Start maintaining the versions of the partitions of ``model`` by ``field``.
+    """
+    key = (model, field, period)
+    if key not in _watchers:
+        _watchers[key] = PartitionWatcher(model, field, period)
+    return _watchers[key]
+
+
+def unwatch_partitions(model, field, period):
+    """
+    Stop maintaining the versions of the partitions of ``model`` by ``field``.
+    """
+    watcher = _watchers.pop((model, field, period), None)
+    if watcher is not None:
+        watcher.disconnect()
@@ -1,34 +1,58 @@
 # -*- coding: utf-8 -*-
 import copy
 import datetime
+import hashlib
 from decimal import Decimal
 import re
 from django.contrib.contenttypes import generic
 from django.utils.formats import localize
 from xlwt import Workbook, easyxf, XFStyle
-from itertools import groupby
+from itertools import groupby, islice
+from operator import itemgetter
 
-from django.http import HttpResponse
+from django.core.urlresolvers import reverse, NoReverseMatch
+from django.http import HttpResponse, Http404
 from django.shortcuts import render_to_response
 from django.template import RequestContext
-from django.utils.translation import ugettext_lazy as _
-from django.db.models.fields import DateTimeField, DateField
-from django.utils.encoding import force_unicode
-from django.db.models import Q
+from django.template.loader import get_template, render_to_string
+from django.utils.translation import ugettext_lazy as _, get_language
+from django.db.models.fields import DateTimeField, DateField, FieldDoesNotExist
+from django.utils.encoding import force_unicode, smart_str
+from django.utils.functional import Promise
+from django.db.models import Q, Sum, Count, Avg, Min, Max, IntegerField, FloatField, DecimalField, CharField, \
+    OneToOneField, ManyToManyField, Model
 from django import forms
 from django.forms.models import fields_for_model
 from django.db.models.related import RelatedObject
+from django.db import connections
 from django.conf import settings
 
 
-from model_report.utils import base_label, ReportValue, ReportRow
-from model_report.highcharts import HighchartRender
-from model_report.widgets import RangeField
+from model_report.utils import base_label, ReportValue, ReportRow, GroupRows, sum_column, avg_column, count_column, \
+    estimate_total
+from model_report.highcharts import HighchartRender, is_numeric
+from model_report.widgets import RangeField, SearchSelect, SearchSelectMultiple, SearchSelectMixin
+from model_report.cache import get_cached_choices, get_data_versions, get_report_cache, get_partition_versions, \
+    watch_data
+from model_report.pagination import encode_page_key, decode_page_key, get_seek_filter
+from model_report.rollup import ROLLUP_OPERATORS, split_date_part, get_lookup_field, rollup_match
+from model_report.partitions import get_today, get_partition, get_partitions, get_ranges_filter, watch_partitions
 from model_report.export_pdf import render_to_pdf
+from model_report.metrics import ReportMetrics, NullStage
 
 
 import arial10
 
+try:
+    import json
+except ImportError:
+    from django.utils import simplejson as json
+
+try:
+    from django.http import StreamingHttpResponse
+except ImportError:
+    StreamingHttpResponse = None
+
 
 MAX_COLUMN_WIDTH = 2**16 - 1  # 65535
 
@@ -48,6 +72,18 @@ CHART_SERIE_OPERATOR = (
     ('max', _('Max'))
 )
 
+CHART_SERIE_AGGREGATES = {
+    'sum': Sum,
+    'avg': Avg,
+    'min': Min,
+    'max': Max,
+}
+
+NUMERIC_FIELDS = (IntegerField, FloatField, DecimalField)
+
+# where the rows of a streamed report go in the rendered page
+STREAM_MARKER = '<!-- model_report:rows -->'
+
 
 class FitSheetWrapper(object):
     """Try to fit columns to max size of any entry.
@@ -68,7 +104,14 @@ class FitSheetWrapper(object):
         if not style:
             style = XFStyle()
 
+        if isinstance(label, Promise):
+            label = force_unicode(label)
+
         if isinstance(label, datetime.datetime):
+            if label.tzinfo is not None:
+                # xlwt can't write aware datetimes (USE_TZ = True)
+                from django.utils import timezone
+                label = timezone.make_naive(label, timezone.get_current_timezone())
             _saved_format = style.num_format_str
             style.num_format_str = 'dd/mm/yyyy hh:mm:ss'
             self.sheet.write(r, c, label, style)
@@ -160,6 +203,14 @@ class ReportClassManager(object):
             raise ValueError('Slug already exists: %s' % slug)
         setattr(rclass, 'slug', slug)
         self._register[slug] = rclass
+        for rollup in rclass.rollups:
+            rollup.register(rclass.model)
+        for report_class in [rclass] + list(rclass.inlines):
+            lookups = list(report_class.fields) + list(report_class.list_filter)
+            for model in get_data_models(report_class.model, lookups):
+                watch_data(model)
+        if rclass.totals_partition_field:
+            watch_partitions(rclass.model, rclass.totals_partition_field, rclass.totals_partition)
 
     def get_report(self, slug):
         # return class
@@ -193,6 +244,243 @@ def cache_return(fun):
     return wrap
 
 
+_form_classes = {}
+
+_multi_valued_lookups = {}
+
+
+def is_multi_valued_lookup(model, lookup):
+    """
+    Return ``True`` when ``lookup`` goes through a many to many field or a
+    reverse foreign key, where joining it can repeat the rows of ``model``.
+    """
+    key = (model, lookup)
+    if key not in _multi_valued_lookups:
+        multi_valued = False
+        for part in lookup.split('__'):
+            try:
+                field, field_model, direct, m2m = model._meta.get_field_by_name(part)
+            except FieldDoesNotExist:
+                break  # lookup type: __in, __year...
+            if not direct and isinstance(field.field, OneToOneField):
+                model = field.model
+                continue
+            if m2m or not direct:
+                multi_valued = True
+                break
+            if not getattr(field, 'rel', None):
+                break
+            model = field.rel.to
+        _multi_valued_lookups[key] = multi_valued
+    return _multi_valued_lookups[key]
+
+
+def get_data_models(model, lookups):
+    """
+    Return ``model`` and the models joined by the field ``lookups`` of a
+    report, ``self.`` fields and dotted attributes are left out.
+    """
+    models = [model]
+    for lookup in lookups:
+        if 'self.' in lookup:
+            continue
+        for related_model in get_lookup_models(model, lookup.split('.')[0]):
+            if related_model not in models:
+                models.append(related_model)
+    return models
+
+
+def get_lookup_models(model, lookup):
+    """
+    Return the models joined by ``lookup`` from ``model``.
+    """
+    models = []
+    for part in lookup.split('__'):
+        try:
+            field, field_model, direct, m2m = model._meta.get_field_by_name(part)
+        except FieldDoesNotExist:
+            break  # lookup type: __in, __year...
+        if not direct:
+            model = field.model
+        elif getattr(field, 'rel', None):
+            model = field.rel.to
+        else:
+            break
+        models.append(model)
+    return models
+
+
+class GroupByForm(forms.Form):
+
+    groupby = forms.ChoiceField(label=_('Group by field:'), required=False)
+    onlytotals = forms.BooleanField(label=_('Show only totals'), required=False)
+    group_top = forms.IntegerField(label=_('Top groups'), required=False, min_value=0,
+                                   help_text=_('Collapse the groups with the smallest totals into "Other", '
+                                               '0 shows every group'))
+
+    def _post_clean(self):
+        pass
+
+    def __init__(self, groupby_fields, **kwargs):
+        super(GroupByForm, self).__init__(**kwargs)
+        self.groupby_fields = groupby_fields
+        choices = [(None, '')]
+        for i, (mfield, field, caption) in enumerate(groupby_fields):
+            choices.append((field, caption))
+        self.fields['groupby'].choices = choices
+        data = kwargs.get('data', {})
+        if data:
+            self.fields['groupby'].initial = data.get('groupby', '')
+
+    def get_cleaned_data(self):
+        cleaned_data = getattr(self, 'cleaned_data', {})
+        if 'groupby' in cleaned_data:
+            if unicode(cleaned_data['groupby']) == u'None':
+                cleaned_data['groupby'] = None
+        if cleaned_data.get('group_top') is None:
+            # keep the group_top of the report
+            cleaned_data.pop('group_top', None)
+        return cleaned_data
+
+
+class ConfigForm(forms.Form):
+
+    chart_mode = forms.ChoiceField(label=_('Chart type'), choices=(), required=False)
+    serie_field = forms.ChoiceField(label=_('Serie field'), choices=(), required=False)
+    serie_op = forms.ChoiceField(label=_('Serie operator'), choices=CHART_SERIE_OPERATOR, required=False)
+    columns = forms.MultipleChoiceField(label=_('Columns'), required=False, widget=forms.CheckboxSelectMultiple,
+                                        help_text=_('Leave empty to show every column'))
+
+    def __init__(self, chart_types, serie_fields, *args, **kwargs):
+        column_fields = kwargs.pop('column_fields', None)
+        super(ConfigForm, self).__init__(*args, **kwargs)
+        self.chart_types = chart_types
+        self.serie_fields = serie_fields
+        if column_fields:
+            self.fields['columns'].choices = column_fields
+        else:
+            del self.fields['columns']
+        if not chart_types:
+            for name in ('chart_mode', 'serie_field', 'serie_op'):
+                del self.fields[name]
+            return
+        choices = [('', '')]
+        for k, v in DEFAULT_CHART_TYPES:
+            if k in chart_types:
+                choices.append((k, v))
+        self.fields['chart_mode'].choices = list(choices)
+        choices = [('', '')]
+        for i, (index, mfield, field, caption) in enumerate(serie_fields):
+            choices += (
+                (index, caption),
+            )
+        self.fields['serie_field'].choices = list(choices)
+
+    def get_config_data(self):
+        data = dict(getattr(self, 'cleaned_data', {}))
+        if not data:
+            return {}
+        if not data.get('serie_field') or not data.get('chart_mode') or not data.get('serie_op'):
+            return {}
+        data.pop('columns', None)
+        data['serie_field'] = int(data['serie_field'])
+        return data
+
+    def get_columns(self):
+        """
+        Return the chosen columns, an empty list for every column.
+        """
+        return getattr(self, 'cleaned_data', {}).get('columns') or []
+
+
+# noinspection PyProtectedMember
+class FilterForm(forms.BaseForm):
+    """
+    Base class of the filter forms built by :func:`ReportAdmin.get_form_filter_class`.
+    """
+    base_fields = {}
+    narrow_field_names = {}
+
+    def _post_clean(self):
+        pass
+
+    def get_filter_kwargs(self):
+        if not self.is_valid():
+            return {}
+        filter_kwargs = self.cleaned_data
+        for key, value in filter_kwargs.items():
+            if not value:
+                filter_kwargs.pop(key)
+                continue
+            if key == '__all__':
+                filter_kwargs.pop(key)
+                continue
+            if isinstance(value, (list, tuple)):
+                if isinstance(self.fields[key], RangeField):
+                    filter_kwargs.pop(key)
+                    start_range, end_range = value
+                    if start_range:
+                        filter_kwargs['%s__gte' % key] = start_range
+                    if end_range:
+                        filter_kwargs['%s__lte' % key] = end_range
+            elif hasattr(self.fields[key], 'as_boolean'):
+                if value:
+                    filter_kwargs.pop(key)
+                    filter_kwargs[key] = (unicode(value) == u'True')
+        return filter_kwargs
+
+    def get_cleaned_data(self):
+        return getattr(self, 'cleaned_data', {})
+
+    def __init__(self, report, *args, **kwargs):
+        super(FilterForm, self).__init__(*args, **kwargs)
+        self.filter_report_is_all = '__all__' in self.fields and len(self.fields) == 1
+
+        # Provide a hook for updating the queryset
+        for name, choices in report.override_field_choices.items():
+            if name in self.narrow_field_names:
+                self.fields[name].queryset = choices(report, self.fields[name].queryset)
+
+        data_filters = {}
+        vals = self.data
+        for key in vals.keys():
+            if key in self.fields:
+                data_filters[key] = vals[key]
+        for name, field_names in self.narrow_field_names.items():
+            local_field = self.fields[name]
+            for key, value in data_filters.items():
+                if key != name and key in field_names:
+                    local_field.queryset = local_field.queryset.filter(Q(**{key: value}))
+
+        for name in self.narrow_field_names:
+            local_field = self.fields[name]
+            if not isinstance(local_field.widget, SearchSelectMixin):
+                choices = get_cached_choices(local_field)
+                if choices is not None:
+                    local_field.choices = choices
+
+    def set_choice_counts(self, counts):
+        """
+        Add to the choice labels the number of rows of ``counts``, as returned
+        by :func:`ReportAdmin.get_filter_counts`.
+        """
+        for name, values in counts.items():
+            field = self.fields[name]
+            if hasattr(field, 'queryset') and not hasattr(field, '_choices'):
+                field.label_from_instance = choice_count_label(field, values)
+            else:
+                field.choices = [(value, label if value in ('', None) else u'%s (%s)' % (label, values.get(value, 0)))
+                                 for value, label in field.choices]
+
+
+def choice_count_label(field, counts):
+    label_from_instance = field.label_from_instance
+
+    def label(obj):
+        return u'%s (%s)' % (label_from_instance(obj), counts.get(field.prepare_value(obj), 0))
+    return label
+
+
 # noinspection PyProtectedMember
 class ReportAdmin(object):
     """
@@ -252,36 +540,164 @@ class ReportAdmin(object):
     override_field_choices = {}
     """#TODO"""
 
+    filter_choices_search = True
+    """
+    Render the foreign key and many to many filters with a search box loading
+    their choices by pages instead of a select with every related row.
+    """
+
+    filter_counts = False
+    """Show the number of rows of each filter choice under the other active filters."""
+
     override_field_filter_values = {}
     """#TODO"""
 
     override_group_value = {}
     """#TODO"""
 
+    group_top = None
+    """
+    Number of groups with the largest totals to show when grouping, the other
+    groups are collapsed into an "Other" group. Can be changed by request.
+    """
+
+    group_top_by = None
+    """Field summed to rank the groups for ``group_top``, ``None`` ranks them by number of rows."""
+
     chart_types = ()
     """List of highchart types."""
 
+    chart_max_points = None
+    """
+    Maximum number of points of each line chart serie, longer series are
+    downsampled. Defaults to the ``MODEL_REPORT_CHART_MAX_POINTS`` setting.
+    """
+
+    chart_downsample = 'lttb'
+    """Line chart downsampling: "lttb" (largest triangle three buckets) or "minmax"."""
+
+    list_per_page = None
+    """
+    Number of rows of each page of the HTML report, ``None`` shows every row.
+    Defaults to the ``MODEL_REPORT_LIST_PER_PAGE`` setting.
+    """
+
+    stream_rows = False
+    """
+    Send the HTML report while its rows are fetched: the page up to the table
+    first, then the rows of each group as soon as it is built.
+    """
+
+    fast_table = False
+    """
+    Render the rows of the HTML report with Python string formatting instead
+    of the ``report_rows.html`` template, with the same markup.
+    """
+
+    cache_groups = False
+    """
+    Cache the rendered rows of each group of the HTML report until the rows of
+    the group change.
+    """
+
+    rollups = ()
+    """
+    List of :class:`model_report.rollup.Rollup` of the report model, the
+    totals of the report are read from one of them when it shows only the
+    totals and every group by and filter field is in the rollup.
+    """
+
+    totals_partition_field = None
+    """
+    Date field of the report model, the totals of the reports filtered by a
+    range of it are cached partition by partition, see ``totals_partition``.
+    """
+
+    totals_partition = 'day'
+    """Partition of the cached totals, ``'day'`` or ``'month'``."""
+
+    sample_percent = None
+    """
+    Percent of the rows read by the report in the sampled mode, switched on
+    by the ``sample`` parameter: the totals and the chart series are
+    estimated from the sample. ``None`` disables the sampled mode.
+    """
+
+    choose_columns = False
+    """
+    Let the users choose the columns of the report in the config form (the
+    ``columns`` parameter), only the chosen columns are fetched and exported.
+    Not for reports with inlines.
+    """
+
+    group_rows_on_demand = False
+    """
+    Render only the header and the totals of each group when grouping, the
+    rows of a group are loaded when it is expanded.
+    """
+
     exports = ('excel', 'pdf')
     """Alternative render report as "pdf" or "csv"."""
 
     inlines = []
     """List of other's Report related to the main report."""
 
+    inlines_on_demand = False
+    """
+    Render an expand control for the inline reports of each row, the inline
+    reports of a row are loaded when it is expanded.
+    """
+
     queryset = None
     """#TODO"""
 
     onlytotals = False
     groupby = None
     slug = None
+    fetched_rows = None
+    metrics = None
+    other_queryset = None
+    top_groups_filters = None
+    page_next = None
+    page_next_continued = False
+    page_continued = False
+    group_cache_prefix = None
+    sample_scale = None
 
     def __init__(self, parent_report=None, request=None):
         self.parent_report = parent_report
         self.request = request
-        model_fields = []
-        model_m2m_fields = []
         self.related_inline_field = None
         self.related_inline_accessor = None
         self.related_fields = []
+        self.set_model_fields()
+        if parent_report:
+            self.related_inline_field = [f for f, x in self.model._meta.get_fields_with_model()
+                                         if f.rel and hasattr(f.rel, 'to') and f.rel.to is self.parent_report.model][0]
+            self.related_inline_accessor = self.related_inline_field.related.get_accessor_name()
+            self.related_fields = ["%s__%s" % (pfield.model._meta.module_name, attname) for pfield, attname in
+                                   self.parent_report.model_fields if not isinstance(pfield, (str, unicode)) and
+                                   pfield.model == self.related_inline_field.rel.to]
+            self.related_inline_filters = []
+
+            for pfield, pattname in self.parent_report.model_fields:
+                for cfield, cattname in self.model_fields:
+                    # try:
+                        if pattname in cattname:
+                            if pfield.model == cfield.model:
+                                self.related_inline_filters.append([pattname, cattname,
+                                                                    self.parent_report.get_fields().index(pattname)])
+                    # TODO: narrow it
+                    # except Exception, e:
+                    #     pass
+
+    def set_model_fields(self):
+        """
+        Set the model fields of the report fields, the ones through many to
+        many relations and the ones joining many related objects.
+        """
+        model_fields = []
+        model_m2m_fields = []
         for field in self.get_query_field_names():
             try:
                 m2mfields = []
@@ -320,25 +736,9 @@ class ReportAdmin(object):
                 model_m2m_fields.append([model_field, field, len(model_fields) - 1, m2mfields])
         self.model_fields = model_fields
         self.model_m2m_fields = model_m2m_fields
-        if parent_report:
-            self.related_inline_field = [f for f, x in self.model._meta.get_fields_with_model()
-                                         if f.rel and hasattr(f.rel, 'to') and f.rel.to is self.parent_report.model][0]
-            self.related_inline_accessor = self.related_inline_field.related.get_accessor_name()
-            self.related_fields = ["%s__%s" % (pfield.model._meta.module_name, attname) for pfield, attname in
-                                   self.parent_report.model_fields if not isinstance(pfield, (str, unicode)) and
-                                   pfield.model == self.related_inline_field.rel.to]
-            self.related_inline_filters = []
-
-            for pfield, pattname in self.parent_report.model_fields:
-                for cfield, cattname in self.model_fields:
-                    # try:
-                        if pattname in cattname:
-                            if pfield.model == cfield.model:
-                                self.related_inline_filters.append([pattname, cattname,
-                                                                    self.parent_report.get_fields().index(pattname)])
-                    # TODO: narrow it
-                    # except Exception, e:
-                    #     pass
+        # the rows of the report repeat only when a field joins many related objects
+        self.multi_valued_fields = [field for field in self.get_query_field_names()
+                                    if not 'self.' in field and is_multi_valued_lookup(self.model, field)]
 
     def get_slug(self):
         if self.slug is None:
@@ -442,12 +842,50 @@ class ReportAdmin(object):
             for k, v in filter_kwargs.items():
                 if not v is None and v != '':
                     if hasattr(v, 'values_list'):
-                        v = v.values_list('pk', flat=True)
-                        k = '%s__pk__in' % k.split("__")[0]
-                    qs = qs.filter(Q(**{k: v}))
-        self.queryset = qs.distinct()
+                        # the objects of the relation the lookup goes through
+                        qs = self.filter_related(qs, k.rsplit('__', 1)[0], v)
+                    elif not self.multi_valued_fields and is_multi_valued_lookup(self.model, k):
+                        # a semi-join matches every row once, without a join to deduplicate
+                        qs = qs.filter(pk__in=self.model.objects.filter(Q(**{k: v})).values('pk'))
+                    else:
+                        qs = qs.filter(Q(**{k: v}))
+        if self.multi_valued_fields:
+            # the filters share the joins of the fields, see get_values_queryset
+            qs = qs.distinct()
+        self.queryset = qs
         return self.queryset
 
+    def filter_related(self, qs, relation, values):
+        """
+        Filter ``qs`` by the objects of the queryset ``values`` of ``relation``.
+        A many to many field or reverse foreign key is filtered with a
+        correlated EXISTS subquery, which neither repeats the rows nor needs
+        DISTINCT.
+        """
+        values = values.order_by().values('pk')
+        if not is_multi_valued_lookup(self.model, relation):
+            return qs.filter(**{'%s__in' % relation: values})
+
+        field, field_model, direct, m2m = self.model._meta.get_field_by_name(relation.split('__')[0])
+        if '__' in relation or (direct and not isinstance(field, ManyToManyField)):
+            # deeper relations and generic relations: semi-join with the ORM
+            return qs.filter(pk__in=self.model.objects.filter(**{'%s__in' % relation: values}).values('pk'))
+        if direct:
+            table = field.rel.through._meta.db_table
+            column, target = field.m2m_column_name(), field.m2m_reverse_name()
+        elif m2m:
+            table = field.field.rel.through._meta.db_table
+            column, target = field.field.m2m_reverse_name(), field.field.m2m_column_name()
+        else:
+            table = field.model._meta.db_table
+            column, target = field.field.column, field.model._meta.pk.column
+
+        qn = connections[qs.db].ops.quote_name
+        sql, params = values.query.get_compiler(using=qs.db).as_sql()
+        where = 'EXISTS (SELECT 1 FROM %s related WHERE related.%s = %s.%s AND related.%s IN (%s))' % (
+            qn(table), qn(column), qn(self.model._meta.db_table), qn(self.model._meta.pk.column), qn(target), sql)
+        return qs.extra(where=[where], params=list(params))
+
     def get_title(self):
         """
         Return the report title
@@ -468,6 +906,7 @@ class ReportAdmin(object):
                 filter_related_fields[cfield] = by_row[index].value
 
         try:
+            self.sample_scale = self.get_sample_scale(context_request)
             form_groupby = self.get_form_groupby(context_request)
             form_filter = self.get_form_filter(context_request)
             form_config = self.get_form_config(context_request)
@@ -475,6 +914,8 @@ class ReportAdmin(object):
             column_labels = self.get_column_names(filter_related_fields)
             report_rows = []
             report_anchors = []
+            report_page = None
+            report_stream = None
             chart = None
 
             # context = {
@@ -505,7 +946,51 @@ class ReportAdmin(object):
                     # sets self.groupby and self.onlytotal variables
                     self.__dict__.update(groupby_data)
 
-                report_rows = self.get_rows(groupby_data, filter_kwargs, filter_related_fields, do_localize=do_localize)
+                config = None
+                if self.type == 'chart' and groupby_data and 'groupby' in groupby_data:
+                    config = form_config.get_config_data()
+                if self.set_columns(form_config, groupby_data, config):
+                    column_labels = self.get_column_names(filter_related_fields)
+
+                page = None
+                group_url = None
+                totals = None
+                if self.onlytotals and not config and groupby_data.get('groupby'):
+                    # the totals without the rows, from a rollup or the cached partitions
+                    rollup = self.get_rollup(groupby_data, filter_kwargs)
+                    with self.stage('fetch'):
+                        if rollup:
+                            totals = self.get_rollup_totals(groupby_data, *rollup)
+                        else:
+                            totals = self.get_partition_totals(groupby_data, filter_kwargs)
+                if not do_export and totals is None:
+                    group_url = self.get_group_url(context_request, groupby_data)
+                if totals is not None:
+                    report_rows = self.get_group_headers(groupby_data, filter_kwargs, totals=totals)
+                elif group_url:
+                    report_rows = self.get_group_headers(groupby_data, filter_kwargs, group_url)
+                elif not do_export and self.get_page_size(groupby_data):
+                    page = context_request.GET.get('page_after', '')
+                    report_rows = self.get_rows(groupby_data, filter_kwargs, filter_related_fields,
+                                                do_localize=do_localize, page=page)
+                elif not do_export and self.can_stream_rows(groupby_data, config):
+                    # rendered by iter_stream_response, group by group
+                    self.group_cache_prefix = self.get_group_cache_prefix(context_request, groupby_data, config)
+                    report_stream = self.iter_stream_rows(groupby_data, filter_kwargs)
+                    if config:
+                        chart = self.get_chart(config, None, self.get_chart_data(groupby_data, filter_kwargs, config))
+                else:
+                    if not do_export:
+                        self.group_cache_prefix = self.get_group_cache_prefix(context_request, groupby_data, config)
+                    report_rows = self.get_rows(groupby_data, filter_kwargs, filter_related_fields,
+                                                do_localize=do_localize)
+                if page is not None:
+                    params = context_request.GET.copy()
+                    params.pop('page_after', None)
+                    report_page = {'first_url': '?%s' % params.urlencode() if page else None}
+                    if self.page_next:
+                        params['page_after'] = self.page_next
+                        report_page['next_url'] = '?%s' % params.urlencode()
 
                 for g, r in report_rows:
                     report_anchors.append(g)
@@ -513,10 +998,13 @@ class ReportAdmin(object):
                 if len(report_anchors) <= 1:
                     report_anchors = []
 
-                if self.type == 'chart' and groupby_data and 'groupby' in groupby_data:
-                    config = form_config.get_config_data()
-                    if config:
-                        chart = self.get_chart(config, report_rows)
+                if config and report_stream is None:
+                    serie_data = None
+                    if self.get_group_top(groupby_data) or page is not None or group_url:
+                        # the "Other" group, the other pages and the groups loaded on demand have no value
+                        # rows to build the chart from
+                        serie_data = self.get_chart_data(groupby_data, filter_kwargs, config)
+                    chart = self.get_chart(config, report_rows, serie_data)
 
                 if self.onlytotals:
                     for g, rows in report_rows:
@@ -525,70 +1013,17 @@ class ReportAdmin(object):
                                 rows.remove(r)
 
                 if do_export == 'excel':
-                    book = Workbook(encoding='utf-8')
-                    sheet1 = FitSheetWrapper(book.add_sheet(self.get_title()[:20]))
-                    stylebold = easyxf('font: bold true; alignment:')
-                    stylevalue = easyxf('alignment: horizontal left, vertical top;')
-                    row_index = 0
-                    for index, x in enumerate(column_labels):
-                        sheet1.write(row_index, index, u'%s' % x, stylebold)
-                    row_index += 1
-
-                    for g, rows in report_rows:
-                        if g:
-                            sheet1.write(row_index, 0, unicode(g), stylebold)
-                            row_index += 1
-                        for row in list(rows):
-                            if row.is_value():
-                                for index, x in enumerate(row):
-                                    # if isinstance(x.value, (list, tuple)):
-                                    #     if len(x.value) < 1:
-                                    #         xvalue = u''
-                                    #     elif len(x.value) == 1:
-                                    #         xvalue = x.value[0]
-                                    #     else:
-                                    #         xvalue = u''.join([unicode(v) for v in x.value])
-                                    # else:
-                                        # xvalue = x.text()
-                                        # xvalue = x.value
-                                    xvalue = x.formatted_value()
-                                    sheet1.write(row_index, index, xvalue, stylevalue)
-                                    # sheet1.write(row_index, index, x.value, stylevalue)
-                                row_index += 1
-                            elif row.is_caption:
-                                for index, x in enumerate(row):
-                                    if not isinstance(x, (unicode, str)):
-                                        sheet1.write(row_index, index, x.text(), stylebold)
-                                    else:
-                                        sheet1.write(row_index, index, x, stylebold)
-                                row_index += 1
-                            elif row.is_total:
-                                for index, x in enumerate(row):
-                                    sheet1.write(row_index, index, x.text(), stylebold)
-                                    sheet1.write(row_index + 1, index, u' ')
-                                row_index += 2
-
-                    response = HttpResponse(mimetype="application/ms-excel")
-                    response['Content-Disposition'] = 'attachment; filename=%s.xls' % self.get_slug()
-                    book.save(response)
-                    return response
+                    with self.stage('export'):
+                        return self.get_excel_response(column_labels, report_rows)
 
                 if do_export == 'pdf':
-                    inlines = [ir(self, context_request) for ir in self.inlines]
-                    setattr(self, 'is_export', True)
-                    context = {
-                        'report': self,
-                        'column_labels': column_labels,
-                        'report_rows': report_rows,
-                        'report_inlines': inlines,
-                    }
-                    context.update({'pagesize': 'legal landscape'})
-                    return render_to_pdf(self, 'model_report/export_pdf.html', context)
+                    with self.stage('export'):
+                        return self.get_pdf_response(context_request, column_labels, report_rows)
 
             inlines = [ir(self, context_request) for ir in self.inlines]
 
             is_inline = self.parent_report is None
-            render_report = not (len(report_rows) == 0 and is_inline)
+            render_report = not (len(report_rows) == 0 and is_inline and report_stream is None)
             context = {
                 'render_report': render_report,
                 'is_inline': is_inline,
@@ -596,11 +1031,15 @@ class ReportAdmin(object):
                 'report': self,
                 'form_groupby': form_groupby,
                 'form_filter': form_filter,
-                'form_config': form_config if self.type == 'chart' else None,
+                'form_config': form_config if self.type == 'chart' or 'columns' in form_config.fields else None,
                 'chart': chart,
                 'report_anchors': report_anchors,
                 'column_labels': column_labels,
                 'report_rows': report_rows,
+                'report_page': report_page,
+                'report_stream': report_stream,
+                'report_stream_marker': STREAM_MARKER if report_stream is not None else None,
+                'report_sample': self.get_sample_context(context_request),
                 'report_inlines': inlines,
             }
 
@@ -612,12 +1051,131 @@ class ReportAdmin(object):
         finally:
             globals()['_cache_class'] = {}
 
+    def get_excel_response(self, column_labels, report_rows):
+        """
+        Return the report rows exported as excel file
+        """
+        book = Workbook(encoding='utf-8')
+        sheet1 = FitSheetWrapper(book.add_sheet(self.get_title()[:20]))
+        stylebold = easyxf('font: bold true; alignment:')
+        stylevalue = easyxf('alignment: horizontal left, vertical top;')
+        row_index = 0
+        for index, x in enumerate(column_labels):
+            sheet1.write(row_index, index, u'%s' % x, stylebold)
+        row_index += 1
+
+        for g, rows in report_rows:
+            if g:
+                sheet1.write(row_index, 0, unicode(g), stylebold)
+                row_index += 1
+            for row in list(rows):
+                if row.is_value():
+                    for index, x in enumerate(row):
+                        # if isinstance(x.value, (list, tuple)):
+                        #     if len(x.value) < 1:
+                        #         xvalue = u''
+                        #     elif len(x.value) == 1:
+                        #         xvalue = x.value[0]
+                        #     else:
+                        #         xvalue = u''.join([unicode(v) for v in x.value])
+                        # else:
+                            # xvalue = x.text()
+                            # xvalue = x.value
+                        xvalue = x.formatted_value()
+                        sheet1.write(row_index, index, xvalue, stylevalue)
+                        # sheet1.write(row_index, index, x.value, stylevalue)
+                    row_index += 1
+                elif row.is_caption:
+                    for index, x in enumerate(row):
+                        if not isinstance(x, (unicode, str)):
+                            sheet1.write(row_index, index, x.text(), stylebold)
+                        else:
+                            sheet1.write(row_index, index, x, stylebold)
+                    row_index += 1
+                elif row.is_total:
+                    for index, x in enumerate(row):
+                        sheet1.write(row_index, index, x.text(), stylebold)
+                        sheet1.write(row_index + 1, index, u' ')
+                    row_index += 2
+
+        response = HttpResponse(mimetype="application/ms-excel")
+        response['Content-Disposition'] = 'attachment; filename=%s.xls' % self.get_slug()
+        book.save(response)
+        return response
+
+    def get_pdf_response(self, request, column_labels, report_rows):
+        """
+        Return the report rows exported as pdf file
+        """
+        inlines = [ir(self, request) for ir in self.inlines]
+        setattr(self, 'is_export', True)
+        context = {
+            'report': self,
+            'column_labels': column_labels,
+            'report_rows': report_rows,
+            'report_inlines': inlines,
+        }
+        context.update({'pagesize': 'legal landscape'})
+        return render_to_pdf(self, 'model_report/export_pdf.html', context)
+
     def render(self, request, extra_context=None):
-        context_or_response = self.get_render_context(request, extra_context)
+        self.metrics = ReportMetrics(self, request)
+        streaming = False
+        try:
+            context_or_response = self.get_render_context(request, extra_context)
+
+            if isinstance(context_or_response, HttpResponse):
+                return context_or_response
+            if context_or_response['report_stream'] is not None:
+                # the metrics are finished with the stream
+                streaming = True
+                return StreamingHttpResponse(self.iter_stream_response(request, context_or_response))
+            with self.stage('render'):
+                return render_to_response(self.template_name, context_or_response,
+                                          context_instance=RequestContext(request))
+        finally:
+            if not streaming:
+                self.metrics.finish()
+
+    def iter_stream_response(self, request, context):
+        """
+        Return an iterator over the html of the report page: the page up to the
+        rows of the table, the rows of each group as soon as it is built, then
+        the rest of the page.
+        """
+        try:
+            with self.stage('render'):
+                page = render_to_string(self.template_name, context, context_instance=RequestContext(request))
+            head, marker, tail = page.partition(STREAM_MARKER)
+            yield head
+
+            template = get_template('model_report/includes/report_group.html')
+            group_context = RequestContext(request, context)
+            groups = values = 0
+            for grouper, rows in context['report_stream']:
+                if self.onlytotals:
+                    rows = [row for row in rows if not row.is_value()]
+                groups += 1
+                values += len([row for row in rows if row.is_value()])
+                group_context.update({'gruper': grouper, 'rows': rows})
+                yield template.render(group_context)
+                group_context.pop()
+            if not groups:
+                yield render_to_string('model_report/includes/report_empty_row.html', context)
+            yield tail
+
+            self.metrics.rows.update({'fetched': self.fetched_rows, 'groups': groups, 'values': values})
+        finally:
+            self.metrics.finish()
+            globals()['_cache_class'] = {}
 
-        if isinstance(context_or_response, HttpResponse):
-            return context_or_response
-        return render_to_response(self.template_name, context_or_response, context_instance=RequestContext(request))
+    def stage(self, name):
+        """
+        Return a context manager to measure the stage ``name`` of the report execution.
+        """
+        if self.metrics is None:
+            return NullStage()
+        return self.metrics.stage(name)
 
     def has_report_totals(self):
         return not (not self.report_totals)
@@ -625,51 +1183,258 @@ class ReportAdmin(object):
     def has_group_totals(self):
         return not (not self.group_totals)
 
-    def get_chart(self, config, report_rows):
+    def get_chart(self, config, report_rows, serie_data=None):
         config['title'] = self.get_title()
+        config['scale'] = self.sample_scale
+        if self.sample_scale:
+            config['title'] = u'%s (%s)' % (config['title'], force_unicode(
+                _('estimated from a %(percent)s%% sample') % {'percent': self.sample_percent}))
         config['has_report_totals'] = self.has_report_totals()
         config['has_group_totals'] = self.has_group_totals()
-        return HighchartRender(config).get_chart(report_rows)
+        config['max_points'] = self.chart_max_points or getattr(settings, 'MODEL_REPORT_CHART_MAX_POINTS', None)
+        config['downsample'] = self.chart_downsample
+        for index, mfield, field, caption in self.get_serie_fields():
+            if index == config['serie_field']:
+                config['serie_name'] = force_unicode(caption)
+        return HighchartRender(config).get_chart(report_rows, serie_data)
+
+    def get_db_field(self, field):
+        """
+        Return the model field of a report field the database can group and
+        aggregate, ``None`` for method fields and date lookups.
+        """
+        for (mfield, name), field_name in zip(self.model_fields, self.get_fields()):
+            if name == field:
+                if isinstance(mfield, (str, unicode)) or '.' in field_name:
+                    return None
+                if '__' in name and name.rsplit('__', 1)[1] in ('year', 'month', 'day'):
+                    return None
+                return mfield
+        return None
+
+    def get_chart_data(self, groupby_data, filter_kwargs, config):
+        """
+        Return the serie of a chart computed by the database: a list of
+        ``(group, value)`` with the serie operator applied to the serie field
+        of every group, or of ``(group, values)`` for line charts. Return
+        ``None`` when the fields can't be grouped by the database.
+        """
+        groupby_field = groupby_data.get('groupby')
+        serie_field = self.model_fields[config['serie_field']][1]
+        serie_mfield = self.get_db_field(serie_field)
+        if (serie_mfield is None or self.get_db_field(groupby_field) is None or
+                groupby_field in self.override_group_value):
+            return None
 
-    def get_form_config(self, request):
+        qs = self.get_filtered_queryset(filter_kwargs)
+        other_qs = None
+        top = self.get_group_top(groupby_data)
+        if top:
+            top_filter, other_filter = self.get_top_groups_filters(qs, groupby_field, top)
+            other_qs = self.get_aggregate_queryset(qs.filter(other_filter))
+            qs = qs.filter(top_filter)
+        qs = self.get_aggregate_queryset(qs)
+        numeric = isinstance(serie_mfield, NUMERIC_FIELDS)
+
+        serie_data = []
+        if config['chart_mode'] == 'line':
+            obfields = [groupby_field] + [f for f in self.list_order_by if f != groupby_field]
+            qs = qs.order_by(*obfields).values_list(groupby_field, serie_field, 'pk')
+            for grouper, rows in groupby(qs, key=itemgetter(0)):
+                values = [float(value) if numeric and is_numeric(value) else 1 for g, value, pk in rows]
+                serie_data.append((self._get_grouper_text(groupby_field, grouper), values))
+            return serie_data
+
+        serie_op = config['serie_op']
+        if numeric and serie_op in CHART_SERIE_AGGREGATES:
+            aggregate = CHART_SERIE_AGGREGATES[serie_op](serie_field)
+        else:
+            # not numeric values count as 1, like in HighchartRender.get_serie_data
+            aggregate = Count('pk', distinct=True)
+        qs = qs.order_by(groupby_field).values_list(groupby_field).annotate(serie_value=aggregate)
+        for grouper, value in qs:
+            if not numeric and serie_op not in ('sum', 'len'):
+                value = 1
+            serie_data.append((self._get_grouper_text(groupby_field, grouper), float(value or 0)))
+        if other_qs is not None:
+            other = other_qs.order_by().aggregate(rows=Count('pk'), serie_value=aggregate)
+            if other['rows']:
+                value = other['serie_value'] if numeric or serie_op in ('sum', 'len') else 1
+                serie_data.append((force_unicode(_('Other')), float(value or 0)))
+        return serie_data
+
+    def render_chart(self, request):
+        """
+        Return the chart options as JSON, computed by the database when
+        possible instead of building the report rows.
+        """
+        self.metrics = ReportMetrics(self, request)
+        try:
+            self.sample_scale = self.get_sample_scale(request)
+            form_groupby = self.get_form_groupby(request)
+            form_filter = self.get_form_filter(request)
+            form_config = self.get_form_config(request)
+            groupby_data = form_groupby.get_cleaned_data() if form_groupby else {}
+            config = form_config.get_config_data()
+            self.set_columns(form_config, groupby_data, config)
+            options = 'null'
+            functions = []
+            if self.type == 'chart' and groupby_data.get('groupby') and config:
+                filter_kwargs = form_filter.get_filter_kwargs()
+                with self.stage('fetch'):
+                    serie_data = self.get_chart_data(groupby_data, filter_kwargs, config)
+                report_rows = None
+                if serie_data is None:
+                    self.__dict__.update(groupby_data)
+                    report_rows = self.get_rows(groupby_data, filter_kwargs)
+                with self.stage('render'):
+                    chart = self.get_chart(config, report_rows, serie_data)
+                    if chart.model.series._dicts:
+                        options = chart.json_options
+                        functions = chart.javascript_paths
+            return HttpResponse('{"options":%s,"functions":%s}' % (options, json.dumps(functions)),
+                                mimetype='application/json')
+        finally:
+            self.metrics.finish()
 
-        class ConfigForm(forms.Form):
-
-            chart_mode = forms.ChoiceField(label=_('Chart type'), choices=(), required=False)
-            serie_field = forms.ChoiceField(label=_('Serie field'), choices=(), required=False)
-            serie_op = forms.ChoiceField(label=_('Serie operator'), choices=CHART_SERIE_OPERATOR, required=False)
-
-            def __init__(self, *args, **kwargs):
-                super(ConfigForm, self).__init__(*args, **kwargs)
-                choices = [('', '')]
-                for k, v in DEFAULT_CHART_TYPES:
-                    if k in self.chart_types:
-                        choices.append((k, v))
-                self.fields['chart_mode'].choices = list(choices)
-                choices = [('', '')]
-                for i, (index, mfield, field, caption) in enumerate(self.serie_fields):
-                    choices += (
-                        (index, caption),
-                    )
-                self.fields['serie_field'].choices = list(choices)
-
-            def get_config_data(self):
-                data = getattr(self, 'cleaned_data', {})
-                if not data:
-                    return {}
-                if not data['serie_field'] or not data['chart_mode'] or not data['serie_op']:
-                    return {}
-                data['serie_field'] = int(data['serie_field'])
-                return data
-
-        ConfigForm.serie_fields = self.get_serie_fields()
-        ConfigForm.chart_types = self.chart_types
-        # ConfigForm.serie_fields
-        form = ConfigForm(data=request.GET or None)
+    def get_chart_url(self):
+        """
+        Return the url of the chart options as JSON, ``None`` when the project
+        doesn't include it.
+        """
+        try:
+            return reverse('model_report_chart', args=[self.get_slug()])
+        except NoReverseMatch:
+            return None
+
+    def get_inline_url(self, request, by_row):
+        """
+        Return the url loading this inline report for the parent report row
+        ``by_row``, ``None`` when it is rendered with the parent report: the
+        parent report doesn't set ``inlines_on_demand`` or is exported.
+        """
+        parent = self.parent_report
+        if parent is None or not parent.inlines_on_demand or getattr(parent, 'is_export', False):
+            return None
+        try:
+            url = reverse('model_report_inline', args=[parent.get_slug()])
+        except NoReverseMatch:
+            return None
+        params = request.GET.copy()
+        params['inline'] = parent.inlines.index(self.__class__)
+        params['row'] = encode_page_key([by_row[index].value for pattname, cattname, index
+                                         in self.related_inline_filters])
+        return '%s?%s' % (url, params.urlencode())
+
+    def render_inline(self, request):
+        """
+        Return the inline report in the ``inline`` parameter of the row in the
+        ``row`` parameter as html, loaded when the row is expanded in a report
+        with ``inlines_on_demand``.
+        """
+        try:
+            inline_class = self.inlines[int(request.GET.get('inline', ''))]
+        except (ValueError, IndexError):
+            raise Http404
+        inline = inline_class(self, request)
+        values, continued = decode_page_key(request.GET.get('row', ''))
+        if not self.inlines_on_demand or values is None or len(values) != len(inline.related_inline_filters):
+            raise Http404
+        inline.metrics = ReportMetrics(inline, request)
+        try:
+            # the parent row, with only the values the inline report is filtered by
+            row = ReportRow([ReportValue(None) for field in self.get_fields()])
+            for (pattname, cattname, index), value in zip(inline.related_inline_filters, values):
+                row[index] = ReportValue(value)
+            context = inline.get_render_context(request, by_row=row)
+            context['inline_loaded'] = True
+            with inline.stage('render'):
+                return render_to_response('model_report/includes/report_inline.html', context,
+                                          context_instance=RequestContext(request))
+        finally:
+            inline.metrics.finish()
+
+    def render_group(self, request):
+        """
+        Return the value rows of the group in the ``group`` parameter as html,
+        loaded when the group is expanded in a report rendered with
+        ``group_rows_on_demand``.
+        """
+        self.metrics = ReportMetrics(self, request)
+        try:
+            form_groupby = self.get_form_groupby(request)
+            form_filter = self.get_form_filter(request)
+            groupby_data = form_groupby.get_cleaned_data() if form_groupby else {}
+            self.__dict__.update(groupby_data)
+            self.set_columns(self.get_form_config(request), groupby_data)
+            values, continued = decode_page_key(request.GET.get('group', ''))
+            if not values or self.get_group_url(request, groupby_data) is None:
+                raise Http404
+            groupby_field = groupby_data['groupby']
+            filter_kwargs = dict(form_filter.get_filter_kwargs())
+            if values[0] is None:
+                filter_kwargs['%s__isnull' % groupby_field] = True
+            else:
+                filter_kwargs[groupby_field] = values[0]
+            # the group is one of the top groups already
+            groupby_data = dict(groupby_data, group_top=None)
+            report_rows = self.get_rows(groupby_data, filter_kwargs)
+            gruper, rows = report_rows[0] if report_rows else (None, [])
+            context = {
+                'report': self,
+                'gruper': gruper,
+                'rows': [row for row in rows if row.is_value()],
+                'report_inlines': [ir(self, request) for ir in self.inlines],
+                'request': request,
+            }
+            with self.stage('render'):
+                return render_to_response('model_report/includes/report_group_rows.html', context,
+                                          context_instance=RequestContext(request))
+        finally:
+            self.metrics.finish()
+            globals()['_cache_class'] = {}
+
+    def get_form_config(self, request):
+        form = ConfigForm(self.chart_types, self.get_serie_fields(), data=request.GET or None,
+                          column_fields=self.get_column_fields())
         form.is_valid()
 
         return form
 
+    def get_column_fields(self):
+        """
+        Return the ``(field, caption)`` of the columns the users can choose,
+        ``None`` when they can't, see ``choose_columns``.
+        """
+        if not self.choose_columns or self.parent_report or self.inlines:
+            return None
+        return zip(self.get_fields(), [force_unicode(caption) for caption in self.get_column_names()])
+
+    def set_columns(self, form_config, groupby_data=None, config=None):
+        """
+        Narrow the report to the columns chosen in ``form_config``, with the
+        group by field and the serie field of the chart ``config``, whose
+        index is updated. Return ``True`` when the columns changed.
+        """
+        if not self.get_column_fields():
+            return False
+        fields = self.get_fields()
+        columns = set(form_config.get_columns())
+        if not columns.intersection(fields):
+            return False
+        if groupby_data and groupby_data.get('groupby'):
+            columns.add(groupby_data['groupby'])
+        serie_field = fields[config['serie_field']] if config else None
+        if serie_field:
+            columns.add(serie_field)
+        self.fields = [field for field in fields if field in columns]
+        self.group_totals = dict([(field, fun) for field, fun in self.group_totals.items() if field in columns])
+        self.report_totals = dict([(field, fun) for field, fun in self.report_totals.items() if field in columns])
+        self.set_model_fields()
+        if serie_field:
+            config['serie_field'] = self.fields.index(serie_field)
+        return True
+
     # @cache_return
     def get_groupby_fields(self):
         return [(mfield, field, caption) for (mfield, field), caption in zip(self.model_fields, self.get_column_names())
@@ -687,40 +1452,18 @@ class ReportAdmin(object):
         if not groupby_fields:
             return None
 
-        class GroupByForm(forms.Form):
-
-            groupby = forms.ChoiceField(label=_('Group by field:'), required=False)
-            onlytotals = forms.BooleanField(label=_('Show only totals'), required=False)
-
-            def _post_clean(self):
-                pass
-
-            def __init__(self, **kwargs):
-                super(GroupByForm, self).__init__(**kwargs)
-                choices = [(None, '')]
-                for i, (mfield, field, caption) in enumerate(self.groupby_fields):
-                    choices.append((field, caption))
-                self.fields['groupby'].choices = choices
-                data = kwargs.get('data', {})
-                if data:
-                    self.fields['groupby'].initial = data.get('groupby', '')
-
-            def get_cleaned_data(self):
-                cleaned_data = getattr(self, 'cleaned_data', {})
-                if 'groupby' in cleaned_data:
-                    if unicode(cleaned_data['groupby']) == u'None':
-                        cleaned_data['groupby'] = None
-                return cleaned_data
-
-        GroupByForm.groupby_fields = groupby_fields
-
-        form = GroupByForm(data=request.GET or None)
+        form = GroupByForm(groupby_fields, data=request.GET or None)
         form.is_valid()
 
         return form
 
-    def get_form_filter(self, request):
+    def get_form_filter_class(self):
+        """
+        Return the filter form class of the report, built once per report class
+        and configuration by :func:`get_form_filter`.
+        """
         form_fields = fields_for_model(self.model, [f for f in self.get_query_field_names() if f in self.list_filter])
+        facet_lookups = {}
         if not form_fields:
             form_fields = {
                 '__all__': forms.BooleanField(label='', widget=forms.HiddenInput, initial='1')
@@ -759,6 +1502,8 @@ class ReportAdmin(object):
                         else:
                             field = model_field.formfield()
                         field.label = force_unicode(_(field.label))
+                        # the choices are the objects of the relation the lookup goes through
+                        facet_lookups[k] = k.rsplit('__', 1)[0]
 
                 else:
                     if isinstance(v, forms.BooleanField):
@@ -781,118 +1526,776 @@ class ReportAdmin(object):
                         field = v
 
                     if hasattr(field, 'choices'):
+                        facet_lookups[k] = k
                         # self.override_field_filter_values
                         if not hasattr(field, 'queryset'):
                             if field.choices[0][0]:
                                 field.choices.insert(0, ('', '---------'))
                                 field.initial = ''
 
-                # Provide a hook for updating the queryset
-                if hasattr(field, 'queryset') and k in self.override_field_choices:
-                    field.queryset = self.override_field_choices.get(k)(self, field.queryset)
+                if hasattr(field, 'queryset') and self.filter_choices_search:
+                    self.set_filter_search_widget(k, field)
+
                 form_fields[k] = field
 
-        form_class = type('FilterFormBase', (forms.BaseForm,), {'base_fields': form_fields})
-
-        # noinspection PyProtectedMember
-        class FilterForm(form_class):
-
-            def _post_clean(self):
-                pass
-
-            def get_filter_kwargs(self):
-                if not self.is_valid():
-                    return {}
-                filter_kwargs = self.cleaned_data
-                for key, value in filter_kwargs.items():
-                    if not value:
-                        filter_kwargs.pop(key)
-                        continue
-                    if key == '__all__':
-                        filter_kwargs.pop(key)
-                        continue
-                    if isinstance(value, (list, tuple)):
-                        if isinstance(self.fields[key], RangeField):
-                            filter_kwargs.pop(key)
-                            start_range, end_range = value
-                            if start_range:
-                                filter_kwargs['%s__gte' % key] = start_range
-                            if end_range:
-                                filter_kwargs['%s__lte' % key] = end_range
-                    elif hasattr(self.fields[key], 'as_boolean'):
-                        if value:
-                            filter_kwargs.pop(key)
-                            filter_kwargs[key] = (unicode(value) == u'True')
-                return filter_kwargs
-
-            def get_cleaned_data(self):
-                return getattr(self, 'cleaned_data', {})
-
-            def __init__(self, *args, **kwargs):
-                super(FilterForm, self).__init__(*args, **kwargs)
-                self.filter_report_is_all = '__all__' in self.fields and len(self.fields) == 1
-                # try:
-                data_filters = {}
-                vals = args[0]
-                for key in vals.keys():
-                    if key in self.fields:
-                        data_filters[key] = vals[key]
-                for name in self.fields:
-                    for key, value in data_filters.items():
-                        if key == name:
-                            continue
-                        local_field = self.fields[name]
-                        if hasattr(local_field, 'queryset'):
-                            qs = local_field.queryset
-                            if key in qs.model._meta.get_all_field_names():
-                                local_field.queryset = qs.filter(Q(**{key: value}))
-                # TODO narrow or remove
-                # except:
-                #     pass
-
-                for local_field in self.fields:
-                    self.fields[local_field].required = False
-
-        form = FilterForm(data=request.GET or None)
+        for field in form_fields.values():
+            field.required = False
+
+        narrow_field_names = {}
+        for name, field in form_fields.items():
+            if hasattr(field, 'queryset'):
+                narrow_field_names[name] = frozenset(field.queryset.model._meta.get_all_field_names())
+
+        return type('FilterForm', (FilterForm,), {
+            'base_fields': form_fields,
+            'narrow_field_names': narrow_field_names,
+            'facet_lookups': facet_lookups,
+        })
+
+    def get_form_filter(self, request, counts=True):
+        # the labels of the fields are translated when the class is built
+        key = (self.__class__, tuple(self.list_filter), tuple(self.get_query_field_names()),
+               self.filter_choices_search, get_language())
+        form_class = _form_classes.get(key)
+        if form_class is None:
+            form_class = _form_classes[key] = self.get_form_filter_class()
+
+        form = form_class(self, data=request.GET or None)
         form.is_valid()
+        if self.filter_counts and counts:
+            form.set_choice_counts(self.get_filter_counts(form))
 
         return form
 
+    def get_filter_counts(self, form, names=None, values=None):
+        """
+        Return ``{field name: {choice value: rows}}`` with the number of rows of
+        the report for each choice of the filter fields ``names`` (every field
+        with choices by default) under the other active filters, only for the
+        choice ``values`` when given.
+
+        Each field with an active filter costs one grouped query, the other
+        fields share the same filters and are counted together.
+        """
+        filter_kwargs = form.get_filter_kwargs()
+        if names is None:
+            names = form.facet_lookups.keys()
+        counts = {}
+        shared = []
+        for name in names:
+            if name not in form.facet_lookups:
+                continue
+            if name in filter_kwargs:
+                kwargs = dict([(k, v) for k, v in filter_kwargs.items() if k != name])
+                lookup = form.facet_lookups[name]
+                counts[name] = self.get_facet_counts(kwargs, [lookup], values)[lookup]
+            else:
+                shared.append(name)
+        if shared:
+            lookups = list(set([form.facet_lookups[name] for name in shared]))
+            facet_counts = self.get_facet_counts(filter_kwargs, lookups, values)
+            for name in shared:
+                counts[name] = facet_counts[form.facet_lookups[name]]
+        return counts
+
+    def get_facet_counts(self, filter_kwargs, lookups, values=None):
+        """
+        Return ``{lookup: {value: rows}}`` with the number of rows of the report
+        for each value of ``lookups``, only for ``values`` when given: one
+        GROUP BY query per lookup, or a single GROUPING SETS query on
+        postgresql.
+        """
+        qs = self.get_aggregate_queryset(self.get_filtered_queryset(filter_kwargs)).order_by()
+        if values is None and len(lookups) > 1 and connections[qs.db].vendor == 'postgresql':
+            return self.get_grouping_sets_counts(qs, lookups)
+        counts = {}
+        for lookup in lookups:
+            lookup_qs = qs if values is None else qs.filter(**{'%s__in' % lookup: list(values)})
+            counts[lookup] = dict(lookup_qs.values_list(lookup).annotate(facet_count=Count('pk', distinct=True)))
+        return counts
+
+    def get_grouping_sets_counts(self, qs, lookups):
+        """
+        Count the rows of ``qs`` for each value of ``lookups`` in one query
+        grouping by ``GROUPING SETS ((lookup1), (lookup2), ...)``. The rows and
+        the values of ``lookups`` are selected by the query of ``qs`` itself,
+        used as a subquery with named columns.
+        """
+        quote_name = connections[qs.db].ops.quote_name
+        sql, params = qs.values_list('pk', *lookups).query.get_compiler(using=qs.db).as_sql()
+        columns = [quote_name('facet_%s' % index) for index in range(len(lookups))]
+        pk = quote_name('facet_pk')
+        sql = 'SELECT %s, COUNT(DISTINCT %s), %s FROM (%s) AS %s (%s) GROUP BY GROUPING SETS (%s)' % (
+            ', '.join(columns), pk, ', '.join(['GROUPING(%s)' % c for c in columns]), sql,
+            quote_name('facets'), ', '.join([pk] + columns), ', '.join(['(%s)' % c for c in columns]))
+        cursor = connections[qs.db].cursor()
+        cursor.execute(sql, params)
+        size = len(lookups)
+        counts = dict([(lookup, {}) for lookup in lookups])
+        for row in cursor.fetchall():
+            for lookup, value, grouping in zip(lookups, row[:size], row[size + 1:]):
+                if not grouping:
+                    counts[lookup][value] = row[size]
+        return counts
+
+    def set_filter_search_widget(self, name, field):
+        """
+        Replace the select of a model choice filter field by a search widget
+        rendering only the selected choices.
+        """
+        try:
+            url = reverse('model_report_filter_choices', args=[self.get_slug(), name])
+        except NoReverseMatch:
+            return
+        if isinstance(field.widget, forms.SelectMultiple):
+            field.widget = SearchSelectMultiple(url)
+        else:
+            field.widget = SearchSelect(url)
+        field.queryset = field.queryset  # set the choices of the new widget
+
+    def get_filter_search_field(self, name, model):
+        """
+        Return the field of ``model`` searched by prefix for the choices of the
+        filter ``name``: the field the lookup ends in or the first char field.
+        """
+        char_fields = [f.name for f in model._meta.fields if isinstance(f, CharField)]
+        lookup = name.split('__')[-1]
+        if lookup in char_fields:
+            return lookup
+        return char_fields[0] if char_fields else None
+
+    def render_filter_choices(self, request, name):
+        """
+        Return a page of the choices of the filter ``name`` starting with the
+        ``q`` parameter as JSON, narrowed by the other filter values.
+        """
+        form = self.get_form_filter(request, counts=False)
+        field = form.fields.get(name)
+        if field is None or not hasattr(field, 'queryset'):
+            raise Http404
+        try:
+            page = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+        page_size = getattr(settings, 'MODEL_REPORT_FILTER_CHOICES_PAGE_SIZE', 20)
+        search = request.GET.get('q', '').strip()
+
+        qs = field.queryset
+        search_field = self.get_filter_search_field(name, qs.model)
+        if search_field:
+            if search:
+                qs = qs.filter(**{'%s__istartswith' % search_field: search})
+            qs = qs.order_by(search_field, 'pk')
+        # one more row tells if there is a next page
+        objects = list(qs[(page - 1) * page_size:page * page_size + 1])
+        if self.filter_counts and name in form.facet_lookups:
+            # the counts of the choices of the page only
+            values = [field.prepare_value(obj) for obj in objects[:page_size]]
+            form.set_choice_counts(self.get_filter_counts(form, [name], values))
+        data = {
+            'results': [{'id': field.prepare_value(obj), 'text': field.label_from_instance(obj)}
+                        for obj in objects[:page_size]],
+            'more': len(objects) > page_size,
+            'more_label': force_unicode(_('More...')),
+        }
+        return HttpResponse(json.dumps(data), mimetype='application/json')
+
     def filter_query(self, qs):
         return qs
 
-    def get_rows(self, groupby_data=None, filter_kwargs=None, filter_related_fields=None, do_localize=True):
-        report_rows = []
+    def get_filtered_queryset(self, filter_kwargs=None):
+        """
+        Return the queryset of the report with the filters applied.
+        """
+        filter_kwargs = dict(filter_kwargs or {})
 
-        def get_field_value(obj, pfield):
-            if isinstance(obj, dict):
-                return obj[pfield]
-            left_field = pfield.split("__")[0]
-            # try:
-            right_field = "__".join(pfield.split("__")[1:])
-            # except:
-            #     right_field = ''
-            if right_field:
-                return get_field_value(getattr(obj, left_field), right_field)
-            if hasattr(obj, 'get_%s_display' % left_field):
-                attr = getattr(obj, 'get_%s_display' % pfield)
+        for kwarg, value in filter_kwargs.items():
+            if kwarg in self.override_field_filter_values:
+                filter_kwargs[kwarg] = self.override_field_filter_values.get(kwarg)(self, value)
+
+        qs = self.filter_query(self.get_queryset(filter_kwargs))
+        if self.sample_scale:
+            qs = self.get_sample_queryset(qs)
+        return qs
+
+    def get_sample_scale(self, request):
+        """
+        Return the number of rows each row of the sample stands for when the
+        report is rendered in the sampled mode for ``request``, ``None`` when
+        it is exact.
+        """
+        if not self.sample_percent or self.parent_report or not request.GET.get('sample'):
+            return None
+        if connections[self.model._default_manager.db].vendor == 'postgresql':
+            return 100.0 / self.sample_percent
+        return float(max(int(round(100.0 / self.sample_percent)), 1))
+
+    def get_sample_context(self, request):
+        """
+        Return the ``report_sample`` context of the sampled mode: its
+        ``percent``, if it is ``active`` and the ``url`` switching it, ``None``
+        when the report has no sampled mode.
+        """
+        if not self.sample_percent or self.parent_report:
+            return None
+        params = request.GET.copy()
+        params.pop('export', None)
+        if self.sample_scale:
+            params.pop('sample', None)
+        else:
+            params['sample'] = '1'
+        return {
+            'percent': self.sample_percent,
+            'active': bool(self.sample_scale),
+            'url': '?%s' % params.urlencode(),
+        }
+
+    def get_sample_queryset(self, qs):
+        """
+        Return the rows of ``qs`` in the sample of the table of the report
+        model: ``TABLESAMPLE`` on postgresql, the rows with a primary key
+        multiple of ``sample_scale`` on the other databases, always the same
+        rows.
+        """
+        connection = connections[qs.db]
+        qn = connection.ops.quote_name
+        table = qn(self.model._meta.db_table)
+        pk = '%s.%s' % (table, qn(self.model._meta.pk.column))
+        if connection.vendor == 'postgresql':
+            where = '%s IN (SELECT %s FROM %s TABLESAMPLE SYSTEM (%%s) REPEATABLE (0))' % (
+                pk, qn(self.model._meta.pk.column), table)
+            return qs.extra(where=[where], params=[self.sample_percent])
+        if connection.vendor == 'oracle':
+            where = 'MOD(%s, %%s) = 0' % pk
+        else:
+            where = '%s %%%% %%s = 0' % pk
+        return qs.extra(where=[where], params=[int(self.sample_scale)])
+
+    def get_aggregate_queryset(self, qs):
+        """
+        Return a queryset to aggregate every object of ``qs`` once, even when
+        its filters join many rows.
+        """
+        if len(qs.query.tables) > 1:
+            return self.model.objects.filter(pk__in=qs.values('pk'))
+        return qs
+
+    def get_group_top(self, groupby_data):
+        """
+        Return the number of groups to show, ``None`` to show every group.
+        """
+        if not groupby_data or not groupby_data.get('groupby'):
+            return None
+        groupby_field = groupby_data['groupby']
+        if (self.get_db_field(groupby_field) is None or groupby_field in self.get_m2m_field_names() or
+                groupby_field in self.override_group_value):
+            return None
+        return groupby_data.get('group_top', self.group_top) or None
+
+    def get_top_groups_filters(self, qs, groupby_field, top):
+        """
+        Return two ``Q`` objects matching the ``top`` groups of ``qs`` with the
+        largest totals and the other groups. The groups are ranked by the
+        database, once per query.
+        """
+        key = (groupby_field, top, unicode(qs.query))
+        if self.top_groups_filters and self.top_groups_filters[0] == key:
+            return self.top_groups_filters[1]
+
+        rank = Sum(self.group_top_by) if self.group_top_by else Count('pk', distinct=True)
+        ranked = self.get_aggregate_queryset(qs).order_by().values_list(groupby_field)
+        ranked = ranked.annotate(group_total=rank).order_by('-group_total', groupby_field)[:top]
+        values = [value for value, total in ranked]
+        top_filter = Q(**{'%s__in' % groupby_field: [v for v in values if v is not None]})
+        other_filter = ~top_filter
+        isnull_filter = Q(**{'%s__isnull' % groupby_field: True})
+        if None in values:
+            top_filter |= isnull_filter
+            other_filter &= ~isnull_filter
+        else:
+            # NOT IN doesn't match NULL
+            other_filter |= isnull_filter
+        self.top_groups_filters = (key, (top_filter, other_filter))
+        return top_filter, other_filter
+
+    def get_other_rows(self, groupby_field, ffields):
+        """
+        Return the rows of the "Other" group: one totals row with the number of
+        groups and rows left out by ``group_top`` and the sum of
+        ``group_top_by``, computed by the database.
+        """
+        aggregates = {
+            'rows': Count('pk', distinct=True),
+            'groups': Count(groupby_field, distinct=True),
+        }
+        if self.group_top_by:
+            aggregates['total'] = Sum(self.group_top_by)
+        totals = self.get_aggregate_queryset(self.other_queryset).order_by().aggregate(**aggregates)
+        if not totals['rows']:
+            return []
+        if self.sample_scale:
+            totals['rows'] = int(round(totals['rows'] * self.sample_scale))
+            if totals.get('total') is not None:
+                totals['total'] = Decimal(repr(float(totals['total']) * self.sample_scale))
+        row = ReportRow()
+        for field in ffields:
+            if field == groupby_field:
+                value = ReportValue(force_unicode(_('%(groups)s groups, %(rows)s rows') % totals))
+            elif field == self.group_top_by:
+                value = ReportValue(totals['total'])
+                if field in self.override_field_formats:
+                    value.format = self.override_field_formats[field]
             else:
-                attr = getattr(obj, pfield)
-            if callable(attr):
-                attr = attr()
-            return attr
+                value = ReportValue(' ')
+            value.is_value = False
+            value.is_group_total = True
+            row.append(value)
+        row.is_total = True
+        return [row]
+
+    def get_order_by_fields(self, groupby_data=None):
+        """
+        Return the ordering of the report rows: the group by field, then
+        ``list_order_by``.
+        """
+        obfields = list(self.list_order_by)
+        if groupby_data and groupby_data['groupby']:
+            if groupby_data['groupby'] in obfields:
+                obfields.remove(groupby_data['groupby'])
+            obfields.insert(0, groupby_data['groupby'])
+        return obfields
 
-        if filter_related_fields is None:
-            filter_related_fields = {}
+    def get_page_size(self, groupby_data=None):
+        """
+        Return the number of rows of a page of the HTML report, ``None`` when it
+        shows every row: ``list_per_page`` isn't set, or the ordering, the
+        grouping or the totals can't be computed by the database.
+        """
+        size = self.list_per_page or getattr(settings, 'MODEL_REPORT_LIST_PER_PAGE', None)
+        if not size or self.parent_report or self.multi_valued_fields or self.onlytotals or self.sample_scale:
+            return None
+        groupby_field = groupby_data.get('groupby') if groupby_data else None
+        if groupby_field and (groupby_field in self.override_group_value or self.get_db_field(groupby_field) is None):
+            return None
+        for field in self.group_totals.keys() + self.report_totals.keys():
+            if self.get_db_field(field) is None:
+                return None
+        for field in self.get_order_by_fields(groupby_data):
+            if '.' in field or is_multi_valued_lookup(self.model, field.lstrip('-')):
+                return None
+        return size
+
+    def get_page_totals(self, qs, groupby_field):
+        """
+        Return ``(group_totals, report_totals)`` of every row of ``qs``, the
+        totals of each group by raw group value and the report totals, as
+        ``{field: total}``. They are computed once for all the pages of a
+        report, by the database like :func:`get_group_totals` when possible:
+        cached until the data of the models of the report changes.
+        """
+        fields = [f for f in self.get_fields() if f in self.group_totals or f in self.report_totals]
+        if not fields:
+            return {}, {}
+        totals_qs = qs.order_by().values_list(*([groupby_field] + fields if groupby_field else fields))
+        key = 'model_report:totals:%s' % hashlib.md5(smart_str(u'%s %s %s' % (
+            get_data_versions(self.get_data_models()), self.get_slug(), totals_qs.query))).hexdigest()
+        cache = get_report_cache()
+        totals = cache.get(key)
+        if totals is not None:
+            return totals
+
+        if self.has_aggregate_totals():
+            totals = self.get_aggregate_totals(qs, groupby_field)
+        else:
+            group_values = {}
+            report_values = self.get_empty_row_asdict(self.report_totals, [])
+            for row in totals_qs.iterator():
+                grouper, values = (row[0], row[1:]) if groupby_field else (None, row)
+                if grouper not in group_values:
+                    group_values[grouper] = self.get_empty_row_asdict(self.group_totals, [])
+                for field, value in zip(fields, values):
+                    if field in self.group_totals:
+                        group_values[grouper][field].append(value)
+                    if field in self.report_totals:
+                        report_values[field].append(value)
+            group_totals = dict([(grouper, self.compute_totals(self.group_totals, values))
+                                 for grouper, values in group_values.items()])
+            totals = group_totals, self.compute_totals(self.report_totals, report_values)
+        cache.set(key, totals, getattr(settings, 'MODEL_REPORT_PAGE_TOTALS_TIMEOUT', 60 * 5))
+        return totals
+
+    def get_data_models(self):
+        """
+        Return the model of the report and the models joined by its fields and
+        filters, the data the cached totals of the report depend on.
+        """
+        return get_data_models(self.model, self.get_query_field_names() + list(self.list_filter))
+
+    def get_page_list(self, qs, ffields, groupby_data, page):
+        """
+        Return the rows of ``qs`` of the page after the ``page`` token (the first
+        page when empty), sought with the ordering instead of an OFFSET. Sets
+        ``page_next`` to the token of the next page and ``page_continued`` when
+        the first group goes on from the previous page, ``page_next_continued``
+        when the last group goes on in the next page.
+        """
+        size = self.get_page_size(groupby_data)
+        order_fields = self.get_order_by_fields(groupby_data) + ['pk']
+        key_fields = [f.lstrip('-') for f in order_fields]
+        after, self.page_continued = decode_page_key(page) if page else (None, False)
+        if after is not None and len(after) == len(order_fields):
+            nulls_last = connections[qs.db].vendor in ('postgresql', 'oracle')
+            qs = qs.filter(get_seek_filter(order_fields, after, nulls_last))
+        else:
+            self.page_continued = False
+        qs = qs.order_by(*order_fields).values_list(*(list(ffields) + key_fields))
+        rows = list(qs[:size + 1])
 
-        if filter_kwargs is None:
-            filter_kwargs = {}
+        self.page_next = None
+        self.page_next_continued = False
+        if len(rows) > size:
+            if groupby_data and groupby_data['groupby']:
+                index = ffields.index(groupby_data['groupby'])
+                self.page_next_continued = rows[size][index] == rows[size - 1][index]
+            self.page_next = encode_page_key(rows[size - 1][len(ffields):], self.page_next_continued)
+            rows = rows[:size]
+        return [list(row[:len(ffields)]) for row in rows]
 
-        for kwarg, value in filter_kwargs.items():
+    def get_group_url(self, request, groupby_data=None):
+        """
+        Return the url loading the rows of a group of the report rendered for
+        ``request``, ``None`` when the groups are rendered with their rows:
+        ``group_rows_on_demand`` isn't set, or the groups or the totals can't
+        be computed by the database.
+        """
+        if not self.group_rows_on_demand or self.parent_report or self.multi_valued_fields or self.onlytotals or \
+                self.sample_scale:
+            return None
+        groupby_field = groupby_data.get('groupby') if groupby_data else None
+        if not groupby_field or groupby_field in self.override_group_value or \
+                self.get_db_field(groupby_field) is None:
+            return None
+        for field in self.group_totals.keys() + self.report_totals.keys():
+            if self.get_db_field(field) is None:
+                return None
+        try:
+            url = reverse('model_report_group', args=[self.get_slug()])
+        except NoReverseMatch:
+            return None
+        params = request.GET.copy()
+        for param in ('page_after', 'group'):
+            params.pop(param, None)
+        return '%s?%s' % (url, params.urlencode())
+
+    def get_group_totals(self, qs, groupby_field):
+        """
+        Return ``(group_totals, report_totals)`` of every row of ``qs`` like
+        :func:`get_page_totals`. When every totals function is ``sum_column``,
+        ``avg_column`` or ``count_column`` they are computed by the database
+        with one query grouped by ``groupby_field``.
+        """
+        if not self.has_aggregate_totals():
+            return self.get_page_totals(qs, groupby_field)
+        return self.get_aggregate_totals(qs, groupby_field)
+
+    def has_aggregate_totals(self):
+        """
+        Return ``True`` when the totals can be computed by the database: every
+        totals function is ``sum_column``, ``avg_column`` or ``count_column``
+        of a database field, without fields joining many related objects.
+        """
+        if self.sample_scale or self.multi_valued_fields:
+            return False
+        for row_config in (self.group_totals, self.report_totals):
+            for field, fun in row_config.items():
+                if fun not in (sum_column, avg_column, count_column) or self.get_db_field(field) is None:
+                    return False
+        return True
+
+    def get_aggregate_totals(self, qs, groupby_field):
+        """
+        Return ``(group_totals, report_totals)`` of every row of ``qs``
+        computed by the database, see :func:`has_aggregate_totals`.
+        """
+        aggregates = self.get_totals_aggregates()
+        qs = self.get_aggregate_queryset(qs).order_by()
+        if not groupby_field:
+            values = qs.aggregate(**aggregates)
+            totals = self.compute_aggregate_totals(self.group_totals, values)
+            return {None: totals} if values['total_rows'] else {}, \
+                self.compute_aggregate_totals(self.report_totals, values)
+
+        group_totals = {}
+        report_values = dict([(alias, 0) for alias in aggregates])
+        for row in qs.values(groupby_field).annotate(**aggregates):
+            grouper = row.pop(groupby_field)
+            group_totals[grouper] = self.compute_aggregate_totals(self.group_totals, row)
+            for alias, value in row.items():
+                report_values[alias] += value or 0
+        return group_totals, self.compute_aggregate_totals(self.report_totals, report_values)
+
+    def get_totals_aggregates(self):
+        """
+        Return the aggregates of the totals read by :func:`compute_aggregate_totals`.
+        """
+        aggregates = {'total_rows': Count('pk')}
+        for index, field in enumerate(self.get_fields()):
+            if self.group_totals.get(field, count_column) != count_column or \
+                    self.report_totals.get(field, count_column) != count_column:
+                # the aliases can't clash with the fields of the model
+                aggregates['total_%s' % index] = Sum(field)
+        return aggregates
+
+    def compute_aggregate_totals(self, row_config, values):
+        """
+        Return ``{field: total}`` of the totals functions of ``row_config``
+        from the aggregates of ``values``: the number of rows in
+        ``total_rows`` and the sum of each field in ``total_<index>``.
+        """
+        totals = {}
+        for index, field in enumerate(self.get_fields()):
+            if field in row_config:
+                if row_config[field] is count_column:
+                    totals[field] = Decimal(values['total_rows'])
+                elif row_config[field] is sum_column:
+                    totals[field] = Decimal(values['total_%s' % index] or 0)
+                elif values['total_rows']:
+                    totals[field] = Decimal(float(values['total_%s' % index] or 0) / values['total_rows'])
+                else:
+                    totals[field] = Decimal(0)
+        return totals
+
+    def get_rollup(self, groupby_data, filter_kwargs=None):
+        """
+        Return ``(rollup, filters)``, the first of ``rollups`` the totals of
+        the report can be read from and the filters of ``filter_kwargs`` on
+        its groups as ``{lookup: [(operator, value)]}``, ``None`` when there
+        isn't one: the report must be grouped by a field of the rollup, every
+        totals field must be a count or one of its sums and every filter field
+        (exact, ``__in``, ``__gte`` and ``__lte`` lookups, related objects)
+        must be one of its fields. Not for reports with a custom queryset,
+        fields through many to many relations or top groups.
+        """
+        groupby_field = groupby_data.get('groupby') if groupby_data else None
+        if not self.rollups or not groupby_field or self.parent_report or self.multi_valued_fields or \
+                self.sample_scale or groupby_field in self.override_group_value or \
+                split_date_part(groupby_field)[1] or self.get_group_top(groupby_data):
+            return None
+        if self.get_queryset.im_func is not ReportAdmin.get_queryset.im_func or \
+                self.filter_query.im_func is not ReportAdmin.filter_query.im_func:
+            return None
+        summed = []
+        for row_config in (self.group_totals, self.report_totals):
+            for field, fun in row_config.items():
+                if fun not in (sum_column, avg_column, count_column):
+                    return None
+                if fun is not count_column:
+                    summed.append(field)
+
+        filters = {}
+        for kwarg, value in (filter_kwargs or {}).items():
+            if value is None or value == '':
+                continue
             if kwarg in self.override_field_filter_values:
-                filter_kwargs[kwarg] = self.override_field_filter_values.get(kwarg)(self, value)
+                return None
+            if hasattr(value, 'values_list') or isinstance(value, Model):
+                # filtered by the objects of the relation the lookup goes through
+                lookup, operator = kwarg.rsplit('__', 1)[0], 'in'
+                value = value.values_list('pk', flat=True) if hasattr(value, 'values_list') else [value.pk]
+            else:
+                lookup, operator = kwarg.rsplit('__', 1) if '__' in kwarg else (kwarg, 'exact')
+                if operator not in ROLLUP_OPERATORS:
+                    lookup, operator = kwarg, 'exact'
+                field = get_lookup_field(self.model, lookup)
+                if field is not None:
+                    value = [field.to_python(v) for v in value] if operator == 'in' else field.to_python(value)
+            if operator == 'in':
+                value = set(value)
+            filters.setdefault(lookup, []).append((operator, value))
+
+        for rollup in self.rollups:
+            if groupby_field in rollup.group_by and \
+                    not [field for field in summed if field not in rollup.sums] and \
+                    not [lookup for lookup in filters if lookup not in rollup.group_by]:
+                return rollup, filters
+        return None
+
+    def get_rollup_totals(self, groupby_data, rollup, filters):
+        """
+        Return ``(group_totals, report_totals)`` like :func:`get_group_totals`
+        read from the groups of ``rollup`` which pass the tests of ``filters``
+        (see :func:`get_rollup`) instead of the rows of the report model.
+        """
+        fields = self.get_fields()
+        groupby_index = rollup.group_by.index(groupby_data['groupby'])
+        tests = [(rollup.group_by.index(lookup), tests) for lookup, tests in filters.items()]
+        empty = dict([('total_%s' % index, 0) for index in range(len(fields))])
+        empty['total_rows'] = 0
+        aggregates = {}
+        report_values = dict(empty)
+        for values, rows, sums in rollup.get_totals():
+            if [index for index, lookup_tests in tests
+                    if [test for test in lookup_tests if not rollup_match(values[index], *test)]]:
+                continue
+            grouper = values[groupby_index]
+            if grouper not in aggregates:
+                aggregates[grouper] = dict(empty)
+            for totals in (aggregates[grouper], report_values):
+                totals['total_rows'] += rows
+                for field, total in zip(rollup.sums, sums):
+                    if field in fields:
+                        totals['total_%s' % fields.index(field)] += total
+        group_totals = dict([(grouper, self.compute_aggregate_totals(self.group_totals, values))
+                             for grouper, values in aggregates.items()])
+        return group_totals, self.compute_aggregate_totals(self.report_totals, report_values)
+
+    def get_partition_totals(self, groupby_data, filter_kwargs):
+        """
+        Return ``(group_totals, report_totals)`` like :func:`get_group_totals`
+        of the report filtered by a range of ``totals_partition_field``,
+        summed from the totals of each partition of the range. The totals of
+        the partitions before today's one and inside the range are cached
+        until the version of the partition changes, the others are computed
+        with one query. Return ``None`` when the range has no start, a totals
+        function isn't ``sum_column``, ``avg_column`` or ``count_column`` or
+        the report has fields through many to many relations or top groups.
+        A change of a related object of the report changes every partition.
+        """
+        field = self.totals_partition_field
+        if not field or self.parent_report or self.multi_valued_fields or self.sample_scale or \
+                self.get_group_top(groupby_data):
+            return None
+        filter_kwargs = dict(filter_kwargs or {})
+        start = filter_kwargs.pop('%s__gte' % field, None)
+        end = filter_kwargs.pop('%s__lte' % field, None)
+        if not start or isinstance(self.model._meta.get_field(field), DateTimeField) or \
+                '%s__gte' % field in self.override_field_filter_values or \
+                '%s__lte' % field in self.override_field_filter_values:
+            return None
+        groupby_field = groupby_data.get('groupby') if groupby_data else None
+        if groupby_field and (groupby_field in self.override_group_value or self.get_db_field(groupby_field) is None):
+            return None
+        for totals_field, fun in self.group_totals.items() + self.report_totals.items():
+            if fun not in (sum_column, avg_column, count_column) or self.get_db_field(totals_field) is None:
+                return None
+
+        aggregates = self.get_totals_aggregates()
+        qs = self.get_aggregate_queryset(self.get_filtered_queryset(filter_kwargs))
+        # the rows of the model change the version of their partition, the
+        # related objects (group names, filtered relations) every partition
+        related_versions = get_data_versions(self.get_data_models()[1:])
+        prefix = 'model_report:partition:%s' % hashlib.md5(smart_str(u'%s %s %s %s %s %s %s' % (
+            self.get_slug(), groupby_field, self.totals_partition, self.get_fields(), sorted(aggregates),
+            related_versions, qs.query))).hexdigest()
+
+        today = get_today()
+        partitions = get_partitions(start, max(start, today) if end is None else end, self.totals_partition)
+        closed = [p for p in partitions if start <= p[0] and p[1] < today and (end is None or p[1] <= end)]
+        versions = get_partition_versions(self.model, field, self.totals_partition, [p[0] for p in closed])
+        keys = dict([('%s:%s:%s' % (prefix, p[0].isoformat(), versions[p[0]]), p[0]) for p in closed])
+        cache = get_report_cache()
+        cached = cache.get_many(keys.keys())
+        cached_starts = set([keys[key] for key in cached])
+
+        ranges = []
+        for partition in partitions:
+            if partition[0] in cached_starts:
+                continue
+            if end is not None:
+                ranges.append((max(partition[0], start), min(partition[1], end)))
+            elif partition == partitions[-1]:
+                # today's partition and the rows after it
+                ranges.append((max(partition[0], start), None))
+            else:
+                ranges.append((max(partition[0], start), partition[1]))
+        computed = {}
+        if ranges:
+            values_fields = [groupby_field, field] if groupby_field else [field]
+            rows = qs.filter(get_ranges_filter(field, ranges)).order_by().values(*values_fields).annotate(**aggregates)
+            for row in rows:
+                partition = get_partition(row.pop(field), self.totals_partition)[0]
+                grouper = row.pop(groupby_field) if groupby_field else None
+                values = computed.setdefault(partition, {}).setdefault(grouper, dict([(alias, 0) for alias in aggregates]))
+                for alias, value in row.items():
+                    values[alias] += value or 0
+            cache.set_many(dict([(key, computed.get(partition, {})) for key, partition in keys.items()
+                                 if key not in cached]),
+                           getattr(settings, 'MODEL_REPORT_PARTITION_TOTALS_TIMEOUT', 60 * 60 * 24 * 30))
+
+        group_values = {}
+        report_values = dict([(alias, 0) for alias in aggregates])
+        for partition_values in cached.values() + computed.values():
+            for grouper, values in partition_values.items():
+                if grouper not in group_values:
+                    group_values[grouper] = dict([(alias, 0) for alias in aggregates])
+                for alias, value in values.items():
+                    group_values[grouper][alias] += value
+                    report_values[alias] += value
+        group_totals = dict([(grouper, self.compute_aggregate_totals(self.group_totals, values))
+                             for grouper, values in group_values.items()])
+        return group_totals, self.compute_aggregate_totals(self.report_totals, report_values)
+
+    def get_group_headers(self, groupby_data, filter_kwargs, group_url=None, totals=None):
+        """
+        Return the ``report_rows`` of the groups without their value rows: the
+        totals row of each group, the "Other" group and the report totals. The
+        rows of a group are loaded from ``group_url`` with the encoded value of
+        the group in the ``group`` parameter, see :func:`render_group`.
+        ``totals`` are the ``(group_totals, report_totals)`` of the groups when
+        they are read from a rollup.
+        """
+        groupby_field = groupby_data['groupby']
+        if totals is None:
+            with self.stage('fetch'):
+                totals = self.get_partition_totals(groupby_data, filter_kwargs)
+        if totals is None:
+            qs, ffields = self.get_values_queryset(groupby_data, filter_kwargs)
+            with self.stage('fetch'):
+                totals = self.get_group_totals(qs, groupby_field)
+        else:
+            self.other_queryset = None
+        group_totals, report_totals = totals
+
+        report_rows = []
+        with self.stage('rows'):
+            for grouper in sorted(group_totals.keys()):
+                rows = GroupRows()
+                if group_url:
+                    rows.load_url = '%s&group=%s' % (group_url, encode_page_key([grouper]))
+                if self.group_totals:
+                    rows.append(self.get_totals_row(group_totals[grouper], is_group_total=True))
+                grouper = self._get_grouper_text(groupby_field, grouper)
+                if isinstance(grouper, (list, tuple)):
+                    grouper = grouper[0]
+                report_rows.append([grouper, rows])
+            if self.other_queryset is not None:
+                rows = self.get_other_rows(groupby_field, ffields)
+                if rows:
+                    report_rows.append([force_unicode(_('Other')), rows])
+            if self.has_report_totals():
+                report_rows.append(self.get_report_totals_group(report_totals))
+
+        self.fetched_rows = 0
+        if self.metrics is not None:
+            self.metrics.rows['fetched'] = 0
+            self.metrics.rows['groups'] = len(report_rows)
+        return report_rows
+
+    def get_values_queryset(self, groupby_data=None, filter_kwargs=None, filter_related_fields=None):
+        """
+        Return the filtered and ordered ``values_list`` queryset of the report
+        and the list of its field names, without evaluating it.
+        """
+        if filter_related_fields is None:
+            filter_related_fields = {}
 
-        qs = self.get_queryset(filter_kwargs)
+        qs = self.get_filtered_queryset(filter_kwargs)
+        self.other_queryset = None
+        top = self.get_group_top(groupby_data)
+        if top:
+            top_filter, other_filter = self.get_top_groups_filters(qs, groupby_data['groupby'], top)
+            self.other_queryset = qs.filter(other_filter)
+            qs = qs.filter(top_filter)
         ffields = ['pk' if f.startswith('self.') else f for f in self.get_query_field_names()
                    if f not in filter_related_fields]
         extra_ffield = []
@@ -934,136 +2337,216 @@ class ReportAdmin(object):
                                 else:
                                     raise NotImplemented  # mysql
                         break
-        obfields = list(self.list_order_by)
-        if groupby_data and groupby_data['groupby']:
-            if groupby_data['groupby'] in obfields:
-                obfields.remove(groupby_data['groupby'])
-            obfields.insert(0, groupby_data['groupby'])
-        qs = self.filter_query(qs)
-        qs = qs.order_by(*obfields)
+        qs = qs.order_by(*self.get_order_by_fields(groupby_data))
         if extra_ffield:
             qs = qs.extra(select=dict(extra_ffield))
         qs = qs.values_list(*ffields)
-        qs_list = list(qs)
-
-        def get_with_dotvalues(resources):
-            # {1: 'field.method'}
-            dot_indexes = dict([(pos, dot_field) for pos, dot_field in enumerate(self.get_fields())
-                                if '.' in dot_field])
-            dot_indexes_values = {}
-
-            dot_model_fields = [(pos, model_field[0]) for pos, model_field in enumerate(self.model_fields)
-                                if pos in dot_indexes]
-            # [ 1, model_field] ]
-            for pos, model_field in dot_model_fields:
-                model_ids = set([res[pos] for res in resources])
-                if isinstance(model_field, (unicode, str)) and model_field.startswith('self.'):
-                    model_qs = self.model.objects.filter(pk__in=model_ids)
-                else:
-                    model_qs = model_field.rel.to.objects.filter(pk__in=model_ids)
-                div = {}
-                method_name = dot_indexes[pos].split('.')[1]
-                for obj in model_qs:
-                    method_value = getattr(obj, method_name)
-                    if callable(method_value):
-                        method_value = method_value()
-                    div[obj.pk] = method_value
-                dot_indexes_values[pos] = div
-                del model_qs
-
-            if dot_indexes_values:
-                new_resources = []
-                for index_row, old_row in enumerate(resources):
-                    new_row = []
-                    for pos, actual_value in enumerate(old_row):
-                        if pos in dot_indexes_values:
-                            new_value = dot_indexes_values[pos][actual_value]
-                        else:
-                            new_value = actual_value
-                        new_row.append(new_value)
-                    new_resources.append(new_row)
-                resources = new_resources
-            return resources
-
-        def compute_row_totals(row_config, row_values, is_group_total=False, is_report_total=False):
-            total_row = self.get_empty_row_asdict(self.get_fields(), ReportValue(' '))
-            for field_name in total_row.keys():
-                if field_name in row_config:
-                    fun = row_config[field_name]
-                    cell_value = fun(row_values[field_name])
-                    if field_name in self.get_m2m_field_names():
-                        cell_value = ReportValue([cell_value])
-                        # cell_value = [cell_value]
-                    cell_value = ReportValue(cell_value)
-                    cell_value.is_value = False
-                    cell_value.is_group_total = is_group_total
-                    cell_value.is_report_total = is_report_total
-                    if field_name in self.override_field_values:
-                        cell_value.to_value = self.override_field_values[field_name]
-                    if field_name in self.override_field_formats:
-                        cell_value.format = self.override_field_formats[field_name]
-                    cell_value.is_m2m_value = field_name in self.get_m2m_field_names()
-                    total_row[field_name] = cell_value
-            totals_row = ReportRow(self.reorder_dictrow(total_row))
-            totals_row.is_total = True
-            return totals_row
-
-        def compute_row_header(row_config):
-            header_row = self.get_empty_row_asdict(self.get_fields(), ReportValue(''))
-            for field_name, fun in row_config.items():
-                if hasattr(fun, 'caption'):
-                    field_value = force_unicode(fun.caption)
-                else:
-                    field_value = '&nbsp;'
-                header_row[field_name] = field_value
-            header_row = self.reorder_dictrow(header_row)
-            header_row = ReportRow(header_row)
-            header_row.is_caption = True
-            return header_row
+        return qs, ffields
 
-        def group_m2m_field_values(gqs_values):
-            values_results = []
-            m2m_indexes = [tpl[2] for tpl in self.model_m2m_fields]
+    def compute_totals(self, row_config, row_values):
+        """
+        Return ``{field: total}`` with the totals functions of ``row_config``
+        applied to the values of ``row_values``, estimated for every row in
+        the sampled mode.
+        """
+        totals = dict([(field_name, row_config[field_name](row_values[field_name]))
+                       for field_name in self.get_fields() if field_name in row_config])
+        if self.sample_scale:
+            for field_name in totals:
+                estimate = estimate_total(row_config[field_name], row_values[field_name], self.sample_scale)
+                if estimate is not None:
+                    totals[field_name] = estimate
+        return totals
+
+    def get_totals_row(self, totals, is_group_total=False, is_report_total=False):
+        """
+        Return the totals row with the ``{field: total}`` of ``totals``.
+        """
+        total_row = self.get_empty_row_asdict(self.get_fields(), ReportValue(' '))
+        for field_name in total_row.keys():
+            if field_name in totals:
+                cell_value = totals[field_name]
+                if field_name in self.get_m2m_field_names():
+                    cell_value = ReportValue([cell_value])
+                    # cell_value = [cell_value]
+                cell_value = ReportValue(cell_value)
+                cell_value.error = getattr(totals[field_name], 'error', None)
+                cell_value.is_value = False
+                cell_value.is_group_total = is_group_total
+                cell_value.is_report_total = is_report_total
+                if field_name in self.override_field_values:
+                    cell_value.to_value = self.override_field_values[field_name]
+                if field_name in self.override_field_formats:
+                    cell_value.format = self.override_field_formats[field_name]
+                cell_value.is_m2m_value = field_name in self.get_m2m_field_names()
+                total_row[field_name] = cell_value
+        totals_row = ReportRow(self.reorder_dictrow(total_row))
+        totals_row.is_total = True
+        return totals_row
+
+    def get_totals_header_row(self, row_config):
+        """
+        Return the row with the captions of the totals functions of ``row_config``.
+        """
+        header_row = self.get_empty_row_asdict(self.get_fields(), ReportValue(''))
+        for field_name, fun in row_config.items():
+            if hasattr(fun, 'caption'):
+                field_value = force_unicode(fun.caption)
+            else:
+                field_value = '&nbsp;'
+            header_row[field_name] = field_value
+        header_row = self.reorder_dictrow(header_row)
+        header_row = ReportRow(header_row)
+        header_row.is_caption = True
+        return header_row
+
+    def get_report_totals_group(self, totals):
+        """
+        Return the "Totals" group of ``report_rows`` with the ``{field: total}``
+        of ``totals``.
+        """
+        header_report_total = self.get_totals_header_row(self.report_totals)
+        row = self.get_totals_row(totals, is_report_total=True)
+        header_report_total.is_report_totals = True
+        row.is_report_totals = True
+        return [_('Totals'), [header_report_total, row]]
 
-            def get_key_values(gqs_vals):
-                return [gv if field_idx not in m2m_indexes else None for field_idx, gv in enumerate(gqs_vals)]
+    def get_with_dotvalues(self, resources):
+        """
+        Return the rows of ``resources`` with the values of the ``field.method``
+        report fields, fetched with one query per field.
+        """
+        # {1: 'field.method'}
+        dot_indexes = dict([(pos, dot_field) for pos, dot_field in enumerate(self.get_fields())
+                            if '.' in dot_field])
+        dot_indexes_values = {}
+
+        dot_model_fields = [(pos, model_field[0]) for pos, model_field in enumerate(self.model_fields)
+                            if pos in dot_indexes]
+        # [ 1, model_field] ]
+        for pos, model_field in dot_model_fields:
+            model_ids = set([res[pos] for res in resources])
+            if isinstance(model_field, (unicode, str)) and model_field.startswith('self.'):
+                model_qs = self.model.objects.filter(pk__in=model_ids)
+            else:
+                model_qs = model_field.rel.to.objects.filter(pk__in=model_ids)
+            div = {}
+            method_name = dot_indexes[pos].split('.')[1]
+            for obj in model_qs:
+                method_value = getattr(obj, method_name)
+                if callable(method_value):
+                    method_value = method_value()
+                div[obj.pk] = method_value
+            dot_indexes_values[pos] = div
+            del model_qs
+
+        if dot_indexes_values:
+            new_resources = []
+            for index_row, old_row in enumerate(resources):
+                new_row = []
+                for pos, actual_value in enumerate(old_row):
+                    if pos in dot_indexes_values:
+                        new_value = dot_indexes_values[pos][actual_value]
+                    else:
+                        new_value = actual_value
+                    new_row.append(new_value)
+                new_resources.append(new_row)
+            resources = new_resources
+        return resources
 
-            # gqs_values needs to already be sorted on the same key function
-            # for groupby to work properly
-            gqs_values.sort(key=get_key_values)
-            res = groupby(gqs_values, key=get_key_values)
+    def get_group_text(self, groupby_data, grouper):
+        """
+        Return the text of the group ``grouper`` shown in the report.
+        """
+        if groupby_data and groupby_data['groupby']:
+            grouper = self._get_grouper_text(groupby_data['groupby'], grouper)
+        else:
+            grouper = None
+        if isinstance(grouper, (list, tuple)):
+            grouper = grouper[0]
+        return grouper
 
-            for key, values in res:
-                row_values = dict([(pos, []) for pos in m2m_indexes])
-                for subrow_value in values:
-                    for pos in m2m_indexes:
-                        if subrow_value[pos] not in row_values[pos]:
-                            row_values[pos].append(subrow_value[pos])
-                for pos, vals in row_values.items():
-                    key[pos] = vals
-                values_results.append(key)
-            return values_results
+    def get_group_cache_prefix(self, request, groupby_data=None, config=None):
+        """
+        Return the prefix of the cache keys of the rendered groups of the
+        report rendered for ``request``, ``None`` when the groups aren't
+        cached: ``cache_groups`` isn't set, or the report isn't grouped, has a
+        chart or renders its inline reports with every row.
+        """
+        if not self.cache_groups or self.parent_report or config or not groupby_data or \
+                not groupby_data.get('groupby') or (self.inlines and not self.inlines_on_demand):
+            return None
+        params = sorted([(k, request.GET.getlist(k)) for k in request.GET if k not in ('page_after', 'group')])
+        return u'%s %s %s %s' % (self.get_slug(), get_language(), self.fast_table, params)
 
-        qs_list = get_with_dotvalues(qs_list)
-        if self.model_m2m_fields:
-            qs_list = group_m2m_field_values(qs_list)
+    def get_group_cache_key(self, grouper, resources):
+        """
+        Return the cache key of the rendered rows of a group: the rows of the
+        group are its data version, so the key changes only when they change.
+        """
+        return 'model_report:group:%s' % hashlib.md5(smart_str(u'%s %r %r' % (
+            self.group_cache_prefix, grouper, resources))).hexdigest()
 
+    def get_groupby_function(self, groupby_data, ffields):
+        """
+        Return the function returning the group of a row of ``ffields``.
+        """
         if groupby_data and groupby_data['groupby']:
             groupby_field = groupby_data['groupby']
             if groupby_field in self.override_group_value:
                 transform_fn = self.override_group_value.get(groupby_field)
-                groupby_fn = lambda x: transform_fn(x[ffields.index(groupby_field)])
+                return lambda x: transform_fn(x[ffields.index(groupby_field)])
+            return lambda x: x[ffields.index(groupby_field)]
+        return lambda x: None
+
+    def iter_groups(self, resources, ffields, groupby_data=None, do_localize=True, page_totals=None):
+        """
+        Return an iterator over the ``[grouper, rows]`` of ``report_rows`` built
+        from the rows of ``resources``, which must be sorted by group: each
+        group with its totals as soon as its last row is read, then the "Other"
+        group and the report totals.
+        """
+        def get_field_value(obj, pfield):
+            if isinstance(obj, dict):
+                return obj[pfield]
+            left_field = pfield.split("__")[0]
+            # try:
+            right_field = "__".join(pfield.split("__")[1:])
+            # except:
+            #     right_field = ''
+            if right_field:
+                return get_field_value(getattr(obj, left_field), right_field)
+            if hasattr(obj, 'get_%s_display' % left_field):
+                attr = getattr(obj, 'get_%s_display' % pfield)
             else:
-                groupby_fn = lambda x: x[ffields.index(groupby_field)]
-        else:
-            groupby_fn = lambda x: None
+                attr = getattr(obj, pfield)
+            if callable(attr):
+                attr = attr()
+            return attr
 
-        qs_list.sort(key=groupby_fn)
-        g = groupby(qs_list, key=groupby_fn)
+        groupby_fn = self.get_groupby_function(groupby_data, ffields)
+        if page_totals is not None:
+            last_grouper = groupby_fn(resources[-1]) if resources else None
+        g = groupby(resources, key=groupby_fn)
 
+        cache = get_report_cache() if self.group_cache_prefix and page_totals is None else None
+        first_group = True
         row_report_totals = self.get_empty_row_asdict(self.report_totals, [])
         for grouper, group_resources in g:
             rows = list()
+            if cache is not None:
+                group_resources = list(group_resources)
+                rows = GroupRows()
+                rows.cache_key = self.get_group_cache_key(grouper, group_resources)
+                rows.html = cache.get(rows.cache_key)
+                if rows.html is not None:
+                    # rendered before from the same rows, only their report totals are needed
+                    for resource in group_resources:
+                        for index, value in enumerate(resource):
+                            if ffields[index] in row_report_totals:
+                                row_report_totals[ffields[index]].append(value)
+                    yield [self.get_group_text(groupby_data, grouper), rows]
+                    continue
             row_group_totals = self.get_empty_row_asdict(self.group_totals, [])
             for resource in group_resources:
                 row = ReportRow()
@@ -1095,28 +2578,136 @@ class ReportAdmin(object):
                             value.format = self.override_field_formats[column]
                         row.append(value)
                 rows.append(row)
-            if row_group_totals:
+            if page_totals is not None:
+                # the totals of the whole group, after its last row
+                if row_group_totals and groupby_data['groupby'] and not (
+                        grouper == last_grouper and self.page_next_continued):
+                    rows.append(self.get_totals_row(page_totals[0].get(grouper, {}), is_group_total=True))
+            elif row_group_totals:
                 if groupby_data['groupby']:
-                    # header_group_total = compute_row_header(self.group_totals)
-                    row = compute_row_totals(self.group_totals, row_group_totals, is_group_total=True)
+                    # header_group_total = self.get_totals_header_row(self.group_totals)
+                    row = self.get_totals_row(self.compute_totals(self.group_totals, row_group_totals),
+                                              is_group_total=True)
                     # rows.append(header_group_total)
                     rows.append(row)
                 for k, v in row_group_totals.items():
                     if k in row_report_totals:
                         row_report_totals[k].extend(v)
 
-            if groupby_data and groupby_data['groupby']:
-                grouper = self._get_grouper_text(groupby_data['groupby'], grouper)
-            else:
-                grouper = None
-            if isinstance(grouper, (list, tuple)):
-                grouper = grouper[0]
-            report_rows.append([grouper, rows])
+            grouper = self.get_group_text(groupby_data, grouper)
+            if page_totals is not None and first_group and self.page_continued and grouper is not None:
+                grouper = force_unicode(_('%s (continued)')) % grouper
+            first_group = False
+            yield [grouper, rows]
+        if self.other_queryset is not None and not (page_totals is not None and self.page_next):
+            # the other groups come after the last page
+            rows = self.get_other_rows(groupby_data['groupby'], ffields)
+            if rows:
+                yield [force_unicode(_('Other')), rows]
         if self.has_report_totals():
-            header_report_total = compute_row_header(self.report_totals)
-            row = compute_row_totals(self.report_totals, row_report_totals, is_report_total=True)
-            header_report_total.is_report_totals = True
-            row.is_report_totals = True
-            report_rows.append([_('Totals'), [header_report_total, row]])
+            if page_totals is not None:
+                totals = page_totals[1]
+            else:
+                totals = self.compute_totals(self.report_totals, row_report_totals)
+            yield self.get_report_totals_group(totals)
+
+    def can_stream_rows(self, groupby_data=None, config=None):
+        """
+        Return ``True`` when the HTML report can be sent while its rows are
+        fetched: ``stream_rows`` is set and the database orders the rows by
+        group, so no group comes back. Not for reports with fields through
+        many to many relations, a group by field with an
+        ``override_group_value`` or a chart computed from the rows.
+        """
+        if not self.stream_rows or StreamingHttpResponse is None or self.parent_report or \
+                self.multi_valued_fields:
+            return False
+        groupby_field = groupby_data.get('groupby') if groupby_data else None
+        if groupby_field and (groupby_field in self.override_group_value or
+                              self.get_db_field(groupby_field) is None):
+            return False
+        if config and self.get_db_field(self.model_fields[config['serie_field']][1]) is None:
+            return False
+        return True
+
+    def iter_stream_rows(self, groupby_data=None, filter_kwargs=None, do_localize=True):
+        """
+        Return an iterator over the ``[grouper, rows]`` of the report, fetched
+        by chunks of ``MODEL_REPORT_STREAM_CHUNK_SIZE`` rows in the order of
+        the database, see :func:`can_stream_rows`.
+        """
+        qs, ffields = self.get_values_queryset(groupby_data, filter_kwargs)
+        size = getattr(settings, 'MODEL_REPORT_STREAM_CHUNK_SIZE', 1000)
+        self.fetched_rows = 0
+        if self.metrics is not None:
+            self.metrics.sql.append(unicode(qs.query))
+
+        def iter_resources():
+            resources = qs.iterator()
+            while True:
+                chunk = list(islice(resources, size))
+                if not chunk:
+                    break
+                self.fetched_rows += len(chunk)
+                for resource in self.get_with_dotvalues(chunk):
+                    yield resource
+
+        return self.iter_groups(iter_resources(), ffields, groupby_data, do_localize)
+
+    def get_rows(self, groupby_data=None, filter_kwargs=None, filter_related_fields=None, do_localize=True,
+                 page=None):
+        if filter_related_fields is None:
+            filter_related_fields = {}
+
+        qs, ffields = self.get_values_queryset(groupby_data, filter_kwargs, filter_related_fields)
+        page_totals = None
+        with self.stage('fetch'):
+            if page is not None:
+                page_totals = self.get_partition_totals(groupby_data, filter_kwargs) or \
+                    self.get_page_totals(qs, groupby_data and groupby_data['groupby'])
+                qs_list = self.get_page_list(qs, ffields, groupby_data, page)
+            else:
+                qs_list = list(qs)
+        self.fetched_rows = len(qs_list)
+        if self.metrics is not None:
+            self.metrics.sql.append(unicode(qs.query))
+            self.metrics.rows['fetched'] = self.fetched_rows
+
+        def group_m2m_field_values(gqs_values):
+            values_results = []
+            m2m_indexes = [tpl[2] for tpl in self.model_m2m_fields]
+
+            def get_key_values(gqs_vals):
+                return [gv if field_idx not in m2m_indexes else None for field_idx, gv in enumerate(gqs_vals)]
+
+            # gqs_values needs to already be sorted on the same key function
+            # for groupby to work properly
+            gqs_values.sort(key=get_key_values)
+            res = groupby(gqs_values, key=get_key_values)
+
+            for key, values in res:
+                row_values = dict([(pos, []) for pos in m2m_indexes])
+                for subrow_value in values:
+                    for pos in m2m_indexes:
+                        if subrow_value[pos] not in row_values[pos]:
+                            row_values[pos].append(subrow_value[pos])
+                for pos, vals in row_values.items():
+                    key[pos] = vals
+                values_results.append(key)
+            return values_results
+
+        with self.stage('dotvalues'):
+            qs_list = self.get_with_dotvalues(qs_list)
+        if self.model_m2m_fields:
+            with self.stage('m2m'):
+                qs_list = group_m2m_field_values(qs_list)
+
+        with self.stage('rows'):
+            if page_totals is None:
+                qs_list.sort(key=self.get_groupby_function(groupby_data, ffields))
+            report_rows = list(self.iter_groups(qs_list, ffields, groupby_data, do_localize, page_totals))
 
+        if self.metrics is not None:
+            self.metrics.rows['groups'] = len(report_rows)
+            self.metrics.rows['values'] = sum([len([r for r in rows if r.is_value()]) for g, rows in report_rows])
         return report_rows
@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+import hashlib
+from decimal import Decimal
+
+try:
+    import json
+except ImportError:
+    from django.utils import simplejson as json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import F, DecimalField, FloatField, IntegerField
+from django.db.models.fields import FieldDoesNotExist
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.utils.encoding import smart_str
+
+from model_report.models import RollupTotal
+
+
+DATE_PARTS = ('year', 'month', 'day')
+
+ROLLUP_OPERATORS = ('exact', 'in', 'gte', 'lte')
+
+
+def split_date_part(lookup):
+    """
+    Return ``(lookup, date_part)`` of a lookup which may end with ``__year``,
+    ``__month`` or ``__day``, ``date_part`` is ``None`` when it doesn't.
+    """
+    if '__' in lookup:
+        name, part = lookup.rsplit('__', 1)
+        if part in DATE_PARTS:
+            return name, part
+    return lookup, None
+
+
+def get_lookup_field(model, lookup):
+    """
+    Return the model field of ``lookup`` from ``model``, ``None`` for a date
+    part or a lookup through a reverse relation.
+    """
+    field = None
+    for name in lookup.split('__'):
+        if field is not None:
+            if not getattr(field, 'rel', None):
+                return None
+            model = field.rel.to
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+    return field
+
+
+def rollup_match(value, operator, operand):
+    """
+    Return ``True`` when the value of a group of a rollup matches the lookup
+    ``operator`` (one of ``ROLLUP_OPERATORS``) of a filter with ``operand``.
+    """
+    if operator == 'exact':
+        return value == operand
+    if operator == 'in':
+        return value in operand
+    if value is None:
+        return False
+    if operator == 'gte':
+        return value >= operand
+    return value <= operand
+
+
+def to_decimal(value):
+    if value is None:
+        return Decimal(0)
+    if isinstance(value, float):
+        return Decimal(repr(value))
+    return Decimal(value)
+
+
+class Rollup(object):
+    """
+    Totals of the rows of a report model grouped by the ``group_by`` lookups,
+    which may end with a date part (``__year``, ``__month`` or ``__day``): the
+    number of rows and the sum of each field of ``sums`` of every group.
+
+    They are stored in the ``RollupTotal`` table, updated on every save and
+    delete of a row of the model, or of a related object the lookups go
+    through, once the report is registered, and computed again with the
+    ``rebuild_rollups`` command.
+    """
+    model = None
+    name = None
+    related = ()
+
+    def __init__(self, group_by, sums=()):
+        self.group_by = tuple(group_by)
+        self.sums = tuple(sums)
+        self.lookups = [split_date_part(lookup) for lookup in self.group_by]
+        self.fields = []
+        for field in [name for name, part in self.lookups] + list(self.sums):
+            if field not in self.fields:
+                self.fields.append(field)
+
+    def register(self, model):
+        """
+        Maintain the totals of the rows of ``model`` from its signals.
+        """
+        if self.model is not None:
+            if self.model is not model:
+                raise ValueError('The rollup is already registered for "%s".' % self.model._meta.object_name)
+            return
+        self.model = model
+        self.name = hashlib.md5(smart_str(u'%s.%s %s %s' % (
+            model._meta.app_label, model._meta.object_name, self.group_by, self.sums))).hexdigest()
+        uid = 'model_report_rollup_%s' % self.name
+        pre_save.connect(self.before_change, sender=model, weak=False, dispatch_uid='%s_pre_save' % uid)
+        post_save.connect(self.after_save, sender=model, weak=False, dispatch_uid='%s_post_save' % uid)
+        pre_delete.connect(self.before_change, sender=model, weak=False, dispatch_uid='%s_pre_delete' % uid)
+        post_delete.connect(self.after_delete, sender=model, weak=False, dispatch_uid='%s_post_delete' % uid)
+        self.related = self.get_related()
+        for related_model, path in self.related:
+            before, after = self.get_related_receivers(path)
+            related_uid = '%s_%s' % (uid, path)
+            pre_save.connect(before, sender=related_model, weak=False, dispatch_uid='%s_pre_save' % related_uid)
+            post_save.connect(after, sender=related_model, weak=False, dispatch_uid='%s_post_save' % related_uid)
+            pre_delete.connect(before, sender=related_model, weak=False, dispatch_uid='%s_pre_delete' % related_uid)
+            post_delete.connect(after, sender=related_model, weak=False,
+                                dispatch_uid='%s_post_delete' % related_uid)
+
+    def unregister(self):
+        """
+        Stop maintaining the totals from the signals of the model.
+        """
+        if self.model is None:
+            return
+        uid = 'model_report_rollup_%s' % self.name
+        pre_save.disconnect(sender=self.model, dispatch_uid='%s_pre_save' % uid)
+        post_save.disconnect(sender=self.model, dispatch_uid='%s_post_save' % uid)
+        pre_delete.disconnect(sender=self.model, dispatch_uid='%s_pre_delete' % uid)
+        post_delete.disconnect(sender=self.model, dispatch_uid='%s_post_delete' % uid)
+        for related_model, path in self.related:
+            related_uid = '%s_%s' % (uid, path)
+            pre_save.disconnect(sender=related_model, dispatch_uid='%s_pre_save' % related_uid)
+            post_save.disconnect(sender=related_model, dispatch_uid='%s_post_save' % related_uid)
+            pre_delete.disconnect(sender=related_model, dispatch_uid='%s_pre_delete' % related_uid)
+            post_delete.disconnect(sender=related_model, dispatch_uid='%s_post_delete' % related_uid)
+        self.related = []
+        self.model = None
+
+    def get_related(self):
+        """
+        Return the ``(model, path)`` of the related objects the ``group_by``
+        lookups and the ``sums`` go through, ``path`` is the lookup of the
+        relation from the model of the rollup (``os__company``).
+        """
+        related = []
+        for lookup in self.fields:
+            model = self.model
+            parts = lookup.split('__')
+            for index, name in enumerate(parts[:-1]):
+                try:
+                    field = model._meta.get_field(name)
+                except FieldDoesNotExist:
+                    break
+                if not getattr(field, 'rel', None):
+                    break
+                model = field.rel.to
+                path = '__'.join(parts[:index + 1])
+                if (model, path) not in related:
+                    related.append((model, path))
+        return related
+
+    def get_related_receivers(self, path):
+        """
+        Return the receivers of the signals of the related objects through
+        ``path``: the rows of the changed object move to the groups of its new
+        values. The rows deleted with it update the totals from their own
+        signals.
+        """
+        attname = '_rollup_%s_%s' % (self.name, path)
+
+        def before(sender, instance, **kwargs):
+            if instance.pk is not None:
+                qs = self.model._default_manager.filter(**{path: instance.pk})
+                setattr(instance, attname, dict(self.get_rows(qs, with_pk=True)))
+
+        def after(sender, instance, **kwargs):
+            old = instance.__dict__.pop(attname, None)
+            if not old:
+                return
+            qs = self.model._default_manager.filter(pk__in=old.keys())
+            changes = []
+            for pk, row in self.get_rows(qs, with_pk=True):
+                if row != old[pk]:
+                    changes.extend([(old[pk][0], old[pk][1], -1), (row[0], row[1], 1)])
+            self.change(changes)
+        return before, after
+
+    def get_rows(self, qs, with_pk=False):
+        """
+        Return an iterator over the ``(values, sums)`` of the rows of ``qs``:
+        the values of the ``group_by`` lookups and of the ``sums`` fields, or
+        over ``(pk, (values, sums))`` ``with_pk``.
+        """
+        fields = ['pk'] + self.fields if with_pk else self.fields
+        for row in qs.values_list(*fields).iterator():
+            row = dict(zip(fields, row))
+            values = []
+            for name, part in self.lookups:
+                value = row[name]
+                if part is not None and value is not None:
+                    value = getattr(value, part)
+                values.append(value)
+            sums = [row[field] for field in self.sums]
+            yield (row['pk'], (values, sums)) if with_pk else (values, sums)
+
+    def get_instance_row(self, instance):
+        rows = list(self.get_rows(self.model._default_manager.filter(pk=instance.pk)))
+        return rows[0] if rows else None
+
+    def get_key(self, values):
+        text = json.dumps(values, cls=DjangoJSONEncoder)
+        return hashlib.md5(smart_str(text)).hexdigest(), text
+
+    def before_change(self, sender, instance, **kwargs):
+        if instance.pk is not None:
+            setattr(instance, '_rollup_%s' % self.name, self.get_instance_row(instance))
+
+    def after_save(self, sender, instance, **kwargs):
+        old = instance.__dict__.pop('_rollup_%s' % self.name, None)
+        changes = [(old, -1), (self.get_instance_row(instance), 1)]
+        self.change([(row[0], row[1], sign) for row, sign in changes if row is not None])
+
+    def after_delete(self, sender, instance, **kwargs):
+        old = instance.__dict__.pop('_rollup_%s' % self.name, None)
+        if old is not None:
+            self.change([(old[0], old[1], -1)])
+
+    def change(self, rows):
+        """
+        Add the ``(values, sums, sign)`` of ``rows`` to the totals of their
+        groups, ``sign`` is ``1`` for a row added and ``-1`` for a row removed.
+        """
+        deltas = {}
+        for values, sums, sign in rows:
+            key, text = self.get_key(values)
+            if key not in deltas:
+                deltas[key] = (text, dict([(measure, Decimal(0)) for measure in ('',) + self.sums]))
+            delta = deltas[key][1]
+            delta[''] += sign
+            for measure, value in zip(self.sums, sums):
+                delta[measure] += sign * to_decimal(value)
+        for key, (text, delta) in deltas.items():
+            for measure, value in delta.items():
+                if value:
+                    self.add_total(key, text, measure, value)
+
+    def add_total(self, key, text, measure, value):
+        totals = RollupTotal.objects.filter(rollup=self.name, key=key, measure=measure)
+        if totals.update(total=F('total') + value):
+            return
+        sid = transaction.savepoint()
+        try:
+            RollupTotal.objects.create(rollup=self.name, key=key, values=text, measure=measure, total=value)
+            transaction.savepoint_commit(sid)
+        except IntegrityError:
+            # created meanwhile by another process
+            transaction.savepoint_rollback(sid)
+            totals.update(total=F('total') + value)
+
+    def rebuild(self):
+        """
+        Compute the totals again from every row of the model, return the
+        number of groups.
+        """
+        totals = {}
+        for values, sums in self.get_rows(self.model._default_manager.all()):
+            key, text = self.get_key(values)
+            if key not in totals:
+                totals[key] = (text, dict([(measure, Decimal(0)) for measure in ('',) + self.sums]))
+            total = totals[key][1]
+            total[''] += 1
+            for measure, value in zip(self.sums, sums):
+                total[measure] += to_decimal(value)
+        RollupTotal.objects.filter(rollup=self.name).delete()
+        RollupTotal.objects.bulk_create([
+            RollupTotal(rollup=self.name, key=key, values=text, measure=measure, total=value)
+            for key, (text, total) in totals.items() for measure, value in total.items()])
+        return len(totals)
+
+    def get_totals(self):
+        """
+        Return a list of ``(values, rows, sums)`` of the groups with rows: the
+        values of the ``group_by`` lookups, the number of rows and the sums of
+        the ``sums`` fields, with the python types of their fields.
+        """
+        groups = {}
+        qs = RollupTotal.objects.filter(rollup=self.name).values_list('key', 'values', 'measure', 'total')
+        for key, text, measure, total in qs.iterator():
+            if key not in groups:
+                groups[key] = (text, {})
+            groups[key][1][measure] = total
+
+        value_fields = [get_lookup_field(self.model, name) if part is None else None
+                        for name, part in self.lookups]
+        sum_fields = [get_lookup_field(self.model, field) for field in self.sums]
+        totals = []
+        for text, measures in groups.values():
+            rows = int(measures.get('', 0))
+            if rows <= 0:
+                continue
+            values = [field.to_python(value) if field is not None and value is not None else value
+                      for field, value in zip(value_fields, json.loads(text))]
+            sums = []
+            for field, measure in zip(sum_fields, self.sums):
+                total = measures.get(measure, Decimal(0))
+                if isinstance(field, DecimalField):
+                    total = total.quantize(Decimal(10) ** -field.decimal_places)
+                elif isinstance(field, IntegerField):
+                    total = int(total)
+                elif isinstance(field, FloatField):
+                    total = float(total)
+                sums.append(total)
+            totals.append((values, rows, sums))
+        return totals
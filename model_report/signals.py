@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+from django.dispatch import Signal
+
+
+report_executed = Signal(providing_args=['report', 'request', 'metrics'])
+"""
+Sent when a report finishes its execution. ``metrics`` is the
+:class:`model_report.metrics.ReportMetrics` of the execution.
+"""
@@ -0,0 +1,52 @@
+/*
+ * Load the choices of the filters rendered with the SearchSelect widgets:
+ * the first page on focus, a new search while typing and the next page when
+ * the "more" option is selected. The selected choices are always kept.
+ */
+(function ($) {
+    function loadChoices(container, page) {
+        var search = container.find('input.search_select_input');
+        var select = container.find('select');
+        var params = select.closest('form').serializeArray();
+        params.push({name: 'q', value: search.val()});
+        params.push({name: 'page', value: page});
+        $.getJSON(select.attr('data-url'), $.param(params), function (data) {
+            select.find('option.search_select_more').remove();
+            if (page == 1) {
+                select.find('option').not(':selected').not('[value=""]').remove();
+            }
+            $.each(data.results, function (i, choice) {
+                if (!select.find('option[value="' + choice.id + '"]').length) {
+                    $('<option></option>').val(choice.id).text(choice.text).appendTo(select);
+                }
+            });
+            if (data.more) {
+                $('<option class="search_select_more"></option>').val('').text(data.more_label)
+                    .data('page', page + 1).appendTo(select);
+            }
+            container.data('loaded', true);
+        });
+    }
+
+    $(document).ready(function () {
+        $('.search_select').each(function () {
+            var container = $(this);
+            var timer = null;
+            container.find('input.search_select_input').keyup(function () {
+                clearTimeout(timer);
+                timer = setTimeout(function () { loadChoices(container, 1); }, 250);
+            });
+            container.find('select').focus(function () {
+                if (!container.data('loaded')) {
+                    loadChoices(container, 1);
+                }
+            }).change(function () {
+                var more = $(this).find('option.search_select_more:selected');
+                if (more.length) {
+                    more.attr('selected', false);
+                    loadChoices(container, more.data('page'));
+                }
+            });
+        });
+    });
+})(jQuery);
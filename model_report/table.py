@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+from django.template.defaultfilters import slugify
+from django.template.loader import render_to_string
+from django.utils.encoding import force_unicode
+from django.utils.html import conditional_escape
+from django.utils.translation import ugettext as _
+
+
+def render_inline_report(inline, row, request):
+    """
+    Return the html of the inline report ``inline`` of the parent report row
+    ``row``, or of its expand control when it is loaded on demand.
+    """
+    if not row.is_value():
+        return ''
+    url = inline.get_inline_url(request, row) if request is not None else None
+    if url:
+        return render_to_string('model_report/includes/report_inline_load.html', {
+            'report': inline,
+            'inline_url': url,
+            'inline_column_span': len(inline.parent_report.get_column_names()),
+        })
+    inline_context = inline.get_render_context(request, by_row=row)
+    if len(inline_context['report_rows']) > 0:
+        return render_to_string('model_report/includes/report_inline.html', inline_context)
+    return ''
+
+
+def render_group_rows(report, gruper, rows, inlines=None, request=None):
+    """
+    Return the html of the ``rows`` of the group ``gruper``: the markup of
+    ``report_rows.html`` built without evaluating a template for every
+    row and cell.
+    """
+    # the class of the value rows, the same for every row of the group
+    row_class = u'row-%s' % slugify(_('Results') if gruper is None else gruper)
+    html = []
+    for row in rows:
+        is_value = row.is_value()
+        css_class = conditional_escape(row.get_css_class())
+        if is_value and not getattr(row, 'is_report_totals', False):
+            html.append(u'\n            <tr class="%s %s">' % (css_class, row_class))
+        else:
+            html.append(u'\n            <tr class="%s ">' % css_class)
+        for value in row:
+            html.append(u'\n                <td valign="middle">%s</td>' % force_unicode(value))
+        html.append(u'\n            </tr>')
+        if inlines and is_value:
+            for inline in inlines:
+                html.append(render_inline_report(inline, row, request))
+    return u''.join(html)
@@ -1,6 +1,12 @@
 # -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
 from django import template
-from django.template.loader import render_to_string
+from django.conf import settings
+from django.template.loader import get_template
+
+from model_report.cache import get_report_cache
+from model_report.table import render_inline_report, render_group_rows
 
 
 register = template.Library()
@@ -14,12 +20,7 @@ class ModelReportInlineNode(template.Node):
     def render(self, context):
         inline = self.inline.resolve(context)
         row = self.row.resolve(context)
-        request = context.get('request')
-        if row.is_value():
-            inline_context = inline.get_render_context(request, by_row=row)
-            if len(inline_context['report_rows']) > 0:
-                return render_to_string('model_report/includes/report_inline.html', inline_context)
-        return ''
+        return render_inline_report(inline, row, context.get('request'))
 
 
 @register.tag()
@@ -29,3 +30,23 @@ def model_report_render_inline(parser, token):
     except ValueError:
         raise template.TemplateSyntaxError("%r tag requires arguments" % token.contents.split()[0])
     return ModelReportInlineNode(inline, row)
+
+
+@register.simple_tag(takes_context=True)
+def model_report_group_rows(context):
+    """
+    Render the rows of the group in the context with the ``report_rows.html``
+    template or the fast table renderer, or take them from the cache.
+    """
+    report, rows = context['report'], context['rows']
+    html = getattr(rows, 'html', None)
+    if html is None:
+        if report.fast_table:
+            html = render_group_rows(report, context.get('gruper'), rows, context.get('report_inlines'),
+                                     context.get('request'))
+        else:
+            html = get_template('model_report/includes/report_rows.html').render(context)
+        if getattr(rows, 'cache_key', None):
+            timeout = getattr(settings, 'MODEL_REPORT_GROUP_CACHE_TIMEOUT', 60 * 60 * 24)
+            get_report_cache().set(rows.cache_key, html, timeout)
+    return html
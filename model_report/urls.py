@@ -4,10 +4,15 @@ try:
 except ImportError:
     from django.conf.urls import *
 
-from model_report.views import report, report_list
+from model_report.views import report, report_list, report_chart, report_filter_choices, report_group, \
+    report_inline
 
 
 urlpatterns = patterns('',
     url(r'^$', report_list, name='model_report_list'),
     url(r'^(?P<slug>[\w-]+)/$', report, name='model_report_view'),
+    url(r'^(?P<slug>[\w-]+)/chart/$', report_chart, name='model_report_chart'),
+    url(r'^(?P<slug>[\w-]+)/group/$', report_group, name='model_report_group'),
+    url(r'^(?P<slug>[\w-]+)/inline/$', report_inline, name='model_report_inline'),
+    url(r'^(?P<slug>[\w-]+)/filter/(?P<name>[\w-]+)/$', report_filter_choices, name='model_report_filter_choices'),
 )
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import math
 from decimal import Decimal
 from django.utils.translation import ugettext as _
 from django.utils.encoding import force_unicode
@@ -49,6 +50,45 @@ def count_column(values):
 count_column.caption = _('Count')
 
 
+class EstimatedTotal(Decimal):
+    """
+    Total estimated from a sample of the rows, ``error`` is the half width of
+    its 95% confidence interval.
+    """
+    error = None
+
+
+def estimate_total(fun, values, scale):
+    """
+    Return the :class:`EstimatedTotal` of the totals function ``fun`` for
+    every row from its ``values`` in a sample of one of ``scale`` rows,
+    ``None`` for other functions than ``sum_column``, ``avg_column`` and
+    ``count_column``.
+    """
+    if fun not in (sum_column, avg_column, count_column):
+        return None
+    fraction = 1.0 / scale
+    numeric = bool(values) and not isinstance(values[0], (list, tuple))
+    if fun is avg_column:
+        total = EstimatedTotal(fun(values))
+        if numeric and len(values) > 1:
+            values = [float(value or 0) for value in values]
+            mean = sum(values) / len(values)
+            variance = sum([(v - mean) ** 2 for v in values]) / (len(values) - 1)
+            total.error = Decimal(repr(1.96 * math.sqrt((1 - fraction) * variance / len(values))))
+        return total
+    if fun is sum_column and numeric:
+        values = [float(value or 0) for value in values]
+        total = EstimatedTotal(repr(sum(values) * scale))
+        total.error = Decimal(repr(1.96 * math.sqrt((1 - fraction) * sum([v * v for v in values])) * scale))
+        return total
+    # a number of rows
+    count = float(fun(values))
+    total = EstimatedTotal(int(round(count * scale)))
+    total.error = Decimal(int(round(1.96 * math.sqrt(count * (1 - fraction)) * scale)))
+    return total
+
+
 def date_format(value, instance):
     """
     Format cell value to friendly date string
@@ -87,8 +127,10 @@ class ReportValue(object):
     * ``is_report_total`` - defined as True if value is for showing in report total row
     * ``is_group_total`` - defined as True if value is for showing in group total row
     * ``is_value`` - defined as True if value is for showing in normal row
+    * ``error`` - error of a total estimated from a sample of the rows
     """
     value = None
+    error = None
     is_report_total = False
     is_group_total = False
     is_value = True
@@ -112,6 +154,9 @@ class ReportValue(object):
         """
         Render as text the value. This function also format the value.
         """
+        if self.error is not None:
+            return u'%s \u00b1 %s' % (force_unicode(self.formatted_value()),
+                                     force_unicode(self.format(self.error, instance=self)))
         return force_unicode(self.formatted_value())
 
     def __repr__(self):
@@ -155,3 +200,18 @@ class ReportRow(list):
         Evaluate True if the row is a normal row or not
         """
         return self.is_total == False and self.is_caption == False
+
+
+class GroupRows(list):
+    """
+    Class to represent the rows of a group not rendered from its rows
+
+    Attributes:
+
+    * ``load_url`` - url returning the value rows of the group as html
+    * ``cache_key`` - cache key of the rendered rows of the group
+    * ``html`` - rendered rows of the group, taken from the cache
+    """
+    load_url = None
+    cache_key = None
+    html = None
@@ -33,3 +33,65 @@ def report(request, slug):
     
     report = report_class(request=request)
     return report.render(request, extra_context=context)
+
+
+def report_chart(request, slug):
+    """
+    This view return the chart options of one report as JSON
+
+    Keywords arguments:
+
+    slug -- slug of the report
+    """
+    report_class = reports.get_report(slug)
+    if not report_class:
+        raise Http404
+    report = report_class(request=request)
+    return report.render_chart(request)
+
+
+def report_filter_choices(request, slug, name):
+    """
+    This view return a page of the choices of one report filter as JSON
+
+    Keywords arguments:
+
+    slug -- slug of the report
+
+    name -- name of the filter field
+    """
+    report_class = reports.get_report(slug)
+    if not report_class:
+        raise Http404
+    report = report_class(request=request)
+    return report.render_filter_choices(request, name)
+
+
+def report_group(request, slug):
+    """
+    This view return the rows of one group of a report as html
+
+    Keywords arguments:
+
+    slug -- slug of the report
+    """
+    report_class = reports.get_report(slug)
+    if not report_class:
+        raise Http404
+    report = report_class(request=request)
+    return report.render_group(request)
+
+
+def report_inline(request, slug):
+    """
+    This view return the inline report of one row of a report as html
+
+    Keywords arguments:
+
+    slug -- slug of the report
+    """
+    report_class = reports.get_report(slug)
+    if not report_class:
+        raise Http404
+    report = report_class(request=request)
+    return report.render_inline(request)
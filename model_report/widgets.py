@@ -48,3 +48,46 @@ class RangeField(forms.MultiValueField):
         if data_list:
             return [self.fields[0].clean(data_list[0]), self.fields[1].clean(data_list[1])]
         return None
+
+
+class SearchSelectMixin(object):
+    """
+    Render only the empty and the selected choices of a model choice field,
+    the other choices are searched by prefix from ``url`` in the browser.
+    """
+    def __init__(self, url, *args, **kwargs):
+        self.url = url
+        super(SearchSelectMixin, self).__init__(*args, **kwargs)
+
+    def render_options(self, choices, selected_choices):
+        selected_choices = set([force_unicode(v) for v in selected_choices if v not in ('', None)])
+        field = self.choices.field
+        output = []
+        if not self.allow_multiple_selected and field.empty_label is not None:
+            output.append(self.render_option(selected_choices, u'', field.empty_label))
+        if selected_choices:
+            try:
+                objects = list(self.choices.queryset.filter(pk__in=selected_choices))
+            except (ValueError, TypeError):
+                objects = []
+            for obj in objects:
+                output.append(self.render_option(selected_choices, field.prepare_value(obj),
+                                                 field.label_from_instance(obj)))
+        return u'\n'.join(output)
+
+    def render(self, name, value, attrs=None, choices=()):
+        attrs = dict(attrs or {}, **{'data-url': self.url})
+        widget_context = {
+            'name': name,
+            'select': super(SearchSelectMixin, self).render(name, value, attrs, choices),
+            'placeholder': _(u'Search'),
+        }
+        return render_to_string('model_report/widgets/search_select.html', widget_context)
+
+
+class SearchSelect(SearchSelectMixin, forms.Select):
+    pass
+
+
+class SearchSelectMultiple(SearchSelectMixin, forms.SelectMultiple):
+    pass
@@ -40,7 +40,6 @@ setup(name='django-model-report',
           'pisa',
           'reportlab',
           'html5lib',
-          'BeautifulSoup',
           'xlwt==0.7.5',
       ],
       classifiers=['Framework :: Django',